@@ -0,0 +1,110 @@
+"""
+Cart stock holds
+
+Adding a product to the cart sets its quantity aside for
+ORDER_TIMEOUT_MINUTES, so a cart filled during a flash sale can still be
+checked out. Every change to the item extends the hold.
+
+    available = stock_quantity - SUM(active holds of other carts)
+
+Active holds are summed per product through the (product, expires_at)
+index. Placing a hold locks the product row first, the same row a checkout's
+stock UPDATE locks, so holds and checkouts for one product take turns.
+Expired holds simply stop counting; `release_expired_holds` deletes them
+in batches.
+"""
+
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from products.models import Product
+from .models import StockHold
+
+
+class StockUnavailable(Exception):
+    """More was asked for than is in stock and not held by other carts"""
+
+    def __init__(self, product_id, requested, available):
+        self.product_id = product_id
+        self.requested = requested
+        self.available = available
+        super().__init__(f"Only {available} available")
+
+
+def hold_ttl():
+    return timedelta(minutes=getattr(settings, 'ORDER_TIMEOUT_MINUTES', 30))
+
+
+def active_holds(exclude_items=()):
+    holds = StockHold.objects.filter(expires_at__gt=timezone.now())
+    if exclude_items:
+        holds = holds.exclude(cart_item_id__in=list(exclude_items))
+    return holds
+
+
+def held_quantities(product_ids, exclude_items=()):
+    """{product_id: units held by active holds}, excluding the given cart items' own holds"""
+    return dict(
+        active_holds(exclude_items).filter(product_id__in=list(product_ids))
+        .values('product_id')
+        .annotate(held=Sum('quantity'))
+        .values_list('product_id', 'held')
+    )
+
+
+def held_subquery(exclude_items=()):
+    """Units held on the outer query's product, for use in filters / annotations"""
+    return Coalesce(Subquery(
+        active_holds(exclude_items).filter(product_id=OuterRef('pk'))
+        .values('product_id')
+        .annotate(held=Sum('quantity'))
+        .values('held')
+    ), 0)
+
+
+def available_quantities(product_ids, exclude_items=()):
+    """{product_id: stock not held by anyone else}"""
+    stock = dict(Product.objects.filter(pk__in=list(product_ids)).values_list('pk', 'stock_quantity'))
+    held = held_quantities(stock, exclude_items)
+    return {product_id: max(quantity - held.get(product_id, 0), 0) for product_id, quantity in stock.items()}
+
+
+def hold_cart_item(cart_item, strict=True):
+    """
+    Hold cart_item.quantity for another ORDER_TIMEOUT_MINUTES
+    - strict: raise StockUnavailable if that much isn't available,
+      otherwise hold whatever is
+    """
+    with transaction.atomic():
+        # Checkouts and other holds for this product wait here until we're done
+        stock = (
+            Product.objects.select_for_update()
+            .filter(pk=cart_item.product_id)
+            .values_list('stock_quantity', flat=True)
+            .get()
+        )
+        held = held_quantities([cart_item.product_id], exclude_items=[cart_item.pk]).get(cart_item.product_id, 0)
+        available = max(stock - held, 0)
+        if strict and cart_item.quantity > available:
+            raise StockUnavailable(cart_item.product_id, cart_item.quantity, available)
+
+        StockHold.objects.update_or_create(cart_item=cart_item, defaults={
+            'product_id': cart_item.product_id,
+            'quantity': min(cart_item.quantity, available),
+            'expires_at': timezone.now() + hold_ttl(),
+        })
+
+
+def release_expired_holds(batch_size=1000):
+    """Delete expired holds, batch_size rows per DELETE. Returns the number deleted."""
+    now = timezone.now()
+    released = 0
+    while True:
+        batch = list(StockHold.objects.filter(expires_at__lte=now).values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return released
+        StockHold.objects.filter(pk__in=batch).delete()
+        released += len(batch)
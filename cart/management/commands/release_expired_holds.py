@@ -0,0 +1,16 @@
+import time
+from django.core.management.base import BaseCommand
+from cart.holds import release_expired_holds
+
+
+class Command(BaseCommand):
+    help = "Delete expired cart stock holds in batches (run periodically, e.g. every few minutes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Holds deleted per statement')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        released = release_expired_holds(batch_size=max(options['batch_size'], 1))
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f"Released {released} expired stock holds in {elapsed * 1000:.1f} ms"))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0002_initial'),
+        ('products', '0011_recently_viewed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('cart_item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='hold', to='cart.cartitem')),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='stock_holds', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'expires_at'], name='stock_hold_product_expiry')],
+            },
+        ),
+    ]
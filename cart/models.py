@@ -41,4 +41,25 @@ class CartItem(models.Model):
     # Price for this specific item
     @property
     def item_price(self):
-        return self.product.price * self.quantity
\ No newline at end of file
+        return self.product.price * self.quantity
+
+class StockHold(models.Model):
+    """
+    Stock set aside for a cart item until expires_at
+    - Placed or extended whenever the item's quantity changes (cart/holds.py)
+    - Expired holds stop counting at once; release_expired_holds deletes them in batches
+    """
+    cart_item = models.OneToOneField(CartItem, on_delete=models.CASCADE, related_name='hold')
+    # No separate index, (product, expires_at) below starts with it
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_holds', db_index=False)
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        indexes = [
+            # Active holds per product: SUM(quantity) WHERE product_id = ... AND expires_at > now
+            models.Index(fields=['product', 'expires_at'], name='stock_hold_product_expiry'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} until {self.expires_at}"
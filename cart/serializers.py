@@ -1,3 +1,4 @@
+from django.utils import timezone
 from rest_framework import serializers
 from .models import Cart, CartItem
 from products.models import Product
@@ -7,16 +8,24 @@ class CartItemSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
     product_price = serializers.DecimalField(source='product.price', read_only=True, max_digits=10, decimal_places=2)
     item_total = serializers.SerializerMethodField()
+    held_until = serializers.SerializerMethodField()
     
     class Meta:
         model = CartItem
-        fields = ['id', 'product', 'product_name', 'product_price', 'quantity', 'item_total', 'added_at']
+        fields = ['id', 'product', 'product_name', 'product_price', 'quantity', 'item_total', 'held_until', 'added_at']
         read_only_fields = ['item_total', 'added_at']
     
     def get_item_total(self, obj):
         """Calculate total for this cart item (product.price * quantity)"""
         return obj.quantity * obj.product.price
 
+    def get_held_until(self, obj):
+        """When the stock set aside for this item is released (None if nothing is held)"""
+        hold = getattr(obj, 'hold', None)
+        if hold is None or hold.expires_at <= timezone.now():
+            return None
+        return serializers.DateTimeField().to_representation(hold.expires_at)
+
 
 class CartSerializer(serializers.ModelSerializer):
     """Serializer for full cart with items and totals"""
@@ -1,3 +1,125 @@
-from django.test import TestCase
+import threading
+import time
+from datetime import timedelta
+from django.db import OperationalError, connection
+from django.test import TransactionTestCase
+from django.utils import timezone
+from categories.models import Category
+from orders.models import Order
+from orders.stock import InsufficientStock
+from products.models import Product
+from users.models import User
+from .holds import StockUnavailable, available_quantities, hold_cart_item, release_expired_holds
+from .models import Cart, CartItem, StockHold
 
-# Create your tests here.
+
+class StockHoldTests(TransactionTestCase):
+    """Holds set stock aside for one cart until they expire"""
+
+    stock = 5
+
+    def setUp(self):
+        category = Category.objects.create(name='Electronics', slug='electronics')
+        self.product = Product.objects.create(
+            name='Phone', description='A phone', price=100, category=category, stock_quantity=self.stock
+        )
+        self.carts = [self.create_cart(index) for index in range(2)]
+
+    def create_cart(self, index):
+        user = User.objects.create_user(
+            email=f'shopper{index}@example.com', username=f'shopper{index}', password='password'
+        )
+        return Cart.objects.create(user=user)
+
+    def add_item(self, cart, quantity):
+        item = CartItem.objects.create(cart=cart, product=self.product, quantity=quantity)
+        hold_cart_item(item)
+        return item
+
+    def expire(self, item):
+        StockHold.objects.filter(cart_item=item).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    def test_available_is_stock_minus_other_carts_holds(self):
+        item = self.add_item(self.carts[0], 3)
+        self.assertEqual(available_quantities([self.product.pk])[self.product.pk], 2)
+        # A cart's own hold is still available to it
+        self.assertEqual(available_quantities([self.product.pk], [item.pk])[self.product.pk], 5)
+
+        with self.assertRaises(StockUnavailable) as raised:
+            self.add_item(self.carts[1], 3)
+        self.assertEqual(raised.exception.available, 2)
+
+    def test_expired_holds_stop_counting(self):
+        item = self.add_item(self.carts[0], 4)
+        self.expire(item)
+        self.assertEqual(available_quantities([self.product.pk])[self.product.pk], 5)
+        self.add_item(self.carts[1], 5)
+
+    def test_changing_the_item_extends_the_hold(self):
+        item = self.add_item(self.carts[0], 1)
+        self.expire(item)
+        item.quantity = 2
+        item.save()
+        hold_cart_item(item)
+        hold = StockHold.objects.get(cart_item=item)
+        self.assertEqual(hold.quantity, 2)
+        self.assertGreater(hold.expires_at, timezone.now())
+
+    def test_release_expired_holds_in_batches(self):
+        items = [self.add_item(self.create_cart(index), 1) for index in range(2, 7)]
+        for item in items[:4]:
+            self.expire(item)
+
+        self.assertEqual(release_expired_holds(batch_size=3), 4)
+        self.assertEqual(list(StockHold.objects.values_list('cart_item_id', flat=True)), [items[4].pk])
+        self.assertEqual(release_expired_holds(batch_size=3), 0)
+
+    def test_checkout_counts_other_carts_holds(self):
+        self.add_item(self.carts[0], 4)
+        self.add_item(self.carts[1], 1)
+        CartItem.objects.filter(cart=self.carts[1]).update(quantity=2)
+
+        with self.assertRaises(InsufficientStock) as raised:
+            Order.create_from_cart(self.carts[1], 'Nairobi')
+        self.assertEqual(raised.exception.shortfalls[0]['available'], 1)
+
+        # The cart holding the stock checks out with it
+        Order.create_from_cart(self.carts[0], 'Nairobi')
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 1)
+
+    def hold(self, item, barrier, results):
+        try:
+            barrier.wait()
+            while True:
+                try:
+                    hold_cart_item(item)
+                    results.append('ok')
+                    return
+                except StockUnavailable:
+                    results.append('unavailable')
+                    return
+                except OperationalError:
+                    # SQLite serializes writers and reports the others as locked; retry
+                    time.sleep(0.01)
+        finally:
+            connection.close()
+
+    def test_concurrent_holds_do_not_overcommit(self):
+        shoppers = 12
+        items = [
+            CartItem.objects.create(cart=self.create_cart(index), product=self.product, quantity=1)
+            for index in range(2, 2 + shoppers)
+        ]
+        barrier = threading.Barrier(shoppers)
+        results = []
+        threads = [threading.Thread(target=self.hold, args=(item, barrier, results)) for item in items]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), shoppers)
+        self.assertEqual(results.count('ok'), self.stock)
+        self.assertEqual(sum(StockHold.objects.values_list('quantity', flat=True)), self.stock)
+        self.assertEqual(available_quantities([self.product.pk])[self.product.pk], 0)
@@ -1,7 +1,10 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
+from django.db import transaction
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
+from .holds import StockUnavailable, hold_cart_item
 from .models import Cart, CartItem
 from .serializers import (CartSerializer,CartItemSerializer,CartAddSerializer,CartUpdateSerializer)
 from products.models import Product
@@ -12,6 +15,7 @@ class CartDetailView(generics.RetrieveAPIView):
     Get user's cart with all items
     - User must be logged in
     - Automatically creates cart if doesn't exist
+    - Each item shows until when its stock is held
     """
     serializer_class = CartSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -19,7 +23,15 @@ class CartDetailView(generics.RetrieveAPIView):
     def get_object(self):
         # Get or create cart for the current user
         cart, created = Cart.objects.get_or_create(user=self.request.user)
-        return cart
+        items = CartItem.objects.select_related('product', 'hold')
+        return Cart.objects.prefetch_related(Prefetch('items', queryset=items)).get(pk=cart.pk)
+
+
+def stock_unavailable_response(error):
+    return Response(
+        {"error": f"Not enough stock. {error}.", "product_id": error.product_id, "available": error.available},
+        status=status.HTTP_409_CONFLICT
+    )
 
 
 @api_view(['POST'])
@@ -29,6 +41,7 @@ def add_to_cart(request):
     Add item to cart or increase quantity if already exists
     - User must be logged in
     - Creates cart if doesn't exist
+    - Holds the stock for ORDER_TIMEOUT_MINUTES, 409 if it isn't available
     """
     serializer = CartAddSerializer(data=request.data)
     
@@ -40,17 +53,23 @@ def add_to_cart(request):
         cart, created = Cart.objects.get_or_create(user=request.user)
         product = get_object_or_404(Product, id=product_id, is_active=True)
         
-        # Check if item already in cart
-        cart_item, created = CartItem.objects.get_or_create(
-            cart=cart,
-            product=product,
-            defaults={'quantity': quantity}
-        )
-        
-        if not created:
-            # Item exists - increase quantity
-            cart_item.quantity += quantity
-            cart_item.save()
+        try:
+            with transaction.atomic():
+                # Check if item already in cart
+                cart_item, created = CartItem.objects.get_or_create(
+                    cart=cart,
+                    product=product,
+                    defaults={'quantity': quantity}
+                )
+
+                if not created:
+                    # Item exists - increase quantity
+                    cart_item.quantity += quantity
+                    cart_item.save()
+
+                hold_cart_item(cart_item)
+        except StockUnavailable as e:
+            return stock_unavailable_response(e)
         
         return Response({"message": "Product added to cart"}, status=status.HTTP_200_OK)
     
@@ -67,9 +86,14 @@ def increase_cart_item(request, item_id):
     """
     cart_item = get_object_or_404(CartItem, id=item_id, cart__user=request.user)
     
-    # Increase quantity
-    cart_item.quantity += 1
-    cart_item.save()
+    # Increase quantity (and the stock held for it)
+    try:
+        with transaction.atomic():
+            cart_item.quantity += 1
+            cart_item.save()
+            hold_cart_item(cart_item)
+    except StockUnavailable as e:
+        return stock_unavailable_response(e)
     
     return Response({"message": "Quantity increased", "quantity": cart_item.quantity})
 
@@ -86,9 +110,10 @@ def decrease_cart_item(request, item_id):
     cart_item = get_object_or_404(CartItem, id=item_id, cart__user=request.user)
     
     if cart_item.quantity > 1:
-        # Decrease quantity
+        # Decrease quantity (releases one held unit)
         cart_item.quantity -= 1
         cart_item.save()
+        hold_cart_item(cart_item, strict=False)
         return Response({"message": "Quantity decreased", "quantity": cart_item.quantity})
     else:
         # Remove item if quantity becomes 0
@@ -101,6 +126,7 @@ class UpdateCartItemView(generics.UpdateAPIView):
     Update cart item quantity (set exact amount)
     - User must be logged in
     - Must own the cart item
+    - The new quantity is held for ORDER_TIMEOUT_MINUTES, 409 if it isn't available
     """
     serializer_class = CartUpdateSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -109,6 +135,16 @@ class UpdateCartItemView(generics.UpdateAPIView):
         # Users can only update their own cart items
         return CartItem.objects.filter(cart__user=self.request.user)
 
+    def update(self, request, *args, **kwargs):
+        try:
+            with transaction.atomic():
+                return super().update(request, *args, **kwargs)
+        except StockUnavailable as e:
+            return stock_unavailable_response(e)
+
+    def perform_update(self, serializer):
+        hold_cart_item(serializer.save())
+
 
 class RemoveCartItemView(generics.DestroyAPIView):
     """
@@ -1,24 +1,65 @@
 from rest_framework import serializers
 from .models import Category
+from .tree import get_category_tree
+from common.serializers import SparseFieldsSerializerMixin
 
-class CategoryListSerializer(serializers.ModelSerializer):
+datetime_field = serializers.DateTimeField()
+
+
+def public_tree_representation(tree, category_ids):
+    """The active categories among category_ids with their active descendants, nested"""
+    return [
+        {
+            'id': category_id,
+            'name': tree['nodes'][category_id]['name'],
+            'slug': tree['nodes'][category_id]['slug'],
+            'is_active': True,
+            'subcategories': public_tree_representation(tree, tree['children'][category_id]),
+        }
+        for category_id in category_ids
+        if tree['nodes'][category_id]['is_active']
+    ]
+
+
+def admin_representation(tree, category_id):
+    """CategoryAdminSerializer output for a category and all its descendants, built from the cached tree"""
+    node = tree['nodes'][category_id]
+    data = {'id': node['id'], 'name': node['name'], 'description': node['description'], 'parent': node['parent_id']}
+    if node['parent_id'] is not None:
+        data['parent_name'] = tree['nodes'][node['parent_id']]['name']
+    data.update({
+        'slug': node['slug'],
+        'is_active': node['is_active'],
+        'subcategories': [admin_representation(tree, child_id) for child_id in tree['children'][category_id]],
+        'created_at': datetime_field.to_representation(node['created_at']),
+        'updated_at': datetime_field.to_representation(node['updated_at']),
+    })
+    return data
+
+
+class CategoryListSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name', 'slug', 'is_active']
 
 
-class CategoryDetailSerializer(serializers.ModelSerializer):
+class CategoryDetailSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     subcategories = serializers.SerializerMethodField()
     parent_name = serializers.CharField(source='parent.name', read_only=True)
     
     class Meta:
         model = Category
         fields = ['id', 'name', 'description', 'parent', 'parent_name', 'slug', 'is_active', 'subcategories', 'created_at', 'updated_at']
+        field_dependencies = {'subcategories': []}  # read from the cached tree
     
     def get_subcategories(self, obj):
         # Get all active subcategories
-        subcategories = Category.objects.filter(parent=obj, is_active=True)
-        return CategoryListSerializer(subcategories, many=True).data
+        tree = get_category_tree()
+        return [
+            {key: tree['nodes'][child_id][key] for key in ('id', 'name', 'slug', 'is_active')}
+            for child_id in tree['children'].get(obj.pk, [])
+            if tree['nodes'][child_id]['is_active']
+        ]
 
 
 class CategoryAdminSerializer(serializers.ModelSerializer):
@@ -31,8 +72,8 @@ class CategoryAdminSerializer(serializers.ModelSerializer):
     
     def get_subcategories(self, obj):
         # Get ALL subcategories (including inactive) for admin
-        subcategories = Category.objects.filter(parent=obj)
-        return CategoryAdminSerializer(subcategories, many=True).data
+        tree = get_category_tree()
+        return [admin_representation(tree, child_id) for child_id in tree['children'].get(obj.pk, [])]
 
 
 class CategoryCreateSerializer(serializers.ModelSerializer):
@@ -0,0 +1,21 @@
+from django.db.models import Count, Max
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from mptt.signals import node_moved
+from common.cache import bump_generation, register_fingerprint
+from .models import Category
+
+# Writes made by other processes
+register_fingerprint('categories', Category.objects.all(), rows=Count('pk'), modified=Max('updated_at'))
+
+
+def invalidate_category_caches():
+    """Drop every cached value derived from the categories table"""
+    bump_generation('categories')
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(node_moved, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    invalidate_category_caches()
@@ -0,0 +1,97 @@
+"""
+In-memory view of the category tree
+
+One ordered query (tree_id, lft) loads every category; the result is cached
+until a Category is saved, moved or deleted (see categories/signals.py).
+"""
+
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from common.cache import get_generation
+from .models import Category
+
+
+NODE_FIELDS = ['id', 'name', 'slug', 'parent_id', 'tree_id', 'lft', 'rght', 'level', 'is_active']
+TREE_FIELDS = NODE_FIELDS + ['description', 'created_at', 'updated_at']
+
+
+def get_category_nodes():
+    """{category_id: node dict} for every category, in tree order"""
+    cache_key = f"categories:nodes:{get_generation('categories')}"
+    nodes = cache.get(cache_key)
+    if nodes is None:
+        nodes = {
+            node['id']: node
+            for node in Category.objects.order_by('tree_id', 'lft').values(*NODE_FIELDS)
+        }
+        cache.set(cache_key, nodes, getattr(settings, 'CATEGORY_TREE_CACHE_TIMEOUT', 3600))
+    return nodes
+
+
+def get_category_tree():
+    """
+    Every category with its children, from one ordered query
+    - 'nodes': {category_id: row}, 'children': {category_id: [child ids]},
+      'roots': [root ids], all in tree order
+    - 'fingerprint' / 'last_modified': validators for responses built from it
+    """
+    cache_key = f"categories:tree:{get_generation('categories')}"
+    tree = cache.get(cache_key)
+    if tree is None:
+        tree = build_category_tree(Category.objects.order_by('tree_id', 'lft').values(*TREE_FIELDS))
+        cache.set(cache_key, tree, getattr(settings, 'CATEGORY_TREE_CACHE_TIMEOUT', 3600))
+    return tree
+
+
+def build_category_tree(rows):
+    nodes, children, roots = {}, {}, []
+    fingerprint = hashlib.md5()
+    for row in rows:
+        nodes[row['id']] = row
+        children[row['id']] = []
+        # Tree order puts every parent before its children
+        if row['parent_id'] is None:
+            roots.append(row['id'])
+        else:
+            children[row['parent_id']].append(row['id'])
+        fingerprint.update(repr([row[field] for field in TREE_FIELDS]).encode())
+    last_modified = max((row['updated_at'] for row in nodes.values()), default=None)
+    return {
+        'nodes': nodes,
+        'children': children,
+        'roots': roots,
+        'fingerprint': fingerprint.hexdigest(),
+        'last_modified': int(last_modified.timestamp()) if last_modified else None,
+    }
+
+
+def get_ancestor_ids(category_id, nodes=None):
+    """Ids from the category itself up to its root"""
+    nodes = nodes if nodes is not None else get_category_nodes()
+    ancestors = []
+    while category_id in nodes:
+        ancestors.append(category_id)
+        category_id = nodes[category_id]['parent_id']
+    return ancestors
+
+
+def subtree_filter(category_id, field='category', nodes=None):
+    """
+    Q matching rows whose `field` is the category or any of its descendants.
+    Compiles to one join with tree_id = .. AND lft BETWEEN .., using the cached
+    node map instead of a get_descendants() round trip.
+    Returns None if the category doesn't exist.
+    """
+    nodes = nodes if nodes is not None else get_category_nodes()
+    node = nodes.get(category_id)
+    if node is None:
+        return None
+    if node['rght'] - node['lft'] == 1:
+        # Leaf category, no join needed
+        return Q(**{f'{field}_id': category_id})
+    return Q(**{
+        f'{field}__tree_id': node['tree_id'],
+        f'{field}__lft__range': (node['lft'], node['rght']),
+    })
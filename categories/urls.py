@@ -6,6 +6,7 @@ app_name = 'categories'
 urlpatterns = [
     # Public endpoints
     path('', views.CategoryListView.as_view(), name='category-list'),
+    path('tree/', views.CategoryTreeView.as_view(), name='category-tree'),
     path('<int:pk>/', views.CategoryDetailView.as_view(), name='category-detail'),
     
     # Admin endpoints 
@@ -1,37 +1,69 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from django.db import models
+from common.mixins import CachedResponseMixin, ConditionalGetMixin, SparseFieldsetMixin
 from .models import Category
-from .serializers import (CategoryListSerializer, CategoryDetailSerializer, CategoryCreateSerializer, CategoryAdminSerializer)
+from .serializers import (CategoryListSerializer, CategoryDetailSerializer, CategoryCreateSerializer, CategoryAdminSerializer,
+                          admin_representation, public_tree_representation)
+from .tree import get_category_tree
 
 
-class CategoryListView(generics.ListAPIView):
+class CategoryListView(CachedResponseMixin, ConditionalGetMixin, SparseFieldsetMixin, generics.ListAPIView):
     """
     List all categories
     - Public access with no authentication required
     - Only shows active categories
+    - Anonymous responses are cached until a category changes
     """
     serializer_class = CategoryListSerializer
     permission_classes = [permissions.AllowAny] 
+    cache_generations = ('categories',)
     
     def get_queryset(self):
         # Only active categories for non-admin users
         return Category.objects.filter(is_active=True)
 
 
-class CategoryDetailView(generics.RetrieveAPIView):
+class CategoryTreeView(CachedResponseMixin, ConditionalGetMixin, generics.ListAPIView):
+    """
+    Whole active category tree, nested
+    - Public access with no authentication required
+    - Built from the cached tree (one query after any category change)
+    - An inactive category hides its whole subtree
+    """
+    serializer_class = CategoryListSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = None
+    cache_generations = ('categories',)
+
+    def get_validators(self, request):
+        tree = get_category_tree()
+        return self.build_validators(request, tree['fingerprint'], tree['last_modified'])
+
+    def list(self, request, *args, **kwargs):
+        tree = get_category_tree()
+        return Response(public_tree_representation(tree, tree['roots']))
+
+
+class CategoryDetailView(ConditionalGetMixin, SparseFieldsetMixin, generics.RetrieveAPIView):
     """
     Get category details
     - Public access with no authentication required
     - Shows category with nested subcategories
+    - Validators also cover its parent and direct subcategories
     """
     serializer_class = CategoryDetailSerializer
     permission_classes = [permissions.AllowAny] 
+    last_modified_fields = ('updated_at', 'parent__updated_at')
     
     def get_queryset(self):
         # Only active categories for non-admin users
         return Category.objects.filter(is_active=True)
 
+    def get_validator_queryset(self):
+        pk = self.kwargs['pk']
+        return Category.objects.filter(models.Q(pk=pk) | models.Q(parent_id=pk))
+
 
 class CategoryCreateView(generics.CreateAPIView):
     """
@@ -74,9 +106,19 @@ class CategoryAdminListView(generics.ListAPIView):
     List ALL categories with complete hierarchy
     - Only admin users can access
     - Shows complete category tree including inactive categories
+    - Served from the cached tree, one query however deep the tree is
     """
     serializer_class = CategoryAdminSerializer
     permission_classes = [permissions.IsAdminUser]
     
     def get_queryset(self):
         return Category.objects.filter(parent__isnull=True)
+
+    def list(self, request, *args, **kwargs):
+        tree = get_category_tree()
+        page = self.paginate_queryset(tree['roots'])
+        roots = page if page is not None else tree['roots']
+        data = [admin_representation(tree, root_id) for root_id in roots]
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
@@ -0,0 +1,73 @@
+"""
+Shared cache helpers
+
+Generation counters give cheap bulk invalidation: cache keys embed the
+current generation of whatever they depend on, and a write just bumps the
+counter so every old key stops being read (and ages out on its own).
+
+The counters live in the cache backend, so with a per-process cache
+(LocMemCache) a write only bumps the counter of the process that made it.
+Fingerprints cover the others: a registered aggregate over the rows behind
+a generation (row count + latest updated_at, say), re-read from the
+database at most every CATALOG_FINGERPRINT_TIMEOUT seconds. Keys built with
+get_cache_state() change once either one does.
+"""
+
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+# name: (queryset, {alias: aggregate}), see register_fingerprint()
+fingerprint_sources = {}
+
+
+def generation_key(name):
+    return f'generation:{name}'
+
+
+def get_generation(name):
+    """Current generation number for a named group of cache entries"""
+    key = generation_key(name)
+    value = cache.get(key)
+    if value is None:
+        # Start from the clock so a cache flush can never reuse an old number
+        cache.add(key, int(time.time() * 1000), None)
+        value = cache.get(key)
+    return value
+
+
+def bump_generation(name):
+    """Invalidate every cache entry built on this generation"""
+    key = generation_key(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Key was evicted - starting again from the clock is still a new number
+        cache.set(key, int(time.time() * 1000), None)
+        return cache.get(key)
+
+
+def register_fingerprint(name, queryset, **aggregates):
+    """Describe the rows behind generation `name` with one aggregate query"""
+    fingerprint_sources[name] = (queryset, aggregates)
+
+
+def get_fingerprint(name):
+    """Short digest of the registered aggregates, '' for generations without one"""
+    source = fingerprint_sources.get(name)
+    if source is None:
+        return ''
+    key = f'fingerprint:{name}'
+    value = cache.get(key)
+    if value is None:
+        queryset, aggregates = source
+        result = queryset.order_by().aggregate(**aggregates)
+        value = hashlib.md5(repr(sorted(result.items())).encode()).hexdigest()[:12]
+        cache.set(key, value, getattr(settings, 'CATALOG_FINGERPRINT_TIMEOUT', 5))
+    return value
+
+
+def get_cache_state(names):
+    """Generation and fingerprint of each named group, for cache keys and ETags"""
+    return '.'.join(f'{get_generation(name)}-{get_fingerprint(name)}' for name in names)
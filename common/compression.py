@@ -0,0 +1,116 @@
+"""
+Precompressed response bodies
+
+Cached catalog responses are compressed once, when they are stored, and
+every later hit serves the stored bytes for the encoding the client
+negotiated (br > gzip > identity). Brotli is used only when the optional
+`brotli` package is installed.
+
+Per-endpoint statistics (bytes in/out, CPU time spent compressing, variants
+served) are kept per worker and exposed on an admin debug endpoint.
+"""
+
+import gzip
+import threading
+import time
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+def available_encodings():
+    """Supported encodings, most preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encoding, encodings=None):
+    """
+    Best encoding the client accepts (q > 0) from an Accept-Encoding header, None for identity
+    - encodings: what the caller can produce, most preferred first (default: available_encodings())
+    """
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in encodings or available_encodings():
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=getattr(settings, 'RESPONSE_COMPRESSION_BROTLI_QUALITY', 9))
+    # mtime=0 keeps the output identical for identical content
+    return gzip.compress(content, compresslevel=getattr(settings, 'RESPONSE_COMPRESSION_GZIP_LEVEL', 9), mtime=0)
+
+
+class CompressionStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def get_endpoint(self, endpoint):
+        return self.endpoints.setdefault(endpoint, {'compressed': {}, 'served': {}})
+
+    def record_compression(self, endpoint, encoding, original_size, compressed_size, cpu_seconds):
+        with self.lock:
+            stats = self.get_endpoint(endpoint)['compressed'].setdefault(
+                encoding, {'count': 0, 'original_bytes': 0, 'compressed_bytes': 0, 'cpu_seconds': 0.0}
+            )
+            stats['count'] += 1
+            stats['original_bytes'] += original_size
+            stats['compressed_bytes'] += compressed_size
+            stats['cpu_seconds'] += cpu_seconds
+
+    def record_served(self, endpoint, encoding):
+        with self.lock:
+            served = self.get_endpoint(endpoint)['served']
+            served[encoding] = served.get(encoding, 0) + 1
+
+    def report(self):
+        with self.lock:
+            report = {}
+            for endpoint, stats in self.endpoints.items():
+                compressed = {}
+                for encoding, totals in stats['compressed'].items():
+                    compressed[encoding] = dict(
+                        totals,
+                        ratio=round(totals['original_bytes'] / totals['compressed_bytes'], 2) if totals['compressed_bytes'] else None,
+                        cpu_ms_per_response=round(totals['cpu_seconds'] * 1000 / totals['count'], 3),
+                    )
+                report[endpoint] = {'compressed': compressed, 'served': dict(stats['served'])}
+            return report
+
+
+compression_stats = CompressionStats()
+
+
+def compress_variants(endpoint, content):
+    """{encoding: compressed bytes} worth storing next to `content`"""
+    if len(content) < getattr(settings, 'RESPONSE_COMPRESSION_MIN_SIZE', 512):
+        return {}
+    variants = {}
+    for encoding in available_encodings():
+        start = time.process_time()
+        compressed = compress(content, encoding)
+        cpu_seconds = time.process_time() - start
+        compression_stats.record_compression(endpoint, encoding, len(content), len(compressed), cpu_seconds)
+        if len(compressed) < len(content):
+            variants[encoding] = compressed
+    return variants
@@ -0,0 +1,196 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework.response import Response
+from .cache import get_cache_state
+from .compression import compress_variants, compression_stats, negotiate_encoding
+from .serializers import prune_queryset
+
+
+class CachedResponseMixin:
+    """
+    Cache rendered GET responses for anonymous visitors
+    - Key: scheme + host + path + normalized query params + negotiated
+      format (bodies carry absolute image and pagination URLs)
+    - Invalidation: the key embeds the generation and fingerprint of every
+      table the response depends on (cache_generations), so a write to any
+      of them makes old entries unreachable, within a few seconds when
+      another process made it (common/cache.py)
+    - Reports X-Cache: HIT / MISS
+    - br/gzip variants are compressed once when an entry is stored and
+      served to clients that accept them (common/compression.py)
+    """
+    cache_generations = ('products', 'categories')
+
+    def get(self, request, *args, **kwargs):
+        self.response_cache_key = None
+        if self.response_cache_enabled(request):
+            cache_key = self.get_response_cache_key(request)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return self.build_cached_response(cached)
+            self.response_cache_key = cache_key
+        return super().get(request, *args, **kwargs)
+
+    def response_cache_enabled(self, request):
+        # Logged-in users may see personalised data, only share anonymous pages
+        return (
+            not request.user.is_authenticated and
+            request.accepted_renderer.format == 'json'
+        )
+
+    def get_cache_generations(self, request):
+        return self.cache_generations
+
+    def get_response_cache_key(self, request):
+        query = sorted(
+            (key, sorted(value.strip() for value in values))
+            for key, values in request.query_params.lists()
+        )
+        raw = f"{request.scheme}://{request.get_host()}{request.path}|{query}|{request.accepted_renderer.format}"
+        digest = hashlib.md5(raw.encode()).hexdigest()
+        state = get_cache_state(self.get_cache_generations(request))
+        return f"catalog:response:{state}:{digest}"
+
+    def build_cached_response(self, cached):
+        # Cached entries keep their validators, so revalidation needs no query
+        not_modified = get_conditional_response(
+            self.request,
+            etag=cached['headers'].get('ETag'),
+            last_modified=parse_http_date_safe(cached['headers'].get('Last-Modified', '')),
+        )
+        if not_modified is not None:
+            not_modified['X-Cache'] = 'HIT'
+            patch_vary_headers(not_modified, ('Accept-Encoding',))
+            return not_modified
+
+        response = HttpResponse(cached['content'], status=cached['status'])
+        for header, value in cached['headers'].items():
+            response[header] = value
+        response['X-Cache'] = 'HIT'
+        return self.apply_content_encoding(response, cached)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        cache_key = getattr(self, 'response_cache_key', None)
+        if cache_key and isinstance(response, Response) and response.status_code == 200:
+            response.render()
+            cached = {
+                'content': response.content,
+                'status': response.status_code,
+                'headers': dict(response.items()),
+                'encodings': compress_variants(self.__class__.__name__, response.content),
+            }
+            cache.set(cache_key, cached, getattr(settings, 'CATALOG_RESPONSE_CACHE_TIMEOUT', 300))
+            response['X-Cache'] = 'MISS'
+            response = self.apply_content_encoding(response, cached)
+        return response
+
+    def apply_content_encoding(self, response, cached):
+        """Swap in the stored br/gzip body if the client accepts one"""
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(self.request.META.get('HTTP_ACCEPT_ENCODING'))
+        body = cached.get('encodings', {}).get(encoding)
+        if body is None:
+            encoding = None
+        else:
+            response.content = body
+            response['Content-Encoding'] = encoding
+            response['Content-Length'] = str(len(body))
+            if response.has_header('ETag') and not response['ETag'].startswith('W/'):
+                # Same rule as Django's GZipMiddleware: the bytes differ, so the ETag becomes weak
+                response['ETag'] = 'W/' + response['ETag']
+        compression_stats.record_served(self.__class__.__name__, encoding or 'identity')
+        return response
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified support for GET
+    - Single objects (pk in the URL): one aggregate query over the view's
+      rows, max of `last_modified_fields`, max of `etag_fields` and the row count
+    - Listings: an ETag from the cache generations and fingerprints the
+      response depends on, no per-request query (scanning the filtered rows
+      would cost as much as the page itself, and undo the COUNT-free cursor
+      mode; fingerprints are cached for a few seconds)
+    - A matching If-None-Match / If-Modified-Since returns 304 before the
+      real query and serialization run
+    """
+    last_modified_fields = ('updated_at',)
+    etag_fields = ()
+
+    def get_validator_queryset(self):
+        return self.get_queryset()
+
+    def get_validator_generations(self, request):
+        # Views caching their responses already declare what they depend on
+        if hasattr(self, 'get_cache_generations'):
+            return self.get_cache_generations(request)
+        return ('products', 'categories')
+
+    def get_validators(self, request):
+        """Return (etag, last_modified timestamp or None), or None if there is nothing to describe"""
+        if 'pk' not in self.kwargs:
+            fingerprint = get_cache_state(self.get_validator_generations(request))
+            return self.build_validators(request, fingerprint, None)
+
+        fields = list(self.last_modified_fields) + list(self.etag_fields)
+        aggregates = self.get_validator_queryset().order_by().aggregate(
+            row_count=Count('pk'),
+            **{f'max_{index}': Max(field) for index, field in enumerate(fields)}
+        )
+        if not aggregates['row_count'] and 'pk' in self.kwargs:
+            # Let the normal view code produce its 404
+            return None
+
+        modified = [
+            aggregates[f'max_{index}'] for index in range(len(self.last_modified_fields))
+            if aggregates[f'max_{index}'] is not None
+        ]
+        last_modified = int(max(modified).timestamp()) if modified else None
+
+        fingerprint = '|'.join(str(aggregates[key]) for key in sorted(aggregates))
+        return self.build_validators(request, fingerprint, last_modified)
+
+    def build_validators(self, request, fingerprint, last_modified):
+        # The same rows in another format or page are a different representation
+        raw = f"{request.get_full_path()}|{request.accepted_renderer.format}|{fingerprint}"
+        etag = quote_etag(hashlib.md5(raw.encode()).hexdigest())
+        return etag, last_modified
+
+    def conditional_get_enabled(self, request):
+        return True
+
+    def get(self, request, *args, **kwargs):
+        validators = self.get_validators(request) if self.conditional_get_enabled(request) else None
+        if validators is None:
+            return super().get(request, *args, **kwargs)
+
+        etag, last_modified = validators
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class SparseFieldsetMixin:
+    """
+    Fetch only what the serializer will output
+    - Works with SparseFieldsSerializerMixin serializers (?fields= / ?expand=)
+    - Columns, joins and prefetches are planned from the serializer's final
+      fields, so unrequested fields cost neither columns nor queries
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return prune_queryset(queryset, self.get_serializer())
@@ -0,0 +1,189 @@
+"""
+Sparse fieldsets and field expansion
+
+?fields=id,name,items.product.name   keep only these fields; dotted names
+                                     reach into nested serializers
+?expand=category,items.product       swap a field for the richer form listed
+                                     in the serializer's Meta.expandable_fields
+
+prune_queryset() turns the fields a serializer will actually output into
+only() / select_related() / Prefetch() calls, so unused columns and joins
+are never fetched. SerializerMethodFields declare the model fields they read
+in Meta.field_dependencies; a field whose reads are unknown disables pruning
+for that serializer rather than risking a query per row.
+"""
+
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+def parse_field_tree(value):
+    """'id,items.product.name' -> {'id': {}, 'items': {'product': {'name': {}}}}"""
+    tree = {}
+    for path in (value or '').split(','):
+        node = tree
+        for part in path.strip().split('.'):
+            if part:
+                node = node.setdefault(part, {})
+    return tree
+
+
+def get_sparse_selection(request):
+    """(fields tree or None for "all fields", expand tree) from the query string"""
+    if request is None:
+        return None, {}
+    # DRF requests have query_params, plain Django ones only GET
+    params = getattr(request, 'query_params', request.GET)
+    fields = parse_field_tree(params.get('fields'))
+    return fields or None, parse_field_tree(params.get('expand'))
+
+
+class SparseFieldsSerializerMixin:
+    """
+    ModelSerializer mixin for ?fields= and ?expand=
+    - The outermost serializer reads the query string, nested serializers
+      get their part of the selection from their parent
+    - Meta.expandable_fields: {name: serializer class}
+    - Meta.field_dependencies: {method field name: [model field paths]}
+    """
+
+    def get_sparse_selection(self):
+        selection = getattr(self, 'sparse_selection', None)
+        if selection is not None:
+            return selection
+        parent = self.parent
+        is_root = parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None)
+        if is_root:
+            return get_sparse_selection(self.context.get('request'))
+        return None, {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected, expand = self.get_sparse_selection()
+
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        for name in expand:
+            if name in expandable:
+                fields[name] = expandable[name](read_only=True)
+
+        if selected is not None:
+            fields = {name: field for name, field in fields.items() if name in selected}
+
+        # Hand each nested serializer its own part of the selection
+        for name, field in fields.items():
+            nested = field.child if isinstance(field, serializers.ListSerializer) else field
+            if isinstance(nested, SparseFieldsSerializerMixin):
+                nested_fields = (selected or {}).get(name) or None
+                nested.sparse_selection = (nested_fields, expand.get(name, {}))
+        return fields
+
+
+class QueryPlan:
+    """Columns, joins and prefetches one serializer needs from one model"""
+
+    def __init__(self, model):
+        self.model = model
+        self.columns = {model._meta.pk.name}
+        self.select = {}    # forward FK name -> QueryPlan
+        self.prefetch = {}  # reverse / many-to-many name -> QueryPlan
+
+    def relation_plan(self, name):
+        """Plan of the related model behind `name`, or None if it isn't a relation"""
+        try:
+            field = self.model._meta.get_field(name)
+        except Exception:
+            return None
+        if not field.is_relation:
+            return None
+        if field.one_to_many or field.many_to_many:
+            return self.prefetch.setdefault(name, QueryPlan(field.related_model))
+        if field.concrete:
+            # Keep the FK column itself, the join needs it
+            self.columns.add(name)
+        return self.select.setdefault(name, QueryPlan(field.related_model))
+
+    def add_path(self, path):
+        """Add a 'category__name' style model path. Returns False if it can't be planned."""
+        name, _, rest = path.partition('__')
+        try:
+            field = self.model._meta.get_field(name)
+        except Exception:
+            return False
+
+        if rest or field.one_to_many or field.many_to_many:
+            plan = self.relation_plan(name)
+            return plan is not None and (plan.add_path(rest) if rest else True)
+        if not getattr(field, 'concrete', False):
+            return False
+        self.columns.add(name)
+        return True
+
+    def add_serializer(self, serializer):
+        """Plan for everything `serializer` outputs. Returns False if anything is unknown."""
+        dependencies = getattr(getattr(serializer, 'Meta', None), 'field_dependencies', {})
+        for name, field in serializer.fields.items():
+            if isinstance(field, serializers.SerializerMethodField):
+                if name not in dependencies:
+                    return False
+                if not all(self.add_path(path) for path in dependencies[name]):
+                    return False
+                continue
+
+            if field.source == '*':
+                return False
+            source = field.source.replace('.', '__')
+            nested = field.child if isinstance(field, serializers.ListSerializer) else field
+            if isinstance(nested, serializers.BaseSerializer):
+                plan = self.relation_plan(source)
+                if plan is None or not plan.add_serializer(nested):
+                    return False
+            elif not self.add_path(source):
+                return False
+        return True
+
+    def only_columns(self, prefix=''):
+        columns = [f'{prefix}{column}' for column in self.columns]
+        for name, plan in self.select.items():
+            columns.extend(plan.only_columns(f'{prefix}{name}__'))
+        return columns
+
+    def select_related_names(self, prefix=''):
+        names = []
+        for name, plan in self.select.items():
+            names.append(f'{prefix}{name}')
+            names.extend(plan.select_related_names(f'{prefix}{name}__'))
+        return names
+
+    def prefetches(self, prefix=''):
+        lookups = []
+        for name, plan in self.select.items():
+            lookups.extend(plan.prefetches(f'{prefix}{name}__'))
+        for name, plan in self.prefetch.items():
+            field = self.model._meta.get_field(name)
+            if field.one_to_many:
+                # The FK back to the parent is needed to attach the rows
+                plan.columns.add(field.field.name)
+            related_queryset = plan.apply(field.related_model._default_manager.all())
+            lookups.append(Prefetch(f'{prefix}{name}', queryset=related_queryset))
+        return lookups
+
+    def apply(self, queryset):
+        # Replace whatever the view joined or prefetched with exactly what is needed
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if self.select:
+            queryset = queryset.select_related(*self.select_related_names())
+        lookups = self.prefetches()
+        if lookups:
+            queryset = queryset.prefetch_related(*lookups)
+        return queryset.only(*self.only_columns())
+
+
+def prune_queryset(queryset, serializer):
+    """
+    Restrict `queryset` to what `serializer` outputs. Falls back to the
+    queryset unchanged when the serializer reads something it can't plan.
+    """
+    plan = QueryPlan(queryset.model)
+    if not plan.add_serializer(serializer):
+        return queryset
+    return plan.apply(queryset)
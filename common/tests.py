@@ -1,3 +1,70 @@
-from django.test import TestCase
+import gzip
+from unittest import skipUnless
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+from categories.models import Category
+from products.models import Product
+from . import compression
+from .compression import negotiate_encoding
 
-# Create your tests here.
+
+class NegotiateEncodingTests(SimpleTestCase):
+    """Accept-Encoding parsing picks the best encoding both sides support"""
+
+    def test_preference_order_and_quality(self):
+        self.assertEqual(negotiate_encoding('gzip, br', ('br', 'gzip')), 'br')
+        self.assertEqual(negotiate_encoding('br;q=0.5, gzip', ('br', 'gzip')), 'gzip')
+        self.assertEqual(negotiate_encoding('br;q=0, *', ('br', 'gzip')), 'gzip')
+        self.assertEqual(negotiate_encoding('br', ('gzip',)), None)
+        self.assertEqual(negotiate_encoding('', ('br', 'gzip')), None)
+        self.assertEqual(negotiate_encoding('gzip;q=oops', ('gzip',)), None)
+
+
+class CachedResponseTests(TestCase):
+    """Anonymous catalog responses: one entry per host and format, served in the encoding the client accepts"""
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Electronics', slug='electronics')
+        # Enough rows to pass RESPONSE_COMPRESSION_MIN_SIZE
+        for index in range(10):
+            Product.objects.create(
+                name=f'Item {index}', description='Something to compress ' * 5, price=5, category=category
+            )
+
+    def get(self, host='localhost', **extra):
+        return APIClient(HTTP_HOST=host).get('/api/products/', secure=True, **extra)
+
+    def test_variants_decode_to_the_identity_body(self):
+        identity = self.get()
+        self.assertEqual(identity['X-Cache'], 'MISS')
+        self.assertIn('Accept-Encoding', identity['Vary'])
+
+        compressed = self.get(HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compressed['X-Cache'], 'HIT')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), identity.content)
+        # Different bytes, so the ETag is weak, and it still revalidates
+        self.assertEqual(compressed['ETag'], f"W/{identity['ETag']}")
+        not_modified = self.get(HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=compressed['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    @skipUnless(compression.brotli is not None, "needs the optional brotli package")
+    def test_brotli_is_preferred_when_installed(self):
+        identity = self.get()
+        compressed = self.get(HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(compressed['Content-Encoding'], 'br')
+        self.assertEqual(compression.brotli.decompress(compressed.content), identity.content)
+
+    def test_hosts_and_formats_get_their_own_entries(self):
+        self.get()
+        self.assertEqual(self.get()['X-Cache'], 'HIT')
+
+        # Bodies carry absolute URLs, another host must not see these
+        self.assertEqual(self.get(host='127.0.0.1')['X-Cache'], 'MISS')
+
+        # The browsable API isn't cached, and never gets the JSON entry
+        browsable = self.get(HTTP_ACCEPT='text/html')
+        self.assertFalse(browsable.has_header('X-Cache'))
+        self.assertTrue(browsable['Content-Type'].startswith('text/html'))
@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
\ No newline at end of file
+application = get_asgi_application()
+
+# Load in-memory catalog indexes before the first request
+from products.warmup import warm_up  # noqa: E402
+
+warm_up()
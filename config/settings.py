@@ -283,9 +283,48 @@ SWAGGER_SETTINGS = {
 
 # Custom settings
 MAX_PRODUCT_IMAGES = 5
-ORDER_TIMEOUT_MINUTES = 30
+PRODUCT_IMAGE_VARIANTS = {  # name: bounding box, generated as original format + WebP
+    'thumbnail': (200, 200),
+    'medium': (600, 600),
+}
+PRODUCT_SKU_BLOCK_SIZE = 50  # SKU suffixes a worker reserves per counter update
+PRODUCT_BULK_UPDATE_MAX_ENTRIES = 5000  # entries per admin bulk update request
+PRODUCT_FEED_CHUNK_SIZE = 2000  # rows fetched per round trip by the product feed export
+PRODUCT_POPULARITY_HALF_LIFE_DAYS = 7  # a sale's weight in the best-seller score halves this often
+PRODUCT_POPULARITY_WINDOW_DAYS = 90  # sales older than this don't count at all
+PRODUCT_RELATED_LIMIT = 10  # "customers also bought" products kept per product
+PRODUCT_RELATED_METRIC = 'cosine'  # or 'lift'
+PRODUCT_RELATED_MIN_COUNT = 2  # orders a pair must share to be recommended
+PRODUCT_RELATED_MAX_BASKET_SIZE = 50  # bigger orders are left out of the co-purchase counts
+RECENTLY_VIEWED_LIMIT = 20  # products kept per visitor
+RECENTLY_VIEWED_FLUSH_SECONDS = 300  # minimum time between bulk database writes of the changed buffers
+RECENTLY_VIEWED_RETENTION_DAYS = 90  # rows untouched this long are pruned (anonymous ones after the cookie expires)
+INVENTORY_SNAPSHOT_CACHE_TIMEOUT = 3600  # seconds, snapshots only change when compact_inventory runs
+INVENTORY_LEDGER_RETENTION_DAYS = 365  # movements older than this are folded away
+ORDER_TIMEOUT_MINUTES = 30  # how long cart items hold their stock (cart/holds.py)
 CART_SESSION_ID = 'cart'
 
+# Product listing counts
+PRODUCT_COUNT_CACHE_TIMEOUT = 300  # seconds
+PRODUCT_COUNT_ESTIMATE_THRESHOLD = 100000  # rows before PostgreSQL uses planner estimates
+CATEGORY_TREE_CACHE_TIMEOUT = 3600  # seconds
+PRODUCT_FEATURED_REFRESH_SECONDS = 60  # how often a worker compares its featured snapshot with the database
+CATALOG_RESPONSE_CACHE_TIMEOUT = 300  # seconds, anonymous catalog GET responses
+CATALOG_FINGERPRINT_TIMEOUT = 5  # seconds before a worker re-reads table fingerprints, bounds how long other processes' writes go unseen
+RESPONSE_COMPRESSION_MIN_SIZE = 512  # bytes, smaller cached responses are stored uncompressed
+RESPONSE_COMPRESSION_GZIP_LEVEL = 9  # compressed once per cache entry, so use the best levels
+RESPONSE_COMPRESSION_BROTLI_QUALITY = 9  # br needs the optional 'brotli' package
+
+# Search facets
+PRODUCT_FACET_PRICE_STEP = 10  # finest price histogram bucket width
+PRODUCT_FACET_MAX_BUCKETS = 10
+PRODUCT_SPELLING_REFRESH_SECONDS = 60  # how often a worker compares its "did you mean" index with the database
+
+# Search autocomplete
+PRODUCT_AUTOCOMPLETE_SNAPSHOT = os.path.join(BASE_DIR, 'var', 'autocomplete.json')
+PRODUCT_AUTOCOMPLETE_REFRESH_SECONDS = 60  # minimum time between rebuilds after catalog writes
+PRODUCT_AUTOCOMPLETE_PREFIX_CACHE_LENGTH = 2  # prefixes up to this length are precomputed
+
 # File upload settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
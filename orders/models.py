@@ -1,9 +1,18 @@
-from django.db import models
+import string
+from django.db import models, transaction
 from django.conf import settings
 from django.utils import timezone
+from django.utils.crypto import get_random_string
 from products.models import Product 
+from products.inventory import record_movements
+from products.popularity import record_order_sales, remove_order_sales
+from .stock import order_quantities, reserve_stock, restock
 from users.models import User
 
+ORDER_NUMBER_CHARS = string.ascii_uppercase + string.digits
+REOPEN_ERROR = "A cancelled order can't be reopened, its stock was already released"
+
+
 class Order(models.Model):
     # Order status
     STATUS_CHOICES = [
@@ -29,39 +38,74 @@ class Order(models.Model):
 
     @classmethod
     def create_from_cart(cls, cart, shipping_address):
-        # Generate unique order number
-        order_number = f"ORD-{timezone.now().strftime('%Y%m%d%H%M%S')}"
-        
-        # Create the order first with temporary total
-        order = cls.objects.create(
-            user=cart.user,
-            order_number=order_number,
-            shipping_address=shipping_address,
-            total_amount=0,  
-            status='pending'
-        )
-        
-    
-        total = 0
-        for cart_item in cart.items.all():
-            # Create OrderItem for each CartItem
-            OrderItem.objects.create(
-                order=order,
-                product=cart_item.product,
-                quantity=cart_item.quantity,
-                price=cart_item.product.price 
+        """
+        Create an order from the cart, taking its items out of stock
+        - Raises InsufficientStock (nothing is saved) if any item is short
+        """
+        cart_items = list(cart.items.select_related('product'))
+        quantities = order_quantities((item.product_id, item.quantity) for item in cart_items)
+
+        with transaction.atomic():
+            # Stock first: a shortfall rolls everything back before the order exists
+            reserve_stock(quantities, own_items=[item.pk for item in cart_items])
+
+            # Timestamp plus a random part, so simultaneous checkouts get different numbers
+            order_number = f"ORD-{timezone.now().strftime('%y%m%d%H%M%S')}{get_random_string(4, ORDER_NUMBER_CHARS)}"
+            order = cls.objects.create(
+                user=cart.user,
+                order_number=order_number,
+                shipping_address=shipping_address,
+                total_amount=sum(item.product.price * item.quantity for item in cart_items),
+                status='pending'
             )
-            total += cart_item.product.price * cart_item.quantity
-        
-        # Update order total with actual calculated amount
-        order.total_amount = total
-        order.save()
-        
-        # Clear cart after successful order creation
-        cart.items.all().delete()
-        
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=item.product, quantity=item.quantity, price=item.product.price)
+                for item in cart_items
+            ])
+            record_movements('sale', {product_id: -quantity for product_id, quantity in quantities.items()}, order_number)
+
+            # Clear cart after successful order creation (their stock holds go with them)
+            cart.items.all().delete()
+
+            # Count the sale towards the best-seller ranking (rows already locked above)
+            record_order_sales(order)
+
         return order
 
+    def cancel(self):
+        """
+        Cancel the order and put its items back in stock
+        - The status change is claimed by a conditional UPDATE, so concurrent
+          cancellations (user cancel + refund, say) restock only once
+        - Returns False if the order was already cancelled
+        """
+        with transaction.atomic():
+            claimed = Order.objects.filter(pk=self.pk).exclude(status='cancelled').update(status='cancelled')
+            if claimed:
+                self.release_items()
+        self.status = 'cancelled'
+        return bool(claimed)
+
+    def set_status(self, status):
+        """
+        Move the order to `status`, cancelling through cancel()
+        - A cancelled order stays cancelled: its stock was put back and may
+          already be sold again. Claimed by a conditional UPDATE like cancel(),
+          returns False if the order was (or meanwhile got) cancelled
+        """
+        if status == 'cancelled':
+            return self.cancel()
+        updated = Order.objects.filter(pk=self.pk).exclude(status='cancelled').update(status=status)
+        self.status = status if updated else 'cancelled'
+        return bool(updated)
+
+    def release_items(self):
+        """Undo what checkout did for a now-cancelled order: restock (one UPDATE, logged in the ledger) and un-count the sale"""
+        quantities = order_quantities(self.items.values_list('product_id', 'quantity'))
+        restock(quantities)
+        record_movements('cancel', quantities, self.order_number)
+        remove_order_sales(self)
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
@@ -72,4 +116,5 @@ class OrderItem(models.Model):
         app_label = 'orders'
 
     def __str__(self):
-        return f"{self.quantity} x {self.product.name} in Order {self.order.order_number}"
\ No newline at end of file
+        return f"{self.quantity} x {self.product.name} in Order {self.order.order_number}"
+
@@ -1,8 +1,9 @@
 from rest_framework import serializers
 from .models import Order, OrderItem
 from products.serializers import ProductListSerializer
+from common.serializers import SparseFieldsSerializerMixin
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     """Serializer for individual order items"""
     product = ProductListSerializer(read_only=True)
     item_total = serializers.SerializerMethodField()
@@ -11,13 +12,14 @@ class OrderItemSerializer(serializers.ModelSerializer):
         model = OrderItem
         fields = ['id', 'product', 'quantity', 'price', 'item_total']
         read_only_fields = ['price', 'item_total']
+        field_dependencies = {'item_total': ['quantity', 'price']}
     
     def get_item_total(self, obj):
         """Calculate total for this order item"""
         return obj.quantity * obj.price
 
 
-class OrderListSerializer(serializers.ModelSerializer):
+class OrderListSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     """Serializer for order listings (basic info)"""
     total_items = serializers.SerializerMethodField()
     
@@ -28,14 +30,15 @@ class OrderListSerializer(serializers.ModelSerializer):
             'created_at', 'total_items'
         ]
         read_only_fields = ['order_number', 'total_amount', 'status']
+        field_dependencies = {'total_items': ['items__quantity']}
     
     def get_total_items(self, obj):
         """Calculate total number of items in order"""
         return sum(item.quantity for item in obj.items.all())
 
 
-class OrderDetailSerializer(serializers.ModelSerializer):
-    """Serializer for detailed order view"""
+class OrderDetailSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    """Serializer for detailed order view (?fields=items.product.name etc. trims the nested products)"""
     items = OrderItemSerializer(many=True, read_only=True)
     total_items = serializers.SerializerMethodField()
     user_email = serializers.CharField(source='user.email', read_only=True)
@@ -49,6 +52,7 @@ class OrderDetailSerializer(serializers.ModelSerializer):
         read_only_fields = [
             'order_number', 'user', 'total_amount', 'status', 'created_at'
         ]
+        field_dependencies = {'total_items': ['items__quantity']}
     
     def get_total_items(self, obj):
         """Calculate total number of items in order"""
@@ -0,0 +1,25 @@
+from django.core.exceptions import ValidationError
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+from .models import REOPEN_ERROR, Order
+
+
+@receiver(pre_save, sender=Order)
+def remember_previous_status(sender, instance, raw=False, **kwargs):
+    # Cancellations restock from it, and nothing may move an order out of cancelled
+    instance._previous_status = None
+    if raw or not instance.pk:
+        return
+    instance._previous_status = (
+        Order.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+    )
+    if instance._previous_status == 'cancelled' and instance.status != 'cancelled':
+        raise ValidationError({'status': REOPEN_ERROR})
+
+
+@receiver(post_save, sender=Order)
+def order_cancelled(sender, instance, created=False, **kwargs):
+    # Order.cancel() updates the row directly; this covers plain save()s (Django admin)
+    previous_status = getattr(instance, '_previous_status', None)
+    if not created and instance.status == 'cancelled' and previous_status not in (None, 'cancelled'):
+        instance.release_items()
@@ -0,0 +1,82 @@
+"""
+Stock reservation for checkout and restock on cancellation
+
+Checkout never reads stock and writes it back (two concurrent checkouts
+would both see the same number and oversell). Each product is decremented
+with a conditional UPDATE:
+
+    UPDATE product SET stock_quantity = stock_quantity - qty
+    WHERE id = ... AND stock_quantity >= qty
+
+which the database applies atomically, so it either takes the whole
+quantity or matches no row. Products are updated in id order, so two
+checkouts locking the same rows always lock them in the same order and
+can't deadlock. All of it runs inside the caller's transaction: one
+shortfall rolls back every decrement of that checkout.
+
+Stock other carts hold (cart/holds.py) isn't available to this checkout:
+the condition is really stock_quantity >= qty + held by others.
+"""
+
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from cart.holds import available_quantities, held_subquery
+from products.models import Product
+
+
+class InsufficientStock(Exception):
+    """Raised by reserve_stock. `shortfalls`: [{product_id, name, requested, available}]"""
+
+    def __init__(self, shortfalls):
+        self.shortfalls = shortfalls
+        super().__init__(f"Not enough stock for {len(shortfalls)} product(s)")
+
+
+def reserve_stock(quantities, own_items=()):
+    """
+    Take {product_id: quantity} out of stock, or raise InsufficientStock
+    listing every product that is short. Must run inside transaction.atomic().
+    own_items: ids of the cart items being checked out, their holds are ours to use.
+    """
+    if not transaction.get_connection().in_atomic_block:
+        raise RuntimeError("reserve_stock() must run inside transaction.atomic()")
+
+    held_by_others = held_subquery(own_items)
+    short = {}
+    for product_id in sorted(quantities):
+        requested = quantities[product_id]
+        updated = Product.objects.filter(
+            pk=product_id, stock_quantity__gte=Value(requested) + held_by_others
+        ).update(stock_quantity=F('stock_quantity') - requested)
+        if not updated:
+            short[product_id] = requested
+
+    if short:
+        available = available_quantities(short, own_items)
+        names = Product.objects.filter(pk__in=short).values_list('pk', 'name')
+        raise InsufficientStock([
+            {'product_id': product_id, 'name': name, 'requested': short[product_id], 'available': available[product_id]}
+            for product_id, name in sorted(names)
+        ])
+
+
+def restock(quantities):
+    """Put {product_id: quantity} back in stock with one UPDATE ... CASE"""
+    if not quantities:
+        return 0
+    return Product.objects.filter(pk__in=quantities).update(
+        stock_quantity=F('stock_quantity') + Case(
+            *[When(pk=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    )
+
+
+def order_quantities(items):
+    """{product_id: total quantity} from (product_id, quantity) pairs"""
+    quantities = defaultdict(int)
+    for product_id, quantity in items:
+        quantities[product_id] += quantity
+    return dict(quantities)
@@ -1,3 +1,142 @@
-from django.test import TestCase
+import threading
+import time
+from django.core.exceptions import ValidationError
+from django.db import OperationalError, connection
+from django.test import TransactionTestCase
+from rest_framework.test import APIClient
+from cart.models import Cart, CartItem
+from categories.models import Category
+from payments.models import Payment
+from products.models import Product
+from users.models import User
+from .models import Order
+from .stock import InsufficientStock
 
-# Create your tests here.
+
+class ConcurrentCheckoutTests(TransactionTestCase):
+    """Checkouts racing for the same stock must never oversell"""
+
+    buyers = 12
+    stock = 5
+
+    def setUp(self):
+        category = Category.objects.create(name='Electronics', slug='electronics')
+        self.product = Product.objects.create(
+            name='Phone', description='A phone', price=100, category=category, stock_quantity=self.stock
+        )
+        self.other = Product.objects.create(
+            name='Case', description='A case', price=10, category=category, stock_quantity=1000
+        )
+        self.carts = []
+        for index in range(self.buyers):
+            user = User.objects.create_user(
+                email=f'buyer{index}@example.com', username=f'buyer{index}', password='password'
+            )
+            cart = Cart.objects.create(user=user)
+            CartItem.objects.create(cart=cart, product=self.other, quantity=1)
+            CartItem.objects.create(cart=cart, product=self.product, quantity=1)
+            self.carts.append(cart)
+
+    def checkout(self, cart, barrier, results):
+        try:
+            barrier.wait()
+            while True:
+                try:
+                    Order.create_from_cart(cart, 'Nairobi')
+                    results.append('ok')
+                    return
+                except InsufficientStock as e:
+                    results.append(e.shortfalls)
+                    return
+                except OperationalError:
+                    # SQLite serializes writers and reports the others as locked; retry
+                    time.sleep(0.01)
+        finally:
+            connection.close()
+
+    def test_concurrent_checkouts_do_not_oversell(self):
+        barrier = threading.Barrier(self.buyers)
+        results = []
+        threads = [
+            threading.Thread(target=self.checkout, args=(cart, barrier, results))
+            for cart in self.carts
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        successes = results.count('ok')
+        self.assertEqual(len(results), self.buyers)
+        self.assertEqual(successes, self.stock)
+        self.assertEqual(Order.objects.count(), self.stock)
+
+        self.product.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 0)
+        # Failed checkouts roll back their other decrements too
+        self.assertEqual(self.other.stock_quantity, 1000 - successes)
+        for shortfalls in results:
+            if shortfalls != 'ok':
+                self.assertEqual([item['product_id'] for item in shortfalls], [self.product.pk])
+                self.assertEqual(shortfalls[0]['available'], 0)
+
+    def test_cancel_restocks_once(self):
+        order = Order.create_from_cart(self.carts[0], 'Nairobi')
+        self.assertTrue(order.cancel())
+        self.assertFalse(Order.objects.get(pk=order.pk).cancel())
+
+        self.product.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, self.stock)
+        self.assertEqual(self.other.stock_quantity, 1000)
+
+
+class CancelledOrderTests(TransactionTestCase):
+    """A cancelled order released its stock, so nothing may move it back to a live status"""
+
+    def setUp(self):
+        category = Category.objects.create(name='Electronics', slug='electronics')
+        self.product = Product.objects.create(
+            name='Phone', description='A phone', price=100, category=category, stock_quantity=5
+        )
+        user = User.objects.create_user(email='canceller@example.com', username='canceller', password='password')
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=2)
+        self.order = Order.create_from_cart(cart, 'Nairobi')
+        self.payment = Payment.objects.create(
+            order=self.order, payment_method='card', amount=self.order.total_amount, status='refunded'
+        )
+        self.order.cancel()
+
+    def assert_still_cancelled(self):
+        self.order.refresh_from_db()
+        self.product.refresh_from_db()
+        self.assertEqual(self.order.status, 'cancelled')
+        self.assertEqual(self.product.stock_quantity, 5)
+
+    def test_set_status_refuses_to_reopen(self):
+        self.assertFalse(Order.objects.get(pk=self.order.pk).set_status('pending'))
+        self.assert_still_cancelled()
+
+    def test_plain_save_refuses_to_reopen(self):
+        order = Order.objects.get(pk=self.order.pk)
+        order.status = 'confirmed'
+        with self.assertRaises(ValidationError):
+            order.save()
+        self.assert_still_cancelled()
+
+    def test_completing_payment_of_cancelled_order_rolls_back(self):
+        admin = User.objects.create_superuser(
+            email='payments-admin@example.com', username='payments-admin', password='password'
+        )
+        client = APIClient(HTTP_HOST='localhost')
+        client.force_authenticate(admin)
+
+        response = client.patch(
+            f'/api/payments/admin/{self.payment.pk}/status/', {'status': 'completed'}, format='json', secure=True
+        )
+        self.assertEqual(response.status_code, 400)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'refunded')
+        self.assert_still_cancelled()
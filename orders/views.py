@@ -1,9 +1,11 @@
 import threading  
-from rest_framework import generics, permissions, status
+from rest_framework import generics, permissions, serializers, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from django.shortcuts import get_object_or_404
-from .models import Order, OrderItem
+from common.mixins import SparseFieldsetMixin
+from .models import REOPEN_ERROR, Order, OrderItem
+from .stock import InsufficientStock
 from .serializers import (
     OrderListSerializer,
     OrderDetailSerializer,
@@ -14,7 +16,7 @@ from .serializers import (
 from cart.models import Cart
 from .utils import send_order_confirmation, send_new_order_notification
 
-class OrderListView(generics.ListAPIView):
+class OrderListView(SparseFieldsetMixin, generics.ListAPIView):
     """
     Get user's order history
     - User must be logged in
@@ -28,7 +30,7 @@ class OrderListView(generics.ListAPIView):
         return Order.objects.filter(user=self.request.user).order_by('-created_at')
 
 
-class OrderDetailView(generics.RetrieveAPIView):
+class OrderDetailView(SparseFieldsetMixin, generics.RetrieveAPIView):
     """
     Get order details
     - User must be logged in
@@ -93,6 +95,11 @@ def create_order(request):
                 status=status.HTTP_201_CREATED
             )
             
+        except InsufficientStock as e:
+            return Response(
+                {"error": "Some items are out of stock.", "shortfalls": e.shortfalls},
+                status=status.HTTP_409_CONFLICT
+            )
         except Exception as e:
             return Response(
                 {"error": f"Failed to create order: {str(e)}"},
@@ -110,6 +117,7 @@ def cancel_order(request, order_id):
     - User must be logged in
     - Users can only cancel their own orders
     - Only pending/confirmed orders can be cancelled
+    - Items go back in stock
     """
     order = get_object_or_404(Order, id=order_id, user=request.user)
     
@@ -119,9 +127,8 @@ def cancel_order(request, order_id):
     )
     
     if serializer.is_valid():
-        # Update order status to cancelled
-        order.status = 'cancelled'
-        order.save()
+        # Update order status to cancelled and restock its items
+        order.cancel()
         
         return Response(
             {"message": "Order cancelled successfully"},
@@ -131,7 +138,7 @@ def cancel_order(request, order_id):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class AdminOrderListView(generics.ListAPIView):
+class AdminOrderListView(SparseFieldsetMixin, generics.ListAPIView):
     """
     Get all orders (Admin only)
     - Admin users only
@@ -142,7 +149,7 @@ class AdminOrderListView(generics.ListAPIView):
     queryset = Order.objects.all().order_by('-created_at')
 
 
-class AdminOrderDetailView(generics.RetrieveAPIView):
+class AdminOrderDetailView(SparseFieldsetMixin, generics.RetrieveAPIView):
     """
     Get order details (Admin only)
     - Admin users only
@@ -158,7 +165,14 @@ class AdminOrderStatusView(generics.UpdateAPIView):
     Update order status (Admin only)
     - Admin users only
     - Validates status transitions
+    - Cancelling restocks the order's items
     """
     serializer_class = OrderStatusSerializer
     permission_classes = [permissions.IsAdminUser]
-    queryset = Order.objects.all()
\ No newline at end of file
+    queryset = Order.objects.all()
+
+    def perform_update(self, serializer):
+        # Conditional UPDATE: the order may have been cancelled since it was validated
+        new_status = serializer.validated_data.get('status')
+        if new_status and not serializer.instance.set_status(new_status):
+            raise serializers.ValidationError({'status': [REOPEN_ERROR]})
\ No newline at end of file
@@ -1,6 +1,7 @@
-from rest_framework import generics, permissions, status
+from rest_framework import generics, permissions, serializers, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from .models import Payment
 from .serializers import (
@@ -11,7 +12,7 @@ from .serializers import (
     PaymentRefundSerializer,
     MockPaymentSerializer
 )
-from orders.models import Order
+from orders.models import REOPEN_ERROR, Order
 
 class UserPaymentsListView(generics.ListAPIView):
     """
@@ -82,19 +83,20 @@ def process_mock_payment(request, payment_id):
         success = serializer.validated_data['success']
         transaction_id = serializer.validated_data['transaction_id']
         
-        if success:
-            # Simulate successful payment
-            payment.status = 'completed'
-            payment.transaction_id = transaction_id
+        with transaction.atomic():
+            if success:
+                # Update order status to confirmed (unless it was cancelled meanwhile)
+                if not payment.order.set_status('confirmed'):
+                    return Response({"error": REOPEN_ERROR}, status=status.HTTP_409_CONFLICT)
+
+                # Simulate successful payment
+                payment.status = 'completed'
+                payment.transaction_id = transaction_id
+            else:
+                # Simulate failed payment
+                payment.status = 'failed'
             
-            # Update order status to confirmed
-            payment.order.status = 'confirmed'
-            payment.order.save()
-        else:
-            # Simulate failed payment
-            payment.status = 'failed'
-        
-        payment.save()
+            payment.save()
         
         return Response({
             "message": "Payment processed successfully" if success else "Payment failed",
@@ -130,12 +132,13 @@ def request_refund(request, payment_id):
         refund_amount = serializer.validated_data.get('refund_amount', payment.amount)
         
         
-        payment.status = 'refunded'
-        payment.save()
-        
-        # Update order status to cancelled
-        payment.order.status = 'cancelled'
-        payment.order.save()
+        # Both or neither: a refunded payment never sits on a live order
+        with transaction.atomic():
+            payment.status = 'refunded'
+            payment.save()
+            
+            # Update order status to cancelled and restock its items
+            payment.order.cancel()
         
         return Response({
             "message": "Refund request submitted successfully",
@@ -180,18 +183,18 @@ class AdminPaymentStatusView(generics.UpdateAPIView):
     queryset = Payment.objects.all()
     
     def perform_update(self, serializer):
-        payment = serializer.save()
-        
-        # Update order status based on payment status
-        if payment.status == 'completed':
-            payment.order.status = 'confirmed'
-            payment.order.save()
-        elif payment.status in ['failed', 'cancelled']:
-            payment.order.status = 'pending'
-            payment.order.save()
-        elif payment.status == 'refunded':
-            payment.order.status = 'cancelled'
-            payment.order.save()
+        # Payment and order change together or not at all
+        with transaction.atomic():
+            payment = serializer.save()
+            
+            # Update order status based on payment status (a cancelled order stays cancelled)
+            if payment.status == 'completed':
+                if not payment.order.set_status('confirmed'):
+                    raise serializers.ValidationError({'status': [REOPEN_ERROR]})
+            elif payment.status in ['failed', 'cancelled']:
+                payment.order.set_status('pending')
+            elif payment.status == 'refunded':
+                payment.order.cancel()
 
 
 @api_view(['POST'])
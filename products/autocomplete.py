@@ -0,0 +1,257 @@
+"""
+Search-as-you-type autocomplete
+
+A sorted array of lowercase keys (every word-start suffix of each active
+product name and category name) searched with bisect, so a lookup is a
+binary search plus a short scan. Results are ranked by popularity. The top
+results for very short prefixes, which would otherwise scan most of the
+array, are precomputed when the index is built.
+
+Workers load the index from a JSON snapshot at startup (products/warmup.py)
+instead of querying the database. Catalog writes and popularity refreshes
+change the products/categories/popularity cache state (generation or
+database fingerprint, common/cache.py), after which the index is rebuilt at
+most once per PRODUCT_AUTOCOMPLETE_REFRESH_SECONDS. The rebuild runs in a
+background thread; requests keep answering from the old index meanwhile.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Max, Q, Sum
+from common.cache import get_cache_state
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+GENERATIONS = ('products', 'categories', 'popularity')
+FEATURED_BONUS = 5
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+
+
+def normalize(text):
+    return ' '.join(text.lower().split())
+
+
+def word_starts(name):
+    """'Samsung Galaxy Phone' -> ['samsung galaxy phone', 'galaxy phone', 'phone']"""
+    words = normalize(name).split(' ')
+    return [' '.join(words[index:]) for index in range(len(words)) if words[index]]
+
+
+def get_popularity_scores():
+    """Best-seller score per product (products/popularity.py) plus a bonus for featured products"""
+    from .models import Product
+
+    scores = {}
+    rows = Product.objects.filter(is_active=True).filter(
+        Q(popularity_score__gt=0) | Q(is_featured=True)
+    ).values_list('id', 'popularity_score', 'is_featured')
+    for product_id, score, is_featured in rows:
+        scores[product_id] = round(score, 2) + (FEATURED_BONUS if is_featured else 0)
+    return scores
+
+
+def get_source_version():
+    """Cheap fingerprint of the indexed rows, used to tell whether a snapshot is current"""
+    from categories.models import Category
+    from .models import Product
+
+    # Popularity refreshes don't touch updated_at, the score total catches them
+    products = Product.objects.order_by().aggregate(
+        count=Count('id'), changed=Max('updated_at'), popularity=Sum('popularity_score')
+    )
+    categories = Category.objects.order_by().aggregate(count=Count('id'), changed=Max('updated_at'))
+    return '|'.join(str(value) for value in (
+        products['count'], products['changed'], products['popularity'],
+        categories['count'], categories['changed'],
+    ))
+
+
+def build_entries():
+    """[type, id, name, score, extra] rows for everything the index should contain"""
+    from categories.models import Category
+    from .models import Product
+
+    scores = get_popularity_scores()
+    entries = []
+    category_scores = {}
+    products = Product.objects.filter(is_active=True).values_list('id', 'name', 'category_id', 'category__name')
+    for product_id, name, category_id, category_name in products:
+        score = scores.get(product_id, 0)
+        category_scores[category_id] = category_scores.get(category_id, 0) + score
+        entries.append(['product', product_id, name, score, category_name])
+
+    for category_id, name, slug in Category.objects.filter(is_active=True).values_list('id', 'name', 'slug'):
+        entries.append(['category', category_id, name, category_scores.get(category_id, 0), slug])
+    return entries
+
+
+class AutocompleteIndex:
+    """
+    Immutable once built - refreshing swaps in a new instance, so lookups
+    never need a lock
+    """
+
+    def __init__(self, entries, source_version=None, built_at=None):
+        self.entries = entries
+        self.source_version = source_version
+        self.built_at = built_at or time.time()
+
+        pairs = sorted(
+            (key, entry_index)
+            for entry_index, entry in enumerate(entries)
+            for key in word_starts(entry[2])
+        )
+        self.keys = [key for key, _ in pairs]
+        self.entry_ids = [entry_index for _, entry_index in pairs]
+
+        # Short prefixes match a large part of the array, answer them from a table
+        self.prefix_length = getattr(settings, 'PRODUCT_AUTOCOMPLETE_PREFIX_CACHE_LENGTH', 2)
+        self.prefix_results = {}
+        for length in range(1, self.prefix_length + 1):
+            grouped = {}
+            for key, entry_index in pairs:
+                if len(key) >= length:
+                    grouped.setdefault(key[:length], set()).add(entry_index)
+            for prefix, entry_indexes in grouped.items():
+                self.prefix_results[prefix] = self.rank(entry_indexes)[:MAX_LIMIT]
+
+    def rank(self, entry_indexes):
+        # Most popular first, then alphabetical so ties are stable
+        return sorted(entry_indexes, key=lambda index: (-self.entries[index][3], self.entries[index][2].lower()))
+
+    def lookup(self, prefix, limit=DEFAULT_LIMIT):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        if len(prefix) <= self.prefix_length:
+            ranked = self.prefix_results.get(prefix, [])
+        else:
+            matches = set()
+            position = bisect_left(self.keys, prefix)
+            while position < len(self.keys) and self.keys[position].startswith(prefix):
+                matches.add(self.entry_ids[position])
+                position += 1
+            ranked = self.rank(matches)
+        return [self.serialize(self.entries[index]) for index in ranked[:limit]]
+
+    def serialize(self, entry):
+        kind, object_id, name, score, extra = entry
+        result = {'type': kind, 'id': object_id, 'name': name}
+        if kind == 'product':
+            result['category_name'] = extra
+        else:
+            result['slug'] = extra
+        return result
+
+    def to_snapshot(self):
+        return {
+            'version': SNAPSHOT_VERSION,
+            'built_at': self.built_at,
+            'source_version': self.source_version,
+            'entries': self.entries,
+        }
+
+
+class AutocompleteService:
+    """Holds the current index for this worker and decides when to reload it"""
+
+    def __init__(self):
+        self.index = None
+        self.generations = None
+        self.lock = threading.Lock()
+        self.refresh_thread = None
+
+    def get_snapshot_path(self):
+        return getattr(
+            settings, 'PRODUCT_AUTOCOMPLETE_SNAPSHOT',
+            os.path.join(settings.BASE_DIR, 'var', 'autocomplete.json'),
+        )
+
+    def current_generations(self):
+        return get_cache_state(GENERATIONS)
+
+    def build(self, write_snapshot=True):
+        """Rebuild from the database (and save the snapshot for other workers)"""
+        # Read before the rows, so a write landing mid-build triggers another rebuild
+        generations = self.current_generations()
+        source_version = get_source_version()
+        index = AutocompleteIndex(build_entries(), source_version=source_version)
+        if write_snapshot:
+            try:
+                self.write_snapshot(index)
+            except OSError as e:
+                logger.warning("Could not write autocomplete snapshot: %s", e)
+        self.install(index, generations)
+        return index
+
+    def install(self, index, generations=None):
+        self.index = index
+        self.generations = generations or self.current_generations()
+
+    def write_snapshot(self, index):
+        path = self.get_snapshot_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so a worker booting meanwhile never reads half a file
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as snapshot_file:
+            json.dump(index.to_snapshot(), snapshot_file, separators=(',', ':'))
+        os.replace(temporary_path, path)
+
+    def read_snapshot(self):
+        try:
+            with open(self.get_snapshot_path(), encoding='utf-8') as snapshot_file:
+                data = json.load(snapshot_file)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != SNAPSHOT_VERSION:
+            return None
+        return AutocompleteIndex(data['entries'], data.get('source_version'), data.get('built_at'))
+
+    def load(self):
+        """Startup: use the snapshot if it still matches the database, rebuild otherwise"""
+        with self.lock:
+            index = self.read_snapshot()
+            if index is not None and index.source_version == get_source_version():
+                self.install(index)
+            else:
+                self.build()
+        return self.index
+
+    def get_index(self):
+        if self.index is None:
+            return self.load()
+
+        if self.generations != self.current_generations():
+            refresh_seconds = getattr(settings, 'PRODUCT_AUTOCOMPLETE_REFRESH_SECONDS', 60)
+            # Only one thread rebuilds, off the request path; everyone keeps answering from the old index
+            if time.time() - self.index.built_at >= refresh_seconds and self.lock.acquire(blocking=False):
+                self.refresh_thread = threading.Thread(target=self.refresh, name='autocomplete-refresh', daemon=True)
+                self.refresh_thread.start()
+        return self.index
+
+    def refresh(self):
+        """Background rebuild started by get_index(), holding self.lock"""
+        try:
+            self.build()
+        except Exception as e:
+            logger.warning("Could not rebuild autocomplete index: %s", e)
+            # Keep serving the old index until the next catalog write
+            self.generations = self.current_generations()
+        finally:
+            self.lock.release()
+            # The thread's own connection would otherwise stay open until the process exits
+            connection.close()
+
+    def lookup(self, prefix, limit=DEFAULT_LIMIT):
+        return self.get_index().lookup(prefix, limit)
+
+
+autocomplete = AutocompleteService()
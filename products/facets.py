@@ -0,0 +1,107 @@
+"""
+Search facets: category hit counts and price histogram
+
+Everything comes from ONE grouped query over the filtered product queryset,
+grouped by (category, fine price bucket). Category roll-ups through the MPTT
+tree, the overall price range and the display histogram are then derived
+in Python from those few grouped rows.
+"""
+
+import math
+from decimal import Decimal
+from django.conf import settings
+from django.db.models import Count, DecimalField, F, IntegerField, Max, Min, Value
+from django.db.models.functions import Floor
+from categories.tree import get_ancestor_ids, get_category_nodes
+
+
+def build_facets(queryset, max_buckets=None):
+    step = Decimal(str(getattr(settings, 'PRODUCT_FACET_PRICE_STEP', 10)))
+    max_buckets = max_buckets or getattr(settings, 'PRODUCT_FACET_MAX_BUCKETS', 10)
+
+    # Single grouped pass over the same filtered products
+    groups = list(
+        queryset.order_by()
+        .annotate(
+            bucket=Floor(
+                F('price') / Value(step, output_field=DecimalField()),
+                output_field=IntegerField(),
+            )
+        )
+        .values('category_id', 'bucket')
+        .annotate(count=Count('id'), min_price=Min('price'), max_price=Max('price'))
+    )
+
+    return {
+        'categories': category_facets(groups),
+        'price': price_range(groups),
+        'price_histogram': price_histogram(groups, step, max_buckets),
+    }
+
+
+def category_facets(groups):
+    """Hit counts per category, rolled up so parents include their subcategories"""
+    nodes = get_category_nodes()
+    direct_counts = {}
+    for group in groups:
+        direct_counts[group['category_id']] = direct_counts.get(group['category_id'], 0) + group['count']
+
+    rolled_counts = {}
+    for category_id, count in direct_counts.items():
+        for ancestor_id in get_ancestor_ids(category_id, nodes):
+            rolled_counts[ancestor_id] = rolled_counts.get(ancestor_id, 0) + count
+
+    # nodes are already in tree order (tree_id, lft)
+    return [
+        {
+            'id': node['id'],
+            'name': node['name'],
+            'slug': node['slug'],
+            'parent': node['parent_id'],
+            'level': node['level'],
+            'count': rolled_counts[node['id']],
+            'direct_count': direct_counts.get(node['id'], 0),
+        }
+        for node in nodes.values()
+        if node['id'] in rolled_counts
+    ]
+
+
+def format_price(value):
+    # Same "12.50" string format the product serializers use for prices
+    return str(Decimal(value).quantize(Decimal('0.01')))
+
+
+def price_range(groups):
+    if not groups:
+        return {'min': None, 'max': None}
+    return {
+        'min': format_price(min(group['min_price'] for group in groups)),
+        'max': format_price(max(group['max_price'] for group in groups)),
+    }
+
+
+def price_histogram(groups, step, max_buckets):
+    """
+    Merge the fine price buckets into at most `max_buckets` equal-width buckets.
+    Bucket edges stay on multiples of `step` so they read as round prices.
+    """
+    if not groups:
+        return []
+
+    fine_counts = {}
+    for group in groups:
+        bucket = int(group['bucket'])
+        fine_counts[bucket] = fine_counts.get(bucket, 0) + group['count']
+
+    first, last = min(fine_counts), max(fine_counts)
+    per_bucket = max(1, math.ceil((last - first + 1) / max_buckets))
+
+    histogram = []
+    for start in range(first, last + 1, per_bucket):
+        histogram.append({
+            'min': format_price(start * step),
+            'max': format_price((start + per_bucket) * step),
+            'count': sum(fine_counts.get(bucket, 0) for bucket in range(start, start + per_bucket)),
+        })
+    return histogram
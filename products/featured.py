@@ -0,0 +1,137 @@
+"""
+Featured products snapshot
+
+The homepage asks for the same handful of featured products on every visit.
+Each worker keeps the featured rows (the values() rows the listing fast path
+serializes) in memory, together with their ETag/Last-Modified validators.
+
+Saving a featured product, or one that just stopped being featured, bumps
+the 'featured' cache generation; every worker compares its snapshot against
+that generation on read and rebuilds with one query when it changed.
+Generations live in each process's cache, so writes from other processes
+(import_products, backfill_image_variants, other workers) are caught by
+re-reading the featured rows' fingerprint (one aggregate) at most once per
+PRODUCT_FEATURED_REFRESH_SECONDS.
+"""
+
+import hashlib
+import threading
+import time
+from django.conf import settings
+from django.db.models import Count, Max
+from common.cache import bump_generation, get_generation
+from .serializers import product_list_rows
+
+FEATURED_LIMIT = 8
+
+# Product fields that end up in the snapshot rows
+SNAPSHOT_FIELDS = frozenset([
+    'name', 'price', 'category', 'category_id', 'image', 'image_variants',
+    'is_featured', 'is_active', 'created_at',
+])
+
+SORT_KEYS = {
+    'price_asc': ('price', False),
+    'price_desc': ('price', True),
+    'date_asc': ('created_at', False),
+    'date_desc': ('created_at', True),
+    'name_asc': ('name', False),
+    'name_desc': ('name', True),
+}
+
+
+def invalidate_featured_snapshot():
+    bump_generation('featured')
+
+
+class FeaturedSnapshot:
+    def __init__(self):
+        self.rows = None
+        self.ids = frozenset()
+        self.category_ids = frozenset()
+        self.validators = None
+        self.generation = None
+        self.checked_at = 0
+        self.lock = threading.Lock()
+
+    def get_queryset(self):
+        from .models import Product
+
+        return (
+            Product.objects.filter(is_featured=True, is_active=True)
+            .select_related('category')
+            .order_by('-created_at')
+        )
+
+    def read_validators(self):
+        """(fingerprint, last_modified timestamp or None) of the featured rows in the database"""
+        aggregates = self.get_queryset().order_by().aggregate(
+            row_count=Count('pk'),
+            changed=Max('updated_at'),
+            category_changed=Max('category__updated_at'),
+        )
+        modified = [value for value in (aggregates['changed'], aggregates['category_changed']) if value]
+        fingerprint = hashlib.md5(
+            '|'.join(str(aggregates[key]) for key in sorted(aggregates)).encode()
+        ).hexdigest()
+        return fingerprint, int(max(modified).timestamp()) if modified else None
+
+    def is_current(self):
+        if self.rows is None or self.generation != get_generation('featured'):
+            return False
+        now = time.time()
+        if now - self.checked_at < getattr(settings, 'PRODUCT_FEATURED_REFRESH_SECONDS', 60):
+            return True
+        self.checked_at = now
+        if self.read_validators() != self.validators:
+            # Stays stale for the double check in ensure_current()
+            self.generation = None
+            return False
+        return True
+
+    def rebuild(self):
+        # Read the generation and validators first, so a change during the query triggers another rebuild
+        generation = get_generation('featured')
+        validators = self.read_validators()
+        rows = list(product_list_rows(self.get_queryset()))
+
+        self.rows = rows
+        self.ids = frozenset(row['id'] for row in rows)
+        self.category_ids = frozenset(row['category'] for row in rows)
+        self.validators = validators
+        self.generation = generation
+        self.checked_at = time.time()
+
+    def ensure_current(self):
+        if not self.is_current():
+            with self.lock:
+                if not self.is_current():
+                    self.rebuild()
+
+    def get_rows(self):
+        """Featured rows, newest first"""
+        self.ensure_current()
+        return self.rows
+
+    def get_sorted_rows(self, sort_option=''):
+        rows = self.get_rows()
+        if sort_option in SORT_KEYS:
+            key, descending = SORT_KEYS[sort_option]
+            return sorted(rows, key=lambda row: row[key], reverse=descending)
+        return rows
+
+    def get_validators(self):
+        """(fingerprint, last_modified timestamp or None) for ConditionalGetMixin"""
+        self.ensure_current()
+        return self.validators
+
+    def contains(self, product_id):
+        self.ensure_current()
+        return product_id in self.ids
+
+    def uses_category(self, category_id):
+        self.ensure_current()
+        return category_id in self.category_ids
+
+
+featured_snapshot = FeaturedSnapshot()
@@ -0,0 +1,122 @@
+"""
+Product feed export for marketplaces / shopping aggregators
+
+Rows are read with values().iterator(chunk_size=...) - a server-side cursor
+on PostgreSQL - and written out one by one, so memory use doesn't grow with
+the catalog. Category paths come from the cached category tree instead of
+a join per level.
+"""
+
+import csv
+import io
+import json
+import zlib
+from xml.sax.saxutils import escape
+from django.conf import settings
+from categories.tree import get_category_nodes
+from .models import Product
+
+FEED_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'xml': 'application/xml',
+}
+
+FEED_FIELDS = [
+    'id', 'sku', 'name', 'description', 'price', 'availability', 'stock_quantity',
+    'category_path', 'image_link', 'updated_at',
+]
+
+FEED_VALUES = ['id', 'sku', 'name', 'description', 'price', 'stock_quantity', 'category_id', 'image', 'updated_at']
+
+
+def get_category_paths():
+    """{category_id: 'Electronics > Phones'} for every category"""
+    nodes = get_category_nodes()
+    paths = {}
+    for category_id, node in nodes.items():  # tree order, parents come first
+        parent_path = paths.get(node['parent_id'])
+        paths[category_id] = f"{parent_path} > {node['name']}" if parent_path else node['name']
+    return paths
+
+
+def feed_items(image_url):
+    """Yield one dict per active product, in id order"""
+    category_paths = get_category_paths()
+    chunk_size = getattr(settings, 'PRODUCT_FEED_CHUNK_SIZE', 2000)
+    rows = (
+        Product.objects.filter(is_active=True)
+        .order_by('id')
+        .values(*FEED_VALUES)
+        .iterator(chunk_size=chunk_size)
+    )
+    for row in rows:
+        yield {
+            'id': row['id'],
+            'sku': row['sku'],
+            'name': row['name'],
+            'description': row['description'],
+            'price': str(row['price']),
+            'availability': 'in stock' if row['stock_quantity'] > 0 else 'out of stock',
+            'stock_quantity': row['stock_quantity'],
+            'category_path': category_paths.get(row['category_id'], ''),
+            'image_link': image_url(row['image']) if row['image'] else '',
+            'updated_at': row['updated_at'].isoformat(),
+        }
+
+
+def render_ndjson(items):
+    for item in items:
+        yield json.dumps(item, ensure_ascii=False) + '\n'
+
+
+def render_csv(items):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FEED_FIELDS)
+    writer.writeheader()
+    for item in items:
+        writer.writerow(item)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def render_xml(items):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n<products>\n'
+    for item in items:
+        fields = ''.join(f'<{name}>{escape(str(item[name]))}</{name}>' for name in FEED_FIELDS)
+        yield f'  <product>{fields}</product>\n'
+    yield '</products>\n'
+
+
+RENDERERS = {
+    'ndjson': render_ndjson,
+    'csv': render_csv,
+    'xml': render_xml,
+}
+
+
+def render_feed(feed_format, image_url, batch_rows=200):
+    """
+    Encoded feed chunks. Rows are grouped `batch_rows` at a time so the
+    response isn't written (or compressed) one tiny row at a time.
+    """
+    pending = []
+    for text in RENDERERS[feed_format](feed_items(image_url)):
+        pending.append(text)
+        if len(pending) >= batch_rows:
+            yield ''.join(pending).encode('utf-8')
+            pending = []
+    if pending:
+        yield ''.join(pending).encode('utf-8')
+
+
+def gzip_stream(chunks, level=6):
+    """Compress a stream of byte chunks on the fly (gzip container)"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
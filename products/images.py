@@ -0,0 +1,133 @@
+"""
+Product image variants
+
+Every uploaded product image gets fixed-size thumbnail/medium copies in the
+original format plus WebP, stored under products/variants/. Their file
+names and sizes are kept in Product.image_variants, so serializers can
+build URLs without touching storage.
+"""
+
+import io
+import logging
+import os
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VARIANT_SIZES = {
+    'thumbnail': (200, 200),
+    'medium': (600, 600),
+}
+
+
+def get_variant_sizes():
+    return getattr(settings, 'PRODUCT_IMAGE_VARIANTS', DEFAULT_VARIANT_SIZES)
+
+
+def generate_image_variants(image_field):
+    """
+    Create the resized copies of a product image.
+    Returns the metadata dict stored in Product.image_variants.
+    """
+    image_field.open('rb')
+    try:
+        with Image.open(image_field) as source:
+            source = ImageOps.exif_transpose(source)
+            has_alpha = source.mode in ('RGBA', 'LA') or (source.mode == 'P' and 'transparency' in source.info)
+            base_format = 'png' if has_alpha else 'jpeg'
+            source = source.convert('RGBA' if has_alpha else 'RGB')
+
+            stem = os.path.splitext(os.path.basename(image_field.name))[0]
+            variants = {'source': image_field.name}
+            for size_name, size in get_variant_sizes().items():
+                resized = source.copy()
+                resized.thumbnail(size, Image.LANCZOS)
+                variant = {'width': resized.width, 'height': resized.height}
+                for image_format in (base_format, 'webp'):
+                    extension = 'jpg' if image_format == 'jpeg' else image_format
+                    buffer = io.BytesIO()
+                    resized.save(buffer, format=image_format.upper(), quality=82, optimize=True)
+                    variant[image_format] = default_storage.save(
+                        f'products/variants/{stem}_{size_name}.{extension}',
+                        ContentFile(buffer.getvalue()),
+                    )
+                variants[size_name] = variant
+    finally:
+        image_field.close()
+    return variants
+
+
+def delete_image_variants(variants):
+    """Remove the files listed in an image_variants dict"""
+    for variant in variants.values():
+        if not isinstance(variant, dict):
+            continue
+        for key, name in variant.items():
+            if key in ('width', 'height'):
+                continue
+            try:
+                default_storage.delete(name)
+            except Exception:
+                logger.warning("Could not delete image variant %s", name)
+
+
+def refresh_image_variants(product, force=False):
+    """
+    Bring product.image_variants in line with product.image.
+    Saves with a queryset update (no signals, no updated_at change).
+    Returns True if anything changed.
+    """
+    from .models import Product
+
+    current = product.image_variants or {}
+    if product.image:
+        if not force and current.get('source') == product.image.name:
+            return False
+        try:
+            variants = generate_image_variants(product.image)
+        except Exception as e:
+            logger.warning("Could not generate image variants for product %s: %s", product.pk, e)
+            return False
+    else:
+        if not current:
+            return False
+        variants = {}
+
+    delete_image_variants(current)
+    product.image_variants = variants
+    Product.objects.filter(pk=product.pk).update(image_variants=variants)
+    return True
+
+
+def build_image_variants(variants, image_url):
+    """
+    Public representation of Product.image_variants:
+    {size: {width, height, <format>: absolute url, ...}} or None
+    """
+    if not variants:
+        return None
+    return {
+        size_name: {
+            key: (value if key in ('width', 'height') else image_url(value))
+            for key, value in variant.items()
+        }
+        for size_name, variant in variants.items()
+        if isinstance(variant, dict)
+    }
+
+
+def build_image_srcset(variants, image_url):
+    """srcset string over the non-WebP variants, e.g. "…_thumbnail.jpg 200w, …_medium.jpg 600w" """
+    if not variants:
+        return None
+    entries = []
+    for variant in variants.values():
+        if not isinstance(variant, dict):
+            continue
+        for key, name in variant.items():
+            if key not in ('width', 'height', 'webp'):
+                entries.append(f"{image_url(name)} {variant['width']}w")
+    return ', '.join(entries) or None
@@ -0,0 +1,194 @@
+"""
+Inventory ledger
+
+Every stock change appends an InventoryMovement (sale, cancel, restock,
+adjustment) in the same transaction that changes Product.stock_quantity, so
+the stock history can be audited and replayed.
+
+Reading the ledger's stock doesn't touch the product rows checkouts lock:
+
+    stock = snapshot.quantity + SUM(movements of the product after the snapshot)
+
+Snapshots are cached (they only change when compact_inventory runs) and the
+delta is one aggregate over the (product, id) index, usually a handful of
+rows. compact_inventory folds committed movements into the snapshots and
+deletes movements older than INVENTORY_LEDGER_RETENTION_DAYS.
+
+Product.stock_quantity stays the counter checkout decrements with a
+conditional UPDATE (orders/stock.py) - that row lock is what makes
+overselling impossible - and what the API serves. The ledger agrees with
+it; find_drift() reports (and --reconcile corrects) any product where it
+doesn't.
+"""
+
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Q, Sum
+from django.utils import timezone
+from common.cache import bump_generation, get_generation
+
+LOW_STOCK_THRESHOLD = 10
+
+
+def record_movements(kind, quantities, reference=''):
+    """Append one movement per {product_id: signed quantity} (zero changes are skipped)"""
+    from .models import InventoryMovement
+
+    movements = [
+        InventoryMovement(product_id=product_id, kind=kind, quantity=quantity, reference=reference[:100])
+        for product_id, quantity in sorted(quantities.items()) if quantity
+    ]
+    if movements:
+        InventoryMovement.objects.bulk_create(movements)
+    return len(movements)
+
+
+def snapshot_key(product_id):
+    return f"inventory:snapshot:{get_generation('inventory')}:{product_id}"
+
+
+def get_snapshots(product_ids):
+    """{product_id: (quantity, last_movement_id)}, from the cache when possible"""
+    from .models import InventorySnapshot
+
+    keys = {snapshot_key(product_id): product_id for product_id in product_ids}
+    snapshots = {keys[key]: tuple(value) for key, value in cache.get_many(list(keys)).items()}
+    missing = [product_id for product_id in product_ids if product_id not in snapshots]
+    if missing:
+        loaded = {
+            product_id: (quantity, last_movement_id)
+            for product_id, quantity, last_movement_id in InventorySnapshot.objects.filter(
+                product_id__in=missing
+            ).values_list('product_id', 'quantity', 'last_movement_id')
+        }
+        # Products created after the ledger started have no snapshot, all their movements count
+        for product_id in missing:
+            loaded.setdefault(product_id, (0, 0))
+        cache.set_many(
+            {snapshot_key(product_id): snapshot for product_id, snapshot in loaded.items()},
+            getattr(settings, 'INVENTORY_SNAPSHOT_CACHE_TIMEOUT', 3600),
+        )
+        snapshots.update(loaded)
+    return snapshots
+
+
+def current_stock(product_ids):
+    """{product_id: units in stock} from cached snapshots plus the movements since"""
+    from .models import InventoryMovement
+
+    product_ids = list(product_ids)
+    if not product_ids:
+        return {}
+    snapshots = get_snapshots(product_ids)
+    after_snapshot = Q()
+    for product_id, (_, last_movement_id) in snapshots.items():
+        after_snapshot |= Q(product_id=product_id, id__gt=last_movement_id)
+    deltas = dict(
+        InventoryMovement.objects.filter(after_snapshot)
+        .values('product_id')
+        .annotate(delta=Sum('quantity'))
+        .values_list('product_id', 'delta')
+    )
+    return {product_id: quantity + deltas.get(product_id, 0) for product_id, (quantity, _) in snapshots.items()}
+
+
+def stock_flags(quantity):
+    """(in_stock, low_stock) for a stock level"""
+    return quantity > 0, 0 < quantity <= LOW_STOCK_THRESHOLD
+
+
+def committed_watermark():
+    """
+    Highest movement id with every movement up to it committed. Ids are
+    handed out at INSERT time, so a transaction still open could otherwise
+    commit an id below what a snapshot already covers.
+    """
+    from .models import InventoryMovement
+
+    with transaction.atomic():
+        connection = transaction.get_connection()
+        if connection.vendor == 'postgresql':
+            # SHARE mode waits for every open transaction that inserted movements,
+            # and holds new inserts back only until this short transaction ends
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {InventoryMovement._meta.db_table} IN SHARE MODE')
+        # SQLite has one writer at a time, an uncommitted id is always above the committed ones
+        return InventoryMovement.objects.aggregate(last=Max('id'))['last']
+
+
+def compact(batch_size=1000):
+    """
+    Fold committed movements into the snapshots and drop those past retention.
+    Returns (snapshots written, movements deleted).
+    """
+    from .models import InventoryMovement, InventorySnapshot, Product
+
+    now = timezone.now()
+    watermark = committed_watermark()
+    if watermark is None:
+        return 0, 0
+
+    snapshots = {snapshot.product_id: snapshot for snapshot in InventorySnapshot.objects.all()}
+    lowest = min((snapshot.last_movement_id for snapshot in snapshots.values()), default=0)
+    product_ids = set(Product.objects.values_list('id', flat=True))
+    deltas = {}
+    movements = InventoryMovement.objects.filter(id__gt=lowest, id__lte=watermark).values_list('product_id', 'id', 'quantity')
+    for product_id, movement_id, quantity in movements.iterator(chunk_size=batch_size):
+        snapshot = snapshots.get(product_id)
+        if snapshot is None or movement_id > snapshot.last_movement_id:
+            deltas[product_id] = deltas.get(product_id, 0) + quantity
+
+    changed, created = [], []
+    for product_id in product_ids:
+        snapshot = snapshots.get(product_id)
+        if snapshot is None:
+            created.append(InventorySnapshot(product_id=product_id, quantity=deltas.get(product_id, 0), last_movement_id=watermark))
+        elif snapshot.last_movement_id < watermark:
+            snapshot.quantity += deltas.get(product_id, 0)
+            snapshot.last_movement_id = watermark
+            snapshot.taken_at = now
+            changed.append(snapshot)
+    InventorySnapshot.objects.bulk_create(created, batch_size=batch_size)
+    InventorySnapshot.objects.bulk_update(changed, ['quantity', 'last_movement_id', 'taken_at'], batch_size=batch_size)
+    bump_generation('inventory')
+
+    # Folded movements past the retention period are only history now
+    retention = now - timedelta(days=getattr(settings, 'INVENTORY_LEDGER_RETENTION_DAYS', 365))
+    deleted = 0
+    while True:
+        batch = list(
+            InventoryMovement.objects.filter(id__lte=watermark, created_at__lt=retention)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not batch:
+            break
+        InventoryMovement.objects.filter(id__in=batch).delete()
+        deleted += len(batch)
+    return len(created) + len(changed), deleted
+
+
+def find_drift(batch_size=1000):
+    """{product_id: stock_quantity - ledger stock} for products where the two disagree"""
+    from .models import Product
+
+    drift = {}
+    rows = Product.objects.order_by('id').values_list('id', 'stock_quantity')
+    batch = []
+    for row in rows.iterator(chunk_size=batch_size):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            drift.update(batch_drift(batch))
+            batch = []
+    if batch:
+        drift.update(batch_drift(batch))
+    return drift
+
+
+def batch_drift(rows):
+    ledger = current_stock([product_id for product_id, _ in rows])
+    return {
+        product_id: stock - ledger[product_id]
+        for product_id, stock in rows if stock != ledger[product_id]
+    }
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from products.featured import invalidate_featured_snapshot
+from products.images import refresh_image_variants
+from products.models import Product
+from products.signals import invalidate_product_caches
+
+
+class Command(BaseCommand):
+    help = "Generate thumbnail/medium/WebP variants for product images that don't have them yet"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate variants even if they are up to date')
+        parser.add_argument('--batch-size', type=int, default=200, help='Products loaded per query')
+
+    def handle(self, *args, **options):
+        products = (
+            Product.objects.exclude(image='').exclude(image__isnull=True)
+            .only('id', 'image', 'image_variants')
+            .order_by('id')
+        )
+
+        processed = updated = 0
+        for product in products.iterator(chunk_size=options['batch_size']):
+            processed += 1
+            if refresh_image_variants(product, force=options['force']):
+                updated += 1
+                self.stdout.write(f"  ✓ {product.pk}: {product.image.name}")
+
+        if updated:
+            invalidate_product_caches()
+            invalidate_featured_snapshot()
+        self.stdout.write(self.style.SUCCESS(f"Checked {processed} products, generated variants for {updated}"))
@@ -0,0 +1,16 @@
+import time
+from django.core.management.base import BaseCommand
+from products.autocomplete import autocomplete
+
+
+class Command(BaseCommand):
+    help = "Rebuild the autocomplete prefix index and write the snapshot file workers load at startup"
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        index = autocomplete.build()
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(f"  Entries: {len(index.entries)}, prefix keys: {len(index.keys)}")
+        self.stdout.write(f"  Snapshot: {autocomplete.get_snapshot_path()}")
+        self.stdout.write(self.style.SUCCESS(f"Built autocomplete index in {elapsed * 1000:.1f} ms"))
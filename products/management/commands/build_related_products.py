@@ -0,0 +1,48 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from products.recommendations import (METRICS, compute_related, load_baskets, related_limit, sparse,
+                                      store_related, synthetic_baskets)
+
+
+class Command(BaseCommand):
+    help = "Rebuild the \"customers also bought\" table from order items"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--metric', choices=METRICS, default=getattr(settings, 'PRODUCT_RELATED_METRIC', 'cosine'))
+        parser.add_argument('--limit', type=int, default=related_limit(), help='Related products kept per product')
+        parser.add_argument('--min-count', type=int, default=getattr(settings, 'PRODUCT_RELATED_MIN_COUNT', 2),
+                            help='Orders a pair must share before it counts')
+        parser.add_argument('--python', action='store_true', help="Don't use NumPy/SciPy even if installed")
+        parser.add_argument('--benchmark', type=int, metavar='ORDER_ITEMS',
+                            help='Time the build on this many synthetic order items instead (nothing is saved)')
+        parser.add_argument('--benchmark-products', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        use_sparse = sparse is not None and not options['python']
+        self.stdout.write(f"🔗 Building related products ({options['metric']}, {'SciPy sparse' if use_sparse else 'pure Python'})")
+
+        start = time.perf_counter()
+        if options['benchmark']:
+            baskets = synthetic_baskets(options['benchmark'], options['benchmark_products'])
+        else:
+            baskets = load_baskets()
+        loaded = time.perf_counter()
+        item_count = sum(len(basket) for basket in baskets)
+        self.stdout.write(f"  Loaded {len(baskets)} orders / {item_count} items in {loaded - start:.2f}s")
+
+        related = compute_related(
+            baskets, limit=max(options['limit'], 1), min_count=max(options['min_count'], 1),
+            metric=options['metric'], use_sparse=use_sparse,
+        )
+        computed = time.perf_counter()
+        self.stdout.write(f"  Scored {len(related)} products in {computed - loaded:.2f}s")
+
+        if options['benchmark']:
+            self.stdout.write(self.style.SUCCESS(f"Benchmark finished in {computed - start:.2f}s (nothing saved)"))
+            return
+
+        written = store_related(related)
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {written} related products in {time.perf_counter() - start:.2f}s"
+        ))
@@ -0,0 +1,45 @@
+import sys
+import time
+from urllib.parse import urljoin
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from products.feed import FEED_FORMATS, gzip_stream, render_feed
+from products.serializers import media_url_builder
+
+
+class Command(BaseCommand):
+    help = "Write the marketplace product feed (NDJSON/CSV/XML) to a file or stdout, in constant memory"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--feed-format', choices=list(FEED_FORMATS), default='ndjson')
+        parser.add_argument('--output', help='File to write (default: stdout)')
+        parser.add_argument('--gzip', action='store_true', help='Gzip-compress the output')
+        parser.add_argument('--base-url', help='Site URL used for absolute image links, e.g. https://shop.example.com')
+
+    def handle(self, *args, **options):
+        if options['base_url']:
+            base_url = options['base_url'].rstrip('/') + '/'
+            image_url = lambda name: urljoin(base_url, default_storage.url(name))  # noqa: E731
+        else:
+            image_url = media_url_builder(None)
+
+        chunks = render_feed(options['feed_format'], image_url)
+        if options['gzip']:
+            chunks = gzip_stream(chunks)
+
+        start = time.perf_counter()
+        written = 0
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if options['output']:
+                output.close()
+
+        if options['output']:
+            elapsed = time.perf_counter() - start
+            self.stdout.write(self.style.SUCCESS(
+                f"Wrote {written / 1024:,.1f} KB to {options['output']} in {elapsed:.1f}s"
+            ))
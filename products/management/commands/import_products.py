@@ -0,0 +1,255 @@
+import csv
+import io
+import json
+import os
+import time
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from categories.models import Category
+from categories.tree import get_category_nodes
+from products.featured import invalidate_featured_snapshot
+from products.inventory import record_movements
+from products.models import Product
+from products.signals import invalidate_product_caches
+from products.sku import assign_skus
+
+TRUE_VALUES = ('1', 'true', 'yes', 'y')
+FALSE_VALUES = ('0', 'false', 'no', 'n', '')
+
+# Columns written by the PostgreSQL COPY path, in order
+COPY_NULL = r'\N'  # unquoted empty CSV fields would be NULL too, this keeps '' an empty string
+COPY_FIELDS = [
+    'name', 'description', 'price', 'category_id', 'stock_quantity', 'sku', 'image',
+    'image_variants', 'is_active', 'is_featured', 'popularity_score', 'created_at', 'updated_at',
+]
+
+
+class Command(BaseCommand):
+    help = "Import products from a CSV or JSONL file in batches (COPY on PostgreSQL, bulk_create elsewhere)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (with header row) or JSONL file')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows validated and inserted per transaction')
+        parser.add_argument('--checkpoint', help='Progress file (default: <path>.checkpoint)')
+        parser.add_argument('--resume', action='store_true', help='Skip the rows a previous run already committed')
+        parser.add_argument('--no-copy', action='store_true', help='Use bulk_create even on PostgreSQL')
+        parser.add_argument('--max-errors', type=int, default=20, help='Invalid rows to print before going quiet')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f"File not found: {path}")
+
+        file_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        checkpoint_path = options['checkpoint'] or f'{path}.checkpoint'
+        batch_size = max(options['batch_size'], 1)
+        self.max_errors = options['max_errors']
+        self.use_copy = connection.vendor == 'postgresql' and not options['no_copy']
+
+        progress = {'rows_done': 0, 'imported': 0, 'skipped': 0}
+        if options['resume'] and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as checkpoint_file:
+                progress.update(json.load(checkpoint_file))
+            self.stdout.write(f"↪️  Resuming after row {progress['rows_done']}")
+
+        self.categories = self.load_categories()
+        self.reference = f'import {os.path.basename(path)}'
+        self.stdout.write(f"📦 Importing {path} ({file_format}, {'COPY' if self.use_copy else 'bulk_create'}, batches of {batch_size})")
+
+        start = time.perf_counter()
+        rows_this_run = 0
+        featured_imported = False
+        batch = []
+        for row_number, row in self.read_rows(path, file_format):
+            if row_number <= progress['rows_done']:
+                continue
+            batch.append((row_number, row))
+            if len(batch) >= batch_size:
+                featured_imported |= self.import_batch(batch, progress, checkpoint_path)
+                rows_this_run += len(batch)
+                self.report(progress, rows_this_run, start)
+                batch = []
+
+        if batch:
+            featured_imported |= self.import_batch(batch, progress, checkpoint_path)
+            rows_this_run += len(batch)
+
+        # Caches are invalidated once for the whole import, not per row; other
+        # processes pick the new rows up through the products fingerprint (common/cache.py)
+        if progress['imported']:
+            invalidate_product_caches()
+            if featured_imported:
+                invalidate_featured_snapshot()
+
+        elapsed = time.perf_counter() - start
+        rate = rows_this_run / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {progress['imported']} products, skipped {progress['skipped']} invalid rows "
+            f"({rows_this_run} rows in {elapsed:.1f}s, {rate:,.0f} rows/sec)"
+        ))
+        self.stdout.write(f"  Checkpoint: {checkpoint_path}")
+        if progress['imported']:
+            self.stdout.write("  Run backfill_image_variants if the rows referenced images")
+
+    def read_rows(self, path, file_format):
+        """Yield (row number, dict) without loading the whole file"""
+        with open(path, newline='', encoding='utf-8-sig') as source:
+            if file_format == 'csv':
+                for row_number, row in enumerate(csv.DictReader(source), 1):
+                    yield row_number, row
+            else:
+                row_number = 0
+                for line in source:
+                    if not line.strip():
+                        continue
+                    row_number += 1
+                    try:
+                        yield row_number, json.loads(line)
+                    except ValueError:
+                        yield row_number, None
+
+    def load_categories(self):
+        """Lookup table: slug, slug path and name path -> category (no query per row)"""
+        nodes = get_category_nodes()
+        lookup = {}
+        for node in nodes.values():
+            slugs, names = [], []
+            parent_id = node['id']
+            while parent_id in nodes:
+                slugs.insert(0, nodes[parent_id]['slug'])
+                names.insert(0, nodes[parent_id]['name'].lower())
+                parent_id = nodes[parent_id]['parent_id']
+
+            # Only needs what Product.get_sku_category_code() reads
+            category = Category(id=node['id'], name=node['name'])
+            lookup[node['slug']] = category
+            lookup['/'.join(slugs)] = category
+            lookup['/'.join(names)] = category
+        return lookup
+
+    def resolve_category(self, value):
+        # Accepts "phones", "electronics/phones" or "Electronics > Phones"
+        key = '/'.join(part.strip() for part in str(value).replace('>', '/').split('/') if part.strip())
+        return self.categories.get(key) or self.categories.get(key.lower())
+
+    def parse_bool(self, value, default):
+        if value is None:
+            return default
+        if isinstance(value, bool):
+            return value
+        text = str(value).strip().lower()
+        if text in TRUE_VALUES:
+            return True
+        if text in FALSE_VALUES:
+            return default if text == '' else False
+        raise ValidationError(f"'{value}' is not a yes/no value")
+
+    def build_product(self, row):
+        """Validated, unsaved Product for one row (raises ValidationError)"""
+        if not isinstance(row, dict):
+            raise ValidationError("not a JSON object")
+
+        category = self.resolve_category(row.get('category') or '')
+        if category is None:
+            raise ValidationError(f"unknown category '{row.get('category')}'")
+
+        fields = Product._meta
+        product = Product(
+            name=fields.get_field('name').clean((row.get('name') or '').strip(), None),
+            description=(row.get('description') or '').strip(),
+            price=fields.get_field('price').clean(row.get('price'), None),
+            stock_quantity=fields.get_field('stock_quantity').clean(row.get('stock_quantity') or 0, None),
+            sku=(row.get('sku') or '').strip(),
+            image=(row.get('image') or '').strip() or None,
+            is_active=self.parse_bool(row.get('is_active'), True),
+            is_featured=self.parse_bool(row.get('is_featured'), False),
+        )
+        if product.price < 0 or product.stock_quantity < 0:
+            raise ValidationError("price and stock_quantity can't be negative")
+        if len(product.sku) > fields.get_field('sku').max_length:
+            raise ValidationError("sku is too long")
+        product.category = category
+        return product
+
+    def import_batch(self, batch, progress, checkpoint_path):
+        """Validate, insert and checkpoint one batch. Returns True if it had featured products."""
+        products = []
+        for row_number, row in batch:
+            try:
+                products.append((row_number, self.build_product(row)))
+            except ValidationError as e:
+                self.skip_row(progress, row_number, '; '.join(e.messages))
+
+        # Supplied SKUs must be unique within the batch and against the table (one query)
+        seen = set()
+        existing = set(
+            Product.objects.filter(sku__in=[product.sku for _, product in products if product.sku])
+            .values_list('sku', flat=True)
+        )
+        valid = []
+        for row_number, product in products:
+            if product.sku and (product.sku in existing or product.sku in seen):
+                self.skip_row(progress, row_number, f"duplicate sku '{product.sku}'")
+                continue
+            seen.add(product.sku)
+            valid.append(product)
+
+        with transaction.atomic():
+            assign_skus(valid)
+            if self.use_copy:
+                self.copy_products(valid)
+                # COPY doesn't return ids, look them up by the (unique) SKUs
+                ids = dict(Product.objects.filter(sku__in=[product.sku for product in valid]).values_list('sku', 'id'))
+            else:
+                Product.objects.bulk_create(valid, batch_size=len(valid) or 1)
+                ids = {product.sku: product.pk for product in valid}
+            # Opening stock goes into the inventory ledger
+            record_movements('restock', {ids[product.sku]: product.stock_quantity for product in valid}, self.reference)
+
+        progress['imported'] += len(valid)
+        progress['rows_done'] = batch[-1][0]
+        self.write_checkpoint(checkpoint_path, progress)
+        return any(product.is_featured for product in valid)
+
+    def copy_products(self, products):
+        """COPY ... FROM STDIN - PostgreSQL's fastest way in, triggers still fire"""
+        now = timezone.now()
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for product in products:
+            writer.writerow([
+                product.name, product.description, product.price, product.category_id,
+                product.stock_quantity, product.sku, product.image.name or COPY_NULL, '{}',
+                product.is_active, product.is_featured, 0, now.isoformat(), now.isoformat(),
+            ])
+        buffer.seek(0)
+
+        sql = f"COPY {Product._meta.db_table} ({', '.join(COPY_FIELDS)}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')"
+        with connection.cursor() as cursor:
+            raw_cursor = cursor.cursor
+            if hasattr(raw_cursor, 'copy_expert'):
+                raw_cursor.copy_expert(sql, buffer)  # psycopg2
+            else:
+                with raw_cursor.copy(sql) as copy:  # psycopg 3
+                    copy.write(buffer.getvalue())
+
+    def skip_row(self, progress, row_number, message):
+        progress['skipped'] += 1
+        if progress['skipped'] <= self.max_errors:
+            self.stderr.write(f"  ✗ Row {row_number}: {message}")
+        elif progress['skipped'] == self.max_errors + 1:
+            self.stderr.write("  ... more invalid rows, not shown")
+
+    def write_checkpoint(self, checkpoint_path, progress):
+        temporary_path = f'{checkpoint_path}.tmp'
+        with open(temporary_path, 'w') as checkpoint_file:
+            json.dump(progress, checkpoint_file)
+        os.replace(temporary_path, checkpoint_path)
+
+    def report(self, progress, rows_this_run, start):
+        elapsed = time.perf_counter() - start
+        rate = rows_this_run / elapsed if elapsed else 0
+        self.stdout.write(f"  … {progress['rows_done']} rows read, {progress['imported']} imported ({rate:,.0f} rows/sec)")
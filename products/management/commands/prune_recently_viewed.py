@@ -0,0 +1,16 @@
+import time
+from django.core.management.base import BaseCommand
+from products.recently_viewed import prune_recently_viewed
+
+
+class Command(BaseCommand):
+    help = "Delete recently viewed lists nobody can read any more (run periodically, e.g. daily)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows deleted per statement')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        deleted = prune_recently_viewed(batch_size=max(options['batch_size'], 1))
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} recently viewed lists in {elapsed * 1000:.1f} ms"))
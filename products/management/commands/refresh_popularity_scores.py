@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from products.models import Product
+from products.popularity import half_life_days, refresh_popularity_scores, window_days
+
+
+class Command(BaseCommand):
+    help = "Recompute the best-seller score of every product from order items (run periodically, e.g. hourly)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Products written per UPDATE')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        changed = refresh_popularity_scores(batch_size=max(options['batch_size'], 1))
+        elapsed = time.perf_counter() - start
+
+        ranked = Product.objects.filter(popularity_score__gt=0).count()
+        self.stdout.write(f"  Window: {window_days()} days, half-life: {half_life_days()} days")
+        self.stdout.write(f"  Products with sales in the window: {ranked}")
+        self.stdout.write(self.style.SUCCESS(f"Updated {changed} popularity scores in {elapsed * 1000:.1f} ms"))
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from products.search import install_search_index
+    install_search_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    from products.search import drop_search_index
+    drop_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_alter_product_sku'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, drop_search_index),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SkuSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=10, unique=True)),
+                ('next_value', models.BigIntegerField(default=1)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_sku_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='popularity_score',
+            field=models.FloatField(db_index=True, default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_related_product'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecentlyViewed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner', models.CharField(max_length=64, unique=True)),
+                ('product_ids', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
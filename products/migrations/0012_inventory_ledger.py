@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def snapshot_current_stock(apps, schema_editor):
+    # The ledger starts from today's stock_quantity
+    Product = apps.get_model('products', 'Product')
+    InventorySnapshot = apps.get_model('products', 'InventorySnapshot')
+    InventorySnapshot.objects.bulk_create(
+        [
+            InventorySnapshot(product_id=product_id, quantity=quantity, last_movement_id=0)
+            for product_id, quantity in Product.objects.values_list('id', 'stock_quantity').iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_recently_viewed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='inventory_snapshot', serialize=False, to='products.product')),
+                ('quantity', models.IntegerField()),
+                ('last_movement_id', models.BigIntegerField(default=0)),
+                ('taken_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='InventoryMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('sale', 'Sale'), ('cancel', 'Cancel'), ('restock', 'Restock'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('quantity', models.IntegerField()),
+                ('reference', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='inventory_movements', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'id'], name='inventory_movement_product')],
+            },
+        ),
+        migrations.RunPython(snapshot_current_stock, migrations.RunPython.noop),
+    ]
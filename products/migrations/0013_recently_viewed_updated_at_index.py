@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_inventory_ledger'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recentlyviewed',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
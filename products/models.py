@@ -1,7 +1,5 @@
-from django.db import models
+from django.db import models, transaction
 from categories.models import Category
-import random
-import hashlib
 
 class Product(models.Model):
     name = models.CharField(max_length=50)
@@ -11,8 +9,10 @@ class Product(models.Model):
     stock_quantity = models.IntegerField(default=0)
     sku = models.CharField(max_length=50, unique=True, blank=True) 
     image = models.ImageField(upload_to='products/', blank=True, null=True) 
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)  # resized copies, see products/images.py
     is_active = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False) 
+    popularity_score = models.FloatField(default=0, db_index=True, editable=False)  # decayed units sold, see products/popularity.py
     created_at = models.DateTimeField(auto_now_add=True)  
     updated_at = models.DateTimeField(auto_now=True) 
 
@@ -27,30 +27,34 @@ class Product(models.Model):
     def low_stock(self):
         return 0 < self.stock_quantity <= 10
 
-    def generate_sku(self):
-        """
-        Auto-generate SKU from category name, product name, and brand
-        Format: CAT-BR-NAME-UNIQUE
-        Example: ELE-AP-IPHO-A1B2
-        """
+    def get_sku_category_code(self):
         # AUTO category code from category name
-        if self.category and self.category.name:
+        if self.category_id and self.category.name:
             category_name = self.category.name.upper().replace(' ', '')
-            cat_code = category_name[:3] if len(category_name) >= 3 else category_name.ljust(3, 'X')[:3]
-        else:
-            cat_code = "GEN"
-        
+            return category_name[:3] if len(category_name) >= 3 else category_name.ljust(3, 'X')[:3]
+        return "GEN"
+
+    def get_sku_prefix(self):
         # Clean product name (remove special chars, take first 4 chars)
         clean_name = ''.join([c for c in self.name if c.isalnum()])
         name_code = clean_name[:4].upper() if clean_name else "PROD"
         
-        
         brand_code = "PR"
         
-        # Unique hash to ensure uniqueness
-        unique_hash = hashlib.md5(f"{self.name}{random.random()}".encode()).hexdigest()[:4].upper()
-        
-        return f"{cat_code}-{brand_code}-{name_code}-{unique_hash}"
+        return f"{self.get_sku_category_code()}-{brand_code}-{name_code}"
+
+    def generate_sku(self):
+        """
+        Auto-generate SKU from category name, product name, and brand
+        Format: CAT-BR-NAME-UNIQUE
+        Example: ELE-PR-IPHO-0001A
+        The unique part comes from the per-category SKU counter (products/sku.py),
+        so no lookup is needed to make sure it isn't taken
+        """
+        from .sku import allocate_suffixes, encode_suffix
+
+        value = allocate_suffixes(self.get_sku_category_code(), 1)[0]
+        return f"{self.get_sku_prefix()}-{encode_suffix(value)}"
     
     def save(self, *args, **kwargs):
         """
@@ -58,6 +62,130 @@ class Product(models.Model):
         """
         if not self.sku:
             self.sku = self.generate_sku()
-            while Product.objects.filter(sku=self.sku).exists():
-                self.sku = self.generate_sku()
-        super().save(*args, **kwargs)
\ No newline at end of file
+        loaded_stock = getattr(self, '_loaded_stock', None)
+        if loaded_stock is None or kwargs.get('update_fields') is not None or kwargs.get('force_insert'):
+            super().save(*args, **kwargs)
+        elif self.stock_quantity == loaded_stock:
+            # Checkouts may have decremented the column since this instance was loaded, leave it alone
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'stock_quantity' and field.attname not in deferred
+            ]
+            super().save(*args, **kwargs)
+        else:
+            # The stock is set to a new value: log the change from what the row holds now
+            with transaction.atomic(using=kwargs.get('using')):
+                current = (
+                    Product.objects.select_for_update().filter(pk=self.pk)
+                    .values_list('stock_quantity', flat=True).first()
+                )
+                if current is not None:
+                    self._loaded_stock = current
+                super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Stock as loaded, so saves can log stock changes without re-reading the row (products/signals.py)
+        instance._loaded_stock = instance.__dict__.get('stock_quantity')
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._loaded_stock = self.__dict__.get('stock_quantity')
+
+
+class SkuSequence(models.Model):
+    """
+    Next free SKU suffix per category code
+    - Advanced in blocks by products/sku.py
+    """
+    prefix = models.CharField(max_length=10, unique=True)
+    next_value = models.BigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.prefix}: {self.next_value}"
+
+
+class RelatedProduct(models.Model):
+    """
+    "Customers also bought" neighbours of a product
+    - Precomputed by build_related_products (products/recommendations.py)
+    - Served in rank order through the (product, rank) unique index
+    """
+    # No separate index, (product, rank) below starts with it
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='related_products', db_index=False)
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='recommended_in')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'rank'], name='related_product_rank_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.related_id} (#{self.rank})"
+
+
+class RecentlyViewed(models.Model):
+    """
+    Durable copy of a visitor's recently viewed products
+    - Written every few minutes from the cache buffer (products/recently_viewed.py),
+      not on every product view
+    - owner: 'user:<id>' or 'anon:<cookie>' (anonymous only once the cookie came back)
+    - Rows nobody can read any more are deleted by prune_recently_viewed
+    """
+    owner = models.CharField(max_length=64, unique=True)
+    product_ids = models.JSONField(default=list)  # most recent first
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # prune_recently_viewed drops stale rows
+
+    def __str__(self):
+        return f"{self.owner}: {len(self.product_ids)} products"
+
+
+class InventoryMovement(models.Model):
+    """
+    Append-only stock ledger, one row per stock change
+    - quantity is the signed change (a sale of 2 is -2, its cancellation +2)
+    - Written in the same transaction as the stock_quantity update (products/inventory.py)
+    - Rows older than the retention period are folded into InventorySnapshot by compact_inventory
+    """
+    KIND_CHOICES = [
+        ('sale', 'Sale'),
+        ('cancel', 'Cancel'),
+        ('restock', 'Restock'),
+        ('adjustment', 'Adjustment'),
+    ]
+
+    # No separate index, (product, id) below starts with it
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='inventory_movements', db_index=False)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    quantity = models.IntegerField()
+    reference = models.CharField(max_length=100, blank=True)  # order number, import file, ...
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Movements of a product after its snapshot: product_id = ... AND id > last_movement_id
+            models.Index(fields=['product', 'id'], name='inventory_movement_product'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.quantity:+d} x {self.product_id}"
+
+
+class InventorySnapshot(models.Model):
+    """
+    Stock of a product as of a point in the ledger
+    - quantity includes every movement with id <= last_movement_id
+    - Current stock = quantity + movements after it (products/inventory.py)
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='inventory_snapshot')
+    quantity = models.IntegerField()
+    last_movement_id = models.BigIntegerField(default=0)
+    taken_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.product_id}: {self.quantity} (through movement {self.last_movement_id})"
@@ -0,0 +1,290 @@
+import base64
+import binascii
+import datetime
+import decimal
+import hashlib
+import json
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import Q
+from common.cache import get_cache_state
+
+
+class ProductPagination:
+    """
+    Custom pagination class to match frontend expectations
+    - Page mode (default): ?page=N&page_size=M with total counts
+    - Cursor mode (opt-in): ?cursor=<token> or ?pagination=cursor
+      Keyset pagination over the active sort key plus id, no COUNT and
+      no OFFSET, so every page costs the same no matter how deep it is
+    - Total counts are cached per filter signature until a Product changes,
+      and huge unfiltered PostgreSQL counts use the planner estimate. Pages
+      fetch one extra row instead of trusting the count for has_next, and
+      correct a count the rows prove wrong
+    """
+    def __init__(self):
+        self.page_size = 15
+        self.page_size_query_param = 'page_size'
+        self.max_page_size = 100
+        self.cursor_mode = False
+        self.count_is_estimate = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # Get pagination parameters
+        try:
+            self.page_size = int(request.query_params.get('page_size', 15))
+        except (ValueError, TypeError):
+            self.page_size = 15
+
+        try:
+            self.page_number = int(request.query_params.get('page', 1))
+        except (ValueError, TypeError):
+            self.page_number = 1
+
+        # Apply reasonable limits
+        self.page_size = min(self.page_size, 100)
+        self.page_size = max(self.page_size, 1)
+        self.page_number = max(self.page_number, 1)
+
+        # Cursor mode is opt-in for infinite-scroll clients
+        self.cursor_mode = (
+            'cursor' in request.query_params or
+            request.query_params.get('pagination') == 'cursor'
+        )
+        if self.cursor_mode:
+            return self.paginate_by_cursor(queryset, request.query_params.get('cursor', ''))
+
+        # Calculate pagination
+        self.total_count, self.count_is_estimate = self.get_count(queryset, request, view)
+        start_index = (self.page_number - 1) * self.page_size
+
+        # One extra row says whether a next page exists, whatever the (cached
+        # or estimated) count claims, so a stale count never hides rows
+        rows = list(queryset[start_index:start_index + self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.has_next:
+            self.total_count = max(self.total_count, start_index + self.page_size + 1)
+        elif rows or start_index == 0:
+            # This is the last page, so the real count is known
+            self.total_count = start_index + len(rows)
+        self.total_pages = (self.total_count + self.page_size - 1) // self.page_size
+        self.has_previous = self.page_number > 1
+
+        # Return paginated queryset
+        return rows
+
+    def get_count_signature(self, request, view=None):
+        """
+        Normalized description of the filters that decide the count, so
+        equivalent requests (spacing, case, 10 vs 10.00) share a cache entry
+        """
+        params = request.query_params
+        signature = {'active': True}
+
+        # Views may search for something other than ?q= (e.g. an autocorrected query)
+        if view is not None and hasattr(view, 'get_search_query'):
+            search_query = view.get_search_query()
+        else:
+            search_query = params.get('q', '')
+        search_query = ' '.join(search_query.lower().split())
+        if search_query:
+            signature['q'] = search_query
+
+        for name in ('min_price', 'max_price'):
+            try:
+                signature[name] = str(decimal.Decimal(str(float(params.get(name)))).normalize())
+            except (ValueError, TypeError, decimal.InvalidOperation):
+                pass
+
+        try:
+            signature['category'] = int(params.get('category'))
+        except (ValueError, TypeError):
+            pass
+
+        if params.get('is_featured', '').lower() in ('1', 'true', 'yes'):
+            signature['is_featured'] = True
+
+        # Category pages filter on the whole subtree from the URL
+        if view is not None and 'category_id' in getattr(view, 'kwargs', {}):
+            signature['category_tree'] = int(view.kwargs['category_id'])
+
+        return signature
+
+    def get_count(self, queryset, request, view=None):
+        """Return (count, is_estimate), from cache when possible"""
+        if isinstance(queryset, list):
+            # Rows already in memory (e.g. the featured snapshot)
+            return len(queryset), False
+
+        signature = self.get_count_signature(request, view)
+        digest = hashlib.md5(json.dumps(signature, sort_keys=True).encode()).hexdigest()
+        generations = ['products']
+        if 'category' in signature or 'category_tree' in signature:
+            # Subtree filters also change when categories move
+            generations.append('categories')
+        generation = get_cache_state(generations)
+        cache_key = f"products:count:{generation}:{digest}"
+
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        result = None
+        if signature == {'active': True}:
+            result = self.estimate_count(queryset)
+        if result is None:
+            result = (queryset.count(), False)
+
+        cache.set(cache_key, result, getattr(settings, 'PRODUCT_COUNT_CACHE_TIMEOUT', 300))
+        return result
+
+    def estimate_count(self, queryset):
+        """
+        Planner row estimate for very large unfiltered listings (PostgreSQL only).
+        Returns None when an exact COUNT is cheap enough or not possible.
+        """
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+
+        threshold = getattr(settings, 'PRODUCT_COUNT_ESTIMATE_THRESHOLD', 100000)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            if not row or row[0] < threshold:
+                return None
+
+            sql, params = queryset.order_by().query.sql_with_params()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows']), True
+
+    def paginate_by_cursor(self, queryset, token):
+        """
+        Return one page after (or before) the position encoded in the cursor.
+        Fetches page_size + 1 rows to know whether another page exists.
+        """
+        self.sort_key, self.descending = self.get_sort_key(queryset)
+        cursor = self.decode_cursor(token, queryset)
+        reverse = bool(cursor and cursor['reverse'])
+
+        # Walk backwards for previous pages, then flip the rows back
+        walk_descending = self.descending != reverse
+        sign = '-' if walk_descending else ''
+        queryset = queryset.order_by(f'{sign}{self.sort_key}', f'{sign}id')
+
+        if cursor:
+            lookup = 'lt' if walk_descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{self.sort_key}__{lookup}': cursor['value']}) |
+                Q(**{self.sort_key: cursor['value'], f'id__{lookup}': cursor['id']})
+            )
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if reverse:
+            rows.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        self.next_cursor = self.encode_cursor(rows[-1], reverse=False) if rows and self.has_next else None
+        self.prev_cursor = self.encode_cursor(rows[0], reverse=True) if rows and self.has_previous else None
+        return rows
+
+    def get_sort_key(self, queryset):
+        """Primary sort field of the queryset and whether it is descending"""
+        ordering = [term for term in queryset.query.order_by if isinstance(term, str)]
+        if not ordering or ordering[0].lstrip('-') in ('id', 'pk'):
+            return 'id', not ordering or ordering[0].startswith('-')
+        return ordering[0].lstrip('-'), ordering[0].startswith('-')
+
+    def encode_cursor(self, row, reverse):
+        payload = {
+            'k': self.sort_key,
+            'v': self.to_json_value(self.row_value(row, self.sort_key)),
+            'id': self.row_value(row, 'id'),
+            'r': reverse,
+        }
+        raw = json.dumps(payload, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, token, queryset):
+        """
+        Turn a cursor token back into {'value', 'id', 'reverse'}.
+        Invalid tokens, or tokens issued for a different sort, start from the top.
+        """
+        if not token:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            payload = json.loads(raw)
+            if payload['k'] != self.sort_key:
+                return None
+            return {
+                'value': self.from_json_value(queryset, payload['v']),
+                'id': int(payload['id']),
+                'reverse': bool(payload.get('r')),
+            }
+        except (binascii.Error, ValueError, TypeError, KeyError, ValidationError):
+            return None
+
+    def row_value(self, row, key):
+        # Rows are model instances or values() dicts
+        if isinstance(row, dict):
+            return row[key]
+        return getattr(row, key)
+
+    def to_json_value(self, value):
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            return value.isoformat()
+        if isinstance(value, decimal.Decimal):
+            return str(value)
+        return value
+
+    def from_json_value(self, queryset, value):
+        if self.sort_key in queryset.query.annotations:
+            return queryset.query.annotations[self.sort_key].output_field.to_python(value)
+        try:
+            field = queryset.model._meta.get_field(self.sort_key)
+        except FieldDoesNotExist:
+            return value
+        return field.to_python(value)
+
+    def get_paginated_response(self, data):
+        if self.cursor_mode:
+            return {
+                'results': data,
+                'current_page': None,
+                'total_pages': None,
+                'total_count': None,
+                'count_is_estimate': False,
+                'page_size': self.page_size,
+                'has_next': self.has_next,
+                'has_previous': self.has_previous,
+                'next_cursor': self.next_cursor,
+                'prev_cursor': self.prev_cursor,
+            }
+
+        return {
+            'results': data,
+            'current_page': self.page_number,
+            'total_pages': self.total_pages,
+            'total_count': self.total_count,
+            'count_is_estimate': self.count_is_estimate,
+            'page_size': self.page_size,
+            'has_next': self.has_next,
+            'has_previous': self.has_previous,
+        }
@@ -0,0 +1,127 @@
+"""
+Best-seller ranking
+
+Product.popularity_score holds the units sold over the last
+PRODUCT_POPULARITY_WINDOW_DAYS, each sale weighted by how recent it is
+(the weight halves every PRODUCT_POPULARITY_HALF_LIFE_DAYS). Cancelled
+orders don't count.
+
+The column is indexed, so sort=popular and the best-sellers endpoint are a
+plain ORDER BY. It is kept up to date incrementally:
+- a new order adds its units (weight 1, it was just placed)
+- a cancelled order takes its units back out, approximately (see
+  remove_order_sales)
+and `refresh_popularity_scores` (run periodically, e.g. hourly from cron)
+recomputes every score from OrderItem, which re-applies the decay and drops
+sales that left the window.
+
+Score writes go through QuerySet.update() / bulk_update(), so they don't
+touch updated_at or invalidate the catalog caches; only responses sorted by
+popularity depend on the 'popularity' cache generation.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Greatest, TruncDate
+from django.utils import timezone
+from common.cache import bump_generation
+
+POPULAR_SORT = 'popular'
+BEST_SELLERS_LIMIT = 12
+MAX_BEST_SELLERS_LIMIT = 50
+
+
+def half_life_days():
+    return getattr(settings, 'PRODUCT_POPULARITY_HALF_LIFE_DAYS', 7)
+
+
+def window_days():
+    return getattr(settings, 'PRODUCT_POPULARITY_WINDOW_DAYS', 90)
+
+
+def decay_weight(age_days):
+    """Weight of a sale `age_days` old"""
+    return 0.5 ** (max(age_days, 0) / half_life_days())
+
+
+def invalidate_popularity_caches():
+    bump_generation('popularity')
+
+
+def compute_scores(now=None):
+    """{product_id: decayed units sold} from one grouped query (product x day)"""
+    from orders.models import OrderItem
+
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    daily_sales = (
+        OrderItem.objects.exclude(order__status='cancelled')
+        .filter(order__created_at__gte=now - timedelta(days=window_days()))
+        .annotate(day=TruncDate('order__created_at'))
+        .values('product_id', 'day')
+        .annotate(units=Sum('quantity'))
+        .values_list('product_id', 'day', 'units')
+    )
+    scores = defaultdict(float)
+    for product_id, day, units in daily_sales:
+        scores[product_id] += units * decay_weight((today - day).days)
+    return dict(scores)
+
+
+def refresh_popularity_scores(batch_size=1000):
+    """Recompute every score. Returns the number of products whose score changed."""
+    from .models import Product
+
+    scores = {product_id: round(score, 4) for product_id, score in compute_scores().items()}
+    changed = []
+    current = Product.objects.filter(pk__in=scores).values_list('pk', 'popularity_score')
+    for product_id, score in current.iterator(chunk_size=batch_size):
+        if score != scores[product_id]:
+            changed.append(Product(pk=product_id, popularity_score=scores[product_id]))
+    Product.objects.bulk_update(changed, ['popularity_score'], batch_size=batch_size)
+
+    # Products that sold nothing inside the window drop back to zero
+    cleared = Product.objects.exclude(pk__in=scores).exclude(popularity_score=0).update(popularity_score=0)
+
+    invalidate_popularity_caches()
+    return len(changed) + cleared
+
+
+def units_by_product(order):
+    units = defaultdict(int)
+    for product_id, quantity in order.items.values_list('product_id', 'quantity'):
+        units[product_id] += quantity
+    return units
+
+
+def record_order_sales(order):
+    """Add a newly placed order's units to the scores (one UPDATE per product)"""
+    from .models import Product
+
+    for product_id, quantity in units_by_product(order).items():
+        Product.objects.filter(pk=product_id).update(popularity_score=F('popularity_score') + quantity)
+    invalidate_popularity_caches()
+
+
+def remove_order_sales(order):
+    """
+    Take a cancelled order's units back out of the scores, weighted by the
+    order's age today. The score may hold them at another weight (full
+    weight if no refresh ran since the order was placed, the weight at the
+    last refresh otherwise), so this is exact only for same-day
+    cancellations; the result is clamped at zero and the next
+    refresh_popularity_scores recomputes it exactly.
+    """
+    from .models import Product
+
+    age_days = (timezone.localdate() - timezone.localdate(order.created_at)).days
+    if age_days > window_days():
+        return
+    weight = decay_weight(age_days)
+    for product_id, quantity in units_by_product(order).items():
+        Product.objects.filter(pk=product_id).update(
+            popularity_score=Greatest(F('popularity_score') - quantity * weight, Value(0.0))
+        )
+    invalidate_popularity_caches()
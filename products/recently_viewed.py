@@ -0,0 +1,162 @@
+"""
+Recently viewed products
+
+Every product page view would otherwise be a database write. Instead each
+visitor (user id, or an anonymous cookie) gets a bounded buffer of product
+ids in the cache: the newest view goes to the front, a repeat view moves the
+id to the front, and anything past RECENTLY_VIEWED_LIMIT falls off the end.
+
+The cache may drop a buffer at any time (LocMemCache culls its oldest
+entries), so buffers changed since their last database write are also kept
+in this worker's `pending` map, which the cache can't evict. Pending buffers
+are written to RecentlyViewed.product_ids in one bulk upsert at most once per
+RECENTLY_VIEWED_FLUSH_SECONDS (by the first view after the interval) and
+when the worker exits. A buffer missing from both is reloaded from the
+database.
+
+Anonymous visitors are only persisted once their cookie comes back, so
+cookieless clients (bots, crawlers, curl) never reach the table; until then
+their buffer lives in the cache alone. `prune_recently_viewed` deletes rows
+nobody can read any more: anonymous ones older than the cookie, and any
+untouched for RECENTLY_VIEWED_RETENTION_DAYS.
+"""
+
+import atexit
+import logging
+import threading
+import time
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+COOKIE_NAME = 'recently_viewed'
+COOKIE_MAX_AGE = 30 * 24 * 3600
+
+
+def buffer_limit():
+    return getattr(settings, 'RECENTLY_VIEWED_LIMIT', 20)
+
+
+def get_owner(request):
+    """('user:<id>' / 'anon:<cookie>' or None, new cookie value or None)"""
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}', None
+    cookie = request.COOKIES.get(COOKIE_NAME, '')
+    if len(cookie) == 32 and cookie.isalnum():
+        return f'anon:{cookie}', None
+    cookie = uuid.uuid4().hex
+    return f'anon:{cookie}', cookie
+
+
+def set_owner_cookie(response, cookie):
+    response.set_cookie(
+        COOKIE_NAME, cookie, max_age=COOKIE_MAX_AGE, httponly=True, samesite='Lax',
+        secure=getattr(settings, 'SESSION_COOKIE_SECURE', False),
+    )
+
+
+def buffer_key(owner):
+    return f'recently_viewed:{owner}'
+
+
+# owner -> ids changed since the last flush, and when that flush ran
+pending = {}
+pending_lock = threading.Lock()
+last_flush = time.time()
+
+
+def load_buffer(owner):
+    """Ids most recent first: unflushed changes, then the cache, then the last flushed copy"""
+    from .models import RecentlyViewed
+
+    with pending_lock:
+        ids = pending.get(owner)
+    if ids is None:
+        ids = cache.get(buffer_key(owner))
+    if ids is None:
+        stored = RecentlyViewed.objects.filter(owner=owner).values_list('product_ids', flat=True).first()
+        ids = list(stored or [])
+        cache.set(buffer_key(owner), ids, COOKIE_MAX_AGE)
+    return ids
+
+
+def flush_pending():
+    """Write every pending buffer in one bulk upsert. Returns the number written."""
+    from .models import RecentlyViewed
+
+    global last_flush
+    with pending_lock:
+        buffers = dict(pending)
+        pending.clear()
+        last_flush = time.time()
+    if buffers:
+        now = timezone.now()
+        try:
+            RecentlyViewed.objects.bulk_create(
+                [RecentlyViewed(owner=owner, product_ids=ids, updated_at=now) for owner, ids in buffers.items()],
+                update_conflicts=True, unique_fields=['owner'], update_fields=['product_ids', 'updated_at'],
+            )
+        except Exception:
+            # Keep them for the next flush, unless newer views replaced them meanwhile
+            with pending_lock:
+                for owner, ids in buffers.items():
+                    pending.setdefault(owner, ids)
+            raise
+    return len(buffers)
+
+
+def flush_pending_at_exit():
+    try:
+        flush_pending()
+    except DatabaseError:
+        pass  # the database may already be gone at shutdown
+
+
+atexit.register(flush_pending_at_exit)
+
+
+def record_view(owner, product_id, persist=True):
+    """persist=False: a visitor whose cookie hasn't come back yet, keep the view in the cache only"""
+    ids = load_buffer(owner) if persist else cache.get(buffer_key(owner), [])
+    ids = ([product_id] + [viewed for viewed in ids if viewed != product_id])[:buffer_limit()]
+    cache.set(buffer_key(owner), ids, COOKIE_MAX_AGE)
+    if not persist:
+        return
+    with pending_lock:
+        pending[owner] = ids
+        due = time.time() - last_flush >= getattr(settings, 'RECENTLY_VIEWED_FLUSH_SECONDS', 300)
+    if due:
+        try:
+            flush_pending()
+        except DatabaseError as e:
+            # The page view itself succeeded, the buffers are retried on the next flush
+            logger.warning("Could not flush recently viewed products: %s", e)
+
+
+def get_recent_ids(owner):
+    """Product ids, most recent first"""
+    return load_buffer(owner)
+
+
+def prune_recently_viewed(batch_size=1000):
+    """Delete rows nobody can read any more, batch_size per DELETE. Returns the number deleted."""
+    from django.db.models import Q
+    from .models import RecentlyViewed
+
+    now = timezone.now()
+    stale = (
+        Q(owner__startswith='anon:', updated_at__lt=now - timedelta(seconds=COOKIE_MAX_AGE)) |
+        Q(updated_at__lt=now - timedelta(days=getattr(settings, 'RECENTLY_VIEWED_RETENTION_DAYS', 90)))
+    )
+    deleted = 0
+    while True:
+        batch = list(RecentlyViewed.objects.filter(stale).values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return deleted
+        RecentlyViewed.objects.filter(pk__in=batch).delete()
+        deleted += len(batch)
@@ -0,0 +1,191 @@
+"""
+"Customers also bought" recommendations
+
+Built offline by `build_related_products`:
+1. Load the order -> product incidence (cancelled orders excluded) as baskets
+2. Count how often each pair of products shares a basket
+3. Normalize the counts, keep the top PRODUCT_RELATED_LIMIT per product
+4. Replace the RelatedProduct table in one transaction
+
+Normalization, with n_a = orders containing a, n_ab = orders containing both
+and N = number of orders:
+- cosine: n_ab / sqrt(n_a * n_b)   (default, doesn't over-reward rare items)
+- lift:   n_ab * N / (n_a * n_b)   (how much more often than chance)
+
+The co-occurrence counts come from a sparse matrix product (X^T X over the
+order x product incidence matrix) with NumPy/SciPy, which requirements.txt
+installs. Without them (e.g. a minimal dev setup) a pure-Python pair count
+is used; both give the same results (products/tests.py).
+Baskets larger than PRODUCT_RELATED_MAX_BASKET_SIZE (bulk/B2B orders) are
+left out, they would add a lot of pairs and little signal.
+"""
+
+import math
+import random
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.db import transaction
+from common.cache import bump_generation
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # not installed, the pure-Python path is used instead
+    np = sparse = None
+
+METRICS = ('cosine', 'lift')
+
+
+def related_limit():
+    return getattr(settings, 'PRODUCT_RELATED_LIMIT', 10)
+
+
+def invalidate_related_caches():
+    bump_generation('related')
+
+
+def load_baskets(chunk_size=10000):
+    """[set of product ids] per non-cancelled order, streamed in order id order"""
+    from orders.models import OrderItem
+    from .models import Product
+
+    active = set(Product.objects.filter(is_active=True).values_list('id', flat=True))
+    max_size = getattr(settings, 'PRODUCT_RELATED_MAX_BASKET_SIZE', 50)
+    rows = (
+        OrderItem.objects.exclude(order__status='cancelled')
+        .order_by('order_id')
+        .values_list('order_id', 'product_id')
+        .iterator(chunk_size=chunk_size)
+    )
+    baskets = []
+    current_order, basket = None, set()
+    for order_id, product_id in rows:
+        if order_id != current_order:
+            if basket:
+                baskets.append(basket)
+            current_order, basket = order_id, set()
+        if product_id in active:
+            basket.add(product_id)
+    if basket:
+        baskets.append(basket)
+    return [basket for basket in baskets if len(basket) <= max_size]
+
+
+def synthetic_baskets(order_items, product_count=5000, seed=0):
+    """Random baskets with a skewed (Zipf-like) product popularity, for benchmarking"""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(product_count)]
+    cumulative = []
+    total = 0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+
+    baskets = []
+    remaining = order_items
+    while remaining > 0:
+        size = min(remaining, rng.choice((1, 1, 2, 2, 3, 3, 4, 5, 6, 8)))
+        baskets.append(set(rng.choices(range(1, product_count + 1), cum_weights=cumulative, k=size)))
+        remaining -= size
+    return baskets
+
+
+def normalize(count, count_a, count_b, order_count, metric):
+    if metric == 'lift':
+        return count * order_count / (count_a * count_b)
+    return count / math.sqrt(count_a * count_b)
+
+
+def top_related_python(baskets, limit, min_count, metric):
+    """{product id: [(related id, score), ...]} by counting pairs in Python"""
+    item_counts = Counter()
+    pair_counts = defaultdict(Counter)
+    for basket in baskets:
+        items = sorted(basket)
+        item_counts.update(items)
+        for index, product_a in enumerate(items):
+            counts_a = pair_counts[product_a]
+            for product_b in items[index + 1:]:
+                counts_a[product_b] += 1
+                pair_counts[product_b][product_a] += 1
+
+    order_count = len(baskets)
+    related = {}
+    for product_id, counts in pair_counts.items():
+        scored = [
+            (other_id, normalize(count, item_counts[product_id], item_counts[other_id], order_count, metric))
+            for other_id, count in counts.items() if count >= min_count
+        ]
+        if scored:
+            scored.sort(key=lambda pair: (-pair[1], pair[0]))
+            related[product_id] = scored[:limit]
+    return related
+
+
+def top_related_sparse(baskets, limit, min_count, metric):
+    """Same result as top_related_python, with co-occurrence counts from X^T X"""
+    product_ids = sorted(set().union(*baskets)) if baskets else []
+    if not product_ids:
+        return {}
+    column = {product_id: index for index, product_id in enumerate(product_ids)}
+
+    rows = np.repeat(np.arange(len(baskets)), [len(basket) for basket in baskets])
+    columns = np.fromiter((column[product_id] for basket in baskets for product_id in basket), dtype=np.int64, count=len(rows))
+    incidence = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float64), (rows, columns)),
+        shape=(len(baskets), len(product_ids)),
+    )
+    item_counts = np.asarray(incidence.sum(axis=0)).ravel()
+
+    cooccurrence = (incidence.T @ incidence).tocsr()
+    cooccurrence.setdiag(0)
+    if min_count > 1:
+        cooccurrence.data[cooccurrence.data < min_count] = 0
+    cooccurrence.eliminate_zeros()
+
+    row_index = np.repeat(np.arange(len(product_ids)), np.diff(cooccurrence.indptr))
+    counts_a = item_counts[row_index]
+    counts_b = item_counts[cooccurrence.indices]
+    if metric == 'lift':
+        scores = cooccurrence.data * len(baskets) / (counts_a * counts_b)
+    else:
+        scores = cooccurrence.data / np.sqrt(counts_a * counts_b)
+
+    related = {}
+    ids = np.asarray(product_ids)
+    for index, product_id in enumerate(product_ids):
+        start, end = cooccurrence.indptr[index], cooccurrence.indptr[index + 1]
+        if start == end:
+            continue
+        row_scores = scores[start:end]
+        row_ids = ids[cooccurrence.indices[start:end]]
+        # Highest score first, lowest id on ties (same order as the Python path)
+        order = np.lexsort((row_ids, -row_scores))[:limit]
+        related[product_id] = [(int(row_ids[i]), float(row_scores[i])) for i in order]
+    return related
+
+
+def compute_related(baskets, limit=None, min_count=1, metric='cosine', use_sparse=None):
+    """Top related products per product, SciPy when available unless use_sparse=False"""
+    limit = limit or related_limit()
+    if use_sparse is None:
+        use_sparse = sparse is not None
+    if use_sparse:
+        return top_related_sparse(baskets, limit, min_count, metric)
+    return top_related_python(baskets, limit, min_count, metric)
+
+
+def store_related(related, batch_size=5000):
+    """Replace the RelatedProduct table. Returns the number of rows written."""
+    from .models import RelatedProduct
+
+    entries = [
+        RelatedProduct(product_id=product_id, related_id=related_id, rank=rank, score=round(score, 6))
+        for product_id, neighbours in related.items()
+        for rank, (related_id, score) in enumerate(neighbours, 1)
+    ]
+    with transaction.atomic():
+        RelatedProduct.objects.all().delete()
+        RelatedProduct.objects.bulk_create(entries, batch_size=batch_size)
+    invalidate_related_caches()
+    return len(entries)
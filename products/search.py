@@ -0,0 +1,202 @@
+"""
+Full-text search backend for products
+
+- PostgreSQL: `search_vector` tsvector column kept up to date by a trigger,
+  backed by a GIN index, ranked with ts_rank_cd
+- SQLite: FTS5 external-content shadow table kept in sync by triggers,
+  ranked with bm25
+- Anything else (or a database where the index is missing) falls back to
+  the old name/description icontains filter
+"""
+
+import re
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+
+# Name matches count for more than description matches
+POSTGRES_SEARCH_SQL = [
+    "ALTER TABLE products_product ADD COLUMN IF NOT EXISTS search_vector tsvector;",
+    """
+    CREATE OR REPLACE FUNCTION products_product_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+    """,
+    "DROP TRIGGER IF EXISTS products_product_search_vector_trigger ON products_product;",
+    """
+    CREATE TRIGGER products_product_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, description ON products_product
+    FOR EACH ROW EXECUTE FUNCTION products_product_search_vector_update();
+    """,
+    """
+    UPDATE products_product SET search_vector =
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B');
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_products_search_vector ON products_product USING GIN (search_vector);",
+]
+
+POSTGRES_DROP_SQL = [
+    "DROP INDEX IF EXISTS idx_products_search_vector;",
+    "DROP TRIGGER IF EXISTS products_product_search_vector_trigger ON products_product;",
+    "DROP FUNCTION IF EXISTS products_product_search_vector_update();",
+    "ALTER TABLE products_product DROP COLUMN IF EXISTS search_vector;",
+]
+
+SQLITE_FTS_TABLE_SQL = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_product_fts USING fts5(
+        name, description,
+        content='products_product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    );
+"""
+
+SQLITE_FTS_TRIGGERS = {
+    'products_product_fts_ai': """
+        CREATE TRIGGER IF NOT EXISTS products_product_fts_ai AFTER INSERT ON products_product BEGIN
+            INSERT INTO products_product_fts(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END;
+    """,
+    'products_product_fts_ad': """
+        CREATE TRIGGER IF NOT EXISTS products_product_fts_ad AFTER DELETE ON products_product BEGIN
+            INSERT INTO products_product_fts(products_product_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+        END;
+    """,
+    'products_product_fts_au': """
+        CREATE TRIGGER IF NOT EXISTS products_product_fts_au AFTER UPDATE OF name, description ON products_product BEGIN
+            INSERT INTO products_product_fts(products_product_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO products_product_fts(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END;
+    """,
+}
+
+SQLITE_DROP_SQL = [
+    "DROP TRIGGER IF EXISTS products_product_fts_ai;",
+    "DROP TRIGGER IF EXISTS products_product_fts_ad;",
+    "DROP TRIGGER IF EXISTS products_product_fts_au;",
+    "DROP TABLE IF EXISTS products_product_fts;",
+]
+
+# Per-connection cache of "is the index installed?" so we only look once
+_index_available = {}
+
+
+def install_search_index(connection):
+    """
+    Create (or repair) the search index for the given connection.
+    Safe to run repeatedly - used by the migration and after every migrate.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for sql in POSTGRES_SEARCH_SQL:
+                cursor.execute(sql)
+        elif connection.vendor == 'sqlite':
+            # SQLite drops triggers whenever Django rebuilds the table,
+            # so re-create anything missing and resync the shadow table
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'products_product_fts_%'"
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            cursor.execute(SQLITE_FTS_TABLE_SQL)
+            for sql in SQLITE_FTS_TRIGGERS.values():
+                cursor.execute(sql)
+            if existing != set(SQLITE_FTS_TRIGGERS):
+                cursor.execute("INSERT INTO products_product_fts(products_product_fts) VALUES ('rebuild');")
+    _index_available.pop(connection.alias, None)
+
+
+def drop_search_index(connection):
+    """Remove the search index (migration rollback)"""
+    statements = {
+        'postgresql': POSTGRES_DROP_SQL,
+        'sqlite': SQLITE_DROP_SQL,
+    }.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+    _index_available.pop(connection.alias, None)
+
+
+def search_index_available(connection):
+    """Check (once per process) whether this database has the search index"""
+    if connection.alias not in _index_available:
+        available = False
+        try:
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    cursor.execute(
+                        "SELECT 1 FROM information_schema.columns "
+                        "WHERE table_name = 'products_product' AND column_name = 'search_vector'"
+                    )
+                    available = cursor.fetchone() is not None
+                elif connection.vendor == 'sqlite':
+                    cursor.execute(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_product_fts'"
+                    )
+                    available = cursor.fetchone() is not None
+        except Exception:
+            available = False
+        _index_available[connection.alias] = available
+    return _index_available[connection.alias]
+
+
+def tokenize(search_query):
+    """Split a search query into lowercase word tokens (drops punctuation/operators)"""
+    return re.findall(r'\w+', search_query.lower())
+
+
+def search_products(queryset, search_query):
+    """
+    Filter a Product queryset by a free-text query.
+    Adds a `search_rank` annotation (higher = more relevant) that
+    `sort=relevance` orders by. Each word is matched as a prefix so
+    partially typed words still hit, and all words must match.
+    """
+    tokens = tokenize(search_query)
+    connection = connections[queryset.db]
+
+    if tokens and search_index_available(connection):
+        if connection.vendor == 'postgresql':
+            tsquery = ' & '.join(f'{token}:*' for token in tokens)
+            match = RawSQL(
+                "products_product.search_vector @@ to_tsquery('english', %s)",
+                (tsquery,),
+                output_field=BooleanField(),
+            )
+            rank = RawSQL(
+                "ts_rank_cd(products_product.search_vector, to_tsquery('english', %s))",
+                (tsquery,),
+                output_field=FloatField(),
+            )
+            return queryset.filter(match).annotate(search_rank=rank)
+
+        if connection.vendor == 'sqlite':
+            fts_query = ' '.join(f'"{token}"*' for token in tokens)
+            match_ids = RawSQL(
+                "SELECT rowid FROM products_product_fts WHERE products_product_fts MATCH %s",
+                (fts_query,),
+            )
+            # bm25 is "lower is better", flip it so both backends sort descending
+            rank = RawSQL(
+                "(SELECT -bm25(products_product_fts, 10.0, 1.0) FROM products_product_fts "
+                "WHERE products_product_fts MATCH %s AND rowid = products_product.id)",
+                (fts_query,),
+                output_field=FloatField(),
+            )
+            return queryset.filter(id__in=match_ids).annotate(search_rank=rank)
+
+    # Fallback: plain substring search, no ranking available
+    return queryset.filter(
+        Q(name__icontains=search_query) |
+        Q(description__icontains=search_query)
+    ).annotate(search_rank=Value(0.0, output_field=FloatField()))
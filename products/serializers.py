@@ -1,15 +1,39 @@
+from urllib.parse import urljoin
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.utils.encoding import filepath_to_uri
 from rest_framework import serializers
+from .images import build_image_srcset, build_image_variants
+from .inventory import stock_flags
 from .models import Product
 from categories.serializers import CategoryListSerializer
+from categories.tree import get_category_nodes
+from common.serializers import SparseFieldsSerializerMixin, get_sparse_selection
 
-class ProductListSerializer(serializers.ModelSerializer):
-    """Serializer for product listings """
+# Fallback for production - use your actual Render URL
+FALLBACK_SITE_URL = "https://alx-project-nexus-agn5.onrender.com"
+
+
+def fallback_absolute_url(url):
+    """Absolute URL for a storage URL ('/media/...' or already absolute) when there is no request"""
+    return urljoin(FALLBACK_SITE_URL + '/', url)
+
+
+class ProductListSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    """Serializer for product listings (supports ?fields= and ?expand=category)"""
     category_name = serializers.CharField(source='category.name', read_only=True)
     image = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = Product
-        fields = ['id', 'name', 'price', 'category', 'category_name', 'image', 'is_featured', 'is_active']
+        fields = ['id', 'name', 'price', 'category', 'category_name', 'image', 'image_variants', 'image_srcset', 'is_featured', 'is_active']
+        expandable_fields = {'category': CategoryListSerializer}
+        field_dependencies = {
+            'image': ['image'],
+            'image_variants': ['image_variants'],
+            'image_srcset': ['image_variants'],
+        }
     
     def get_image(self, obj):
         if obj.image:
@@ -17,19 +41,151 @@ class ProductListSerializer(serializers.ModelSerializer):
             if request:
                 return request.build_absolute_uri(obj.image.url)
             else:
-                # Fallback for production - use your actual Render URL
-                return f"https://alx-project-nexus-agn5.onrender.com/media/{obj.image.url}"
+                return fallback_absolute_url(obj.image.url)
         return None
 
+    def get_image_variants(self, obj):
+        if not obj.image_variants:
+            return None
+        return build_image_variants(obj.image_variants, media_url_builder(self.context.get('request')))
+
+    def get_image_srcset(self, obj):
+        if not obj.image_variants:
+            return None
+        return build_image_srcset(obj.image_variants, media_url_builder(self.context.get('request')))
+
+
+# Columns read by the values() fast path, in output order
+PRODUCT_LIST_VALUES = ['id', 'name', 'price', 'category', 'category__name', 'image', 'image_variants', 'is_featured', 'is_active']
+
+# Output field -> values() columns it is built from
+PRODUCT_LIST_SOURCES = {
+    'id': ['id'],
+    'name': ['name'],
+    'price': ['price'],
+    'category': ['category'],
+    'category_name': ['category__name'],
+    'image': ['image'],
+    'image_variants': ['image_variants'],
+    'image_srcset': ['image_variants'],
+    'is_featured': ['is_featured'],
+    'is_active': ['is_active'],
+}
+
+
+def product_fieldset(request):
+    """
+    (fields, expand) for the values() fast path from ?fields= / ?expand=
+    fields is None when every field is wanted
+    """
+    selected, expand = get_sparse_selection(request)
+    return (set(selected) if selected is not None else None), set(expand)
+
+
+def product_list_rows(queryset, fields=None):
+    """
+    values() version of a product listing queryset for serialize_product_rows.
+    Also selects the sort keys so cursor pagination can read them from the rows.
+    With `fields`, only the columns those output fields need are selected
+    (and the category join is skipped unless category_name is wanted).
+    """
+    if fields is None:
+        columns = PRODUCT_LIST_VALUES
+    else:
+        columns = ['id'] + [
+            column for column in PRODUCT_LIST_VALUES
+            if column != 'id' and any(column in PRODUCT_LIST_SOURCES[name] for name in fields if name in PRODUCT_LIST_SOURCES)
+        ]
+    sort_keys = [term.lstrip('-') for term in queryset.query.order_by if isinstance(term, str)]
+    columns = columns + [key for key in sort_keys if key not in columns]
+    return queryset.values(*columns)
+
 
-class ProductDetailSerializer(serializers.ModelSerializer):
-    """Detailed serializer for individual product pages"""
+def media_url_builder(request):
+    """
+    Return a function turning a stored file name into the same absolute URL
+    ProductListSerializer.get_image produces, with the host/prefix worked out once
+    """
+    if request:
+        host = request.build_absolute_uri('/')[:-1]
+        if isinstance(default_storage, FileSystemStorage) and default_storage.base_url.startswith('/'):
+            prefix = host + default_storage.base_url
+            return lambda name: prefix + filepath_to_uri(name).lstrip('/')
+        return lambda name: request.build_absolute_uri(default_storage.url(name))
+    return lambda name: fallback_absolute_url(default_storage.url(name))
+
+
+def serialize_product_rows(rows, request=None, fields=None, expand=()):
+    """
+    High-throughput equivalent of ProductListSerializer(rows, many=True).data
+    for rows from product_list_rows(): no model instances and no per-row
+    method fields. Produces byte-identical JSON.
+    `fields` / `expand` follow ?fields= / ?expand= (see product_fieldset).
+    """
+    price = ProductListSerializer().fields['price']
+    image_url = media_url_builder(request)
+    if fields is None and not expand:
+        return [
+            {
+                'id': row['id'],
+                'name': row['name'],
+                'price': price.to_representation(row['price']),
+                'category': row['category'],
+                'category_name': row['category__name'],
+                'image': image_url(row['image']) if row['image'] else None,
+                'image_variants': build_image_variants(row['image_variants'], image_url),
+                'image_srcset': build_image_srcset(row['image_variants'], image_url),
+                'is_featured': row['is_featured'],
+                'is_active': row['is_active'],
+            }
+            for row in rows
+        ]
+
+    builders = {
+        'id': lambda row: row['id'],
+        'name': lambda row: row['name'],
+        'price': lambda row: price.to_representation(row['price']),
+        'category': lambda row: row['category'],
+        'category_name': lambda row: row['category__name'],
+        'image': lambda row: image_url(row['image']) if row['image'] else None,
+        'image_variants': lambda row: build_image_variants(row['image_variants'], image_url),
+        'image_srcset': lambda row: build_image_srcset(row['image_variants'], image_url),
+        'is_featured': lambda row: row['is_featured'],
+        'is_active': lambda row: row['is_active'],
+    }
+    if 'category' in expand:
+        # Same shape as CategoryListSerializer, read from the cached tree (no join)
+        nodes = get_category_nodes()
+        builders['category'] = lambda row: {
+            key: nodes[row['category']][key] for key in ('id', 'name', 'slug', 'is_active')
+        } if row['category'] in nodes else None
+
+    names = [name for name in PRODUCT_LIST_SOURCES if fields is None or name in fields]
+    return [{name: builders[name](row) for name in names} for row in rows]
+
+
+class ProductDetailSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    """Detailed serializer for individual product pages (supports ?fields=)"""
     category = CategoryListSerializer(read_only=True)
+    in_stock = serializers.SerializerMethodField()
+    low_stock = serializers.SerializerMethodField()
     image = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = Product
-        fields = ['id', 'name', 'description', 'price', 'category', 'stock_quantity', 'image', 'is_featured', 'is_active', 'created_at']
+        fields = ['id', 'name', 'description', 'price', 'category', 'stock_quantity', 'in_stock', 'low_stock', 'image', 'image_variants', 'image_srcset', 'is_featured', 'is_active', 'created_at']
+        # in_stock / low_stock come from the same column as stock_quantity, so they never disagree
+        field_dependencies = dict(
+            ProductListSerializer.Meta.field_dependencies, in_stock=['stock_quantity'], low_stock=['stock_quantity']
+        )
+
+    def get_in_stock(self, obj):
+        return stock_flags(obj.stock_quantity)[0]
+
+    def get_low_stock(self, obj):
+        return stock_flags(obj.stock_quantity)[1]
     
     def get_image(self, obj):
         if obj.image:
@@ -37,13 +193,39 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             if request:
                 return request.build_absolute_uri(obj.image.url)
             else:
-                # Fallback for production - use your actual Render URL
-                return f"https://alx-project-nexus-agn5.onrender.com/media/{obj.image.url}"
+                return fallback_absolute_url(obj.image.url)
         return None
 
+    def get_image_variants(self, obj):
+        if not obj.image_variants:
+            return None
+        return build_image_variants(obj.image_variants, media_url_builder(self.context.get('request')))
+
+    def get_image_srcset(self, obj):
+        if not obj.image_variants:
+            return None
+        return build_image_srcset(obj.image_variants, media_url_builder(self.context.get('request')))
+
 
 class ProductCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating/updating products (admin only)"""
     class Meta:
         model = Product
-        fields = ['name', 'description', 'price', 'category', 'stock_quantity', 'image', 'is_featured', 'is_active']
\ No newline at end of file
+        fields = ['name', 'description', 'price', 'category', 'stock_quantity', 'image', 'is_featured', 'is_active']
+
+class ProductBulkUpdateItemSerializer(serializers.Serializer):
+    """One entry of an admin bulk price/stock update, matched by id or sku"""
+    id = serializers.IntegerField(required=False)
+    sku = serializers.CharField(required=False, max_length=50)
+    price = serializers.DecimalField(required=False, max_digits=10, decimal_places=2, min_value=0)
+    stock_quantity = serializers.IntegerField(required=False, min_value=0)
+    is_active = serializers.BooleanField(required=False)
+
+    UPDATE_FIELDS = ('price', 'stock_quantity', 'is_active')
+
+    def validate(self, data):
+        if 'id' not in data and 'sku' not in data:
+            raise serializers.ValidationError("Either id or sku is required")
+        if not any(field in data for field in self.UPDATE_FIELDS):
+            raise serializers.ValidationError("Nothing to update (price, stock_quantity or is_active)")
+        return data
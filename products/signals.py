@@ -0,0 +1,103 @@
+from django.db.models import Count, Max, Sum
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from categories.models import Category
+from common.cache import bump_generation, register_fingerprint
+from .featured import SNAPSHOT_FIELDS, featured_snapshot, invalidate_featured_snapshot
+from .images import refresh_image_variants
+from .inventory import record_movements
+from .models import Product
+from .spelling import spelling_index
+
+# Writes made by other processes (imports, cron jobs, other workers)
+register_fingerprint('products', Product.objects.all(), rows=Count('pk'), modified=Max('updated_at'))
+register_fingerprint('popularity', Product.objects.all(), total=Sum('popularity_score'))
+
+
+def invalidate_product_caches():
+    """Drop every cached value derived from the products table"""
+    bump_generation('products')
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, instance, **kwargs):
+    invalidate_product_caches()
+
+
+@receiver(post_save, sender=Product)
+def product_image_changed(sender, instance, raw=False, **kwargs):
+    # Generate thumbnail/medium/WebP copies whenever the image changes
+    if not raw and refresh_image_variants(instance):
+        invalidate_product_caches()
+
+
+@receiver(post_save, sender=Product)
+def featured_product_changed(sender, instance, update_fields=None, **kwargs):
+    # Saves that can't change a featured row leave the snapshot alone
+    if update_fields is not None and not SNAPSHOT_FIELDS.intersection(update_fields):
+        return
+    if instance.is_featured or featured_snapshot.contains(instance.pk):
+        invalidate_featured_snapshot()
+
+
+@receiver(post_delete, sender=Product)
+def featured_product_deleted(sender, instance, **kwargs):
+    if featured_snapshot.contains(instance.pk):
+        invalidate_featured_snapshot()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def featured_category_changed(sender, instance, **kwargs):
+    # Snapshot rows carry the category name
+    if featured_snapshot.uses_category(instance.pk):
+        invalidate_featured_snapshot()
+
+
+@receiver(post_save, sender=Product)
+def index_product_name(sender, instance, **kwargs):
+    spelling_index.update(('product', instance.pk), instance.name, active=instance.is_active)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product_name(sender, instance, **kwargs):
+    spelling_index.update(('product', instance.pk), '', active=False)
+
+
+@receiver(post_save, sender=Category)
+def index_category_name(sender, instance, **kwargs):
+    spelling_index.update(('category', instance.pk), instance.name, active=instance.is_active)
+
+
+@receiver(post_delete, sender=Category)
+def unindex_category_name(sender, instance, **kwargs):
+    spelling_index.update(('category', instance.pk), '', active=False)
+
+
+@receiver(pre_save, sender=Product)
+def remember_stock(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Compared with the stock the instance was loaded with; only instances that
+    # weren't loaded from the database (or deferred the field) pay for a lookup
+    instance._previous_stock = None
+    if raw or not instance.pk or (update_fields is not None and 'stock_quantity' not in update_fields):
+        return
+    previous = getattr(instance, '_loaded_stock', None)
+    if previous is None:
+        previous = Product.objects.filter(pk=instance.pk).values_list('stock_quantity', flat=True).first()
+    instance._previous_stock = previous
+
+
+@receiver(post_save, sender=Product)
+def log_stock_change(sender, instance, created=False, raw=False, **kwargs):
+    # Saves go into the ledger here; checkout, restock, bulk update and import log their own
+    if raw:
+        return
+    if created:
+        record_movements('restock', {instance.pk: instance.stock_quantity}, 'created')
+    elif getattr(instance, '_previous_stock', None) is not None:
+        record_movements('adjustment', {instance.pk: instance.stock_quantity - instance._previous_stock}, 'edited')
+    else:
+        return
+    # A second save of the same instance only logs what changed since this one
+    instance._loaded_stock = instance.stock_quantity
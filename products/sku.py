@@ -0,0 +1,86 @@
+"""
+SKU allocation
+
+SKUs look like ELE-PR-IPHO-0000A: category code, brand code, name code and
+a 5 character base36 suffix. Suffixes come from a per-category-code counter
+(SkuSequence) that is advanced in blocks under SELECT ... FOR UPDATE, so
+allocating never needs a uniqueness check against the products table and
+bulk_create can be given ready-made SKUs.
+
+Older SKUs end in a 4 character hex hash; the new suffix is always at least
+5 characters long, so the two schemes can't produce the same SKU.
+"""
+
+import string
+import threading
+from django.conf import settings
+from django.db import connection, transaction
+
+SUFFIX_ALPHABET = string.digits + string.ascii_uppercase
+SUFFIX_LENGTH = 5
+
+_reserved_blocks = {}  # category code -> [next value, end value) already reserved by this process
+_lock = threading.Lock()
+
+
+def encode_suffix(value):
+    """Base36, zero padded to SUFFIX_LENGTH (longer once a code runs past 36**5)"""
+    digits = []
+    while value:
+        value, remainder = divmod(value, 36)
+        digits.append(SUFFIX_ALPHABET[remainder])
+    return ''.join(reversed(digits)).rjust(SUFFIX_LENGTH, '0')
+
+
+def reserve_block(code, size):
+    """Advance the counter for `code` by `size` and return the first reserved value"""
+    from .models import SkuSequence
+
+    with transaction.atomic():
+        SkuSequence.objects.get_or_create(prefix=code)
+        sequence = SkuSequence.objects.select_for_update().get(prefix=code)
+        start = sequence.next_value
+        sequence.next_value = start + size
+        sequence.save(update_fields=['next_value'])
+    return start
+
+
+def allocate_suffixes(code, count):
+    """`count` unused suffix values for one category code"""
+    if connection.in_atomic_block:
+        # A reservation made here could still be rolled back, so never keep
+        # the rest of a block around - take exactly what is needed
+        start = reserve_block(code, count)
+        return list(range(start, start + count))
+
+    values = []
+    with _lock:
+        block = _reserved_blocks.get(code)
+        if block:
+            taken = min(count, block[1] - block[0])
+            values.extend(range(block[0], block[0] + taken))
+            block[0] += taken
+        missing = count - len(values)
+        if missing:
+            size = max(missing, getattr(settings, 'PRODUCT_SKU_BLOCK_SIZE', 50))
+            start = reserve_block(code, size)
+            values.extend(range(start, start + missing))
+            _reserved_blocks[code] = [start + missing, start + size]
+    return values
+
+
+def assign_skus(products):
+    """
+    Fill in the SKU of every product that doesn't have one, one counter
+    update per category code. Meant for bulk_create callers, so products
+    should have their category instance set already.
+    """
+    pending = {}
+    for product in products:
+        if not product.sku:
+            pending.setdefault(product.get_sku_category_code(), []).append(product)
+
+    for code, group in pending.items():
+        for product, value in zip(group, allocate_suffixes(code, len(group))):
+            product.sku = f"{product.get_sku_prefix()}-{encode_suffix(value)}"
+    return products
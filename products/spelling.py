@@ -0,0 +1,182 @@
+"""
+"Did you mean" spelling correction for product search
+
+An in-process index over the words in active product names and category
+names. Candidate corrections are found through shared character trigrams
+and ranked by Damerau-Levenshtein distance, then by how common the word is.
+
+The index is built from the database once per worker on first use and kept
+current by the Product/Category signals (products/signals.py). Writes the
+signals never see (import_products, other workers) are caught by comparing
+the products/categories cache generations and the source fingerprint
+autocomplete uses: the first is free, the second is checked at most once
+per PRODUCT_SPELLING_REFRESH_SECONDS. Either changing rebuilds the index.
+"""
+
+import threading
+import time
+from collections import Counter, defaultdict
+from django.conf import settings
+from common.cache import get_generation
+from .autocomplete import GENERATIONS, get_source_version
+from .search import tokenize
+
+MIN_WORD_LENGTH = 3
+MAX_CANDIDATES = 50
+
+
+def trigrams(word):
+    padded = f'  {word} '
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def edit_distance(first, second, limit):
+    """Damerau-Levenshtein (optimal string alignment) distance, gives up above `limit`"""
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    previous_previous = None
+    previous = list(range(len(second) + 1))
+    for i, first_char in enumerate(first, 1):
+        current = [i] + [0] * len(second)
+        for j, second_char in enumerate(second, 1):
+            cost = first_char != second_char
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (i > 1 and j > 1 and first_char == second[j - 2] and first[i - 2] == second_char):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        # A transposition can still reach back one row, so both rows must be over
+        if min(current) > limit and min(previous) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+def current_generations():
+    return tuple(get_generation(name) for name in GENERATIONS)
+
+
+class SpellingIndex:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.loaded = False
+        self.word_counts = Counter()
+        self.trigram_words = defaultdict(set)
+        self.sources = {}  # ('product', id) / ('category', id) -> words
+        self.generations = None
+        self.source_version = None
+        self.checked_at = 0
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            with self.lock:
+                if not self.loaded:
+                    self.load()
+        elif self.is_stale() and self.lock.acquire(blocking=False):
+            # Only one thread rebuilds, the others keep answering from the old words
+            try:
+                self.load()
+            finally:
+                self.lock.release()
+
+    def is_stale(self):
+        if self.generations != current_generations():
+            return True
+        now = time.time()
+        if now - self.checked_at < getattr(settings, 'PRODUCT_SPELLING_REFRESH_SECONDS', 60):
+            return False
+        self.checked_at = now
+        return self.source_version != get_source_version()
+
+    def load(self):
+        """(Re)build the index from every active product and category name"""
+        from categories.models import Category
+        from .models import Product
+
+        # Read the versions first, so a write during the queries triggers another rebuild
+        generations = current_generations()
+        source_version = get_source_version()
+        fresh = SpellingIndex()
+        for product_id, name in Product.objects.filter(is_active=True).values_list('id', 'name'):
+            fresh.set_source(('product', product_id), name)
+        for category_id, name in Category.objects.filter(is_active=True).values_list('id', 'name'):
+            fresh.set_source(('category', category_id), name)
+
+        self.word_counts = fresh.word_counts
+        self.trigram_words = fresh.trigram_words
+        self.sources = fresh.sources
+        self.generations = generations
+        self.source_version = source_version
+        self.checked_at = time.time()
+        self.loaded = True
+
+    def set_source(self, key, text):
+        """(Re)index the words of one product or category name"""
+        with self.lock:
+            self.remove_source(key)
+            words = tuple(word for word in tokenize(text or '') if len(word) >= MIN_WORD_LENGTH and not word.isdigit())
+            self.sources[key] = words
+            for word in words:
+                if not self.word_counts[word]:
+                    for gram in trigrams(word):
+                        self.trigram_words[gram].add(word)
+                self.word_counts[word] += 1
+
+    def remove_source(self, key):
+        with self.lock:
+            for word in self.sources.pop(key, ()):
+                self.word_counts[word] -= 1
+                if self.word_counts[word] <= 0:
+                    del self.word_counts[word]
+                    for gram in trigrams(word):
+                        self.trigram_words[gram].discard(word)
+
+    def update(self, key, text, active=True):
+        """Incremental update from signals - skipped until the index is first used"""
+        if not self.loaded:
+            return
+        if active:
+            self.set_source(key, text)
+        else:
+            self.remove_source(key)
+
+    def closest_words(self, word, limit=3):
+        """Known words closest to `word`, best first"""
+        max_distance = 1 if len(word) <= 4 else 2
+        with self.lock:
+            overlap = Counter()
+            for gram in trigrams(word):
+                overlap.update(self.trigram_words.get(gram, ()))
+            scored = []
+            for candidate, _ in overlap.most_common(MAX_CANDIDATES):
+                distance = edit_distance(word, candidate, max_distance)
+                if distance <= max_distance:
+                    scored.append((distance, -self.word_counts[candidate], candidate))
+        return [candidate for _, _, candidate in sorted(scored)[:limit]]
+
+    def suggest(self, search_query, limit=5):
+        """
+        Returns {'query': corrected query or None, 'terms': closest known words}
+        Words the index already knows (or too short to judge) are kept as typed.
+        """
+        self.ensure_loaded()
+        corrected_words = []
+        terms = []
+        changed = False
+        for word in tokenize(search_query):
+            if len(word) < MIN_WORD_LENGTH or word.isdigit() or word in self.word_counts:
+                corrected_words.append(word)
+                continue
+            closest = self.closest_words(word)
+            if closest:
+                corrected_words.append(closest[0])
+                changed = True
+                terms.extend(term for term in closest if term not in terms)
+            else:
+                corrected_words.append(word)
+
+        return {
+            'query': ' '.join(corrected_words) if changed else None,
+            'terms': terms[:limit],
+        }
+
+
+spelling_index = SpellingIndex()
@@ -1,3 +1,600 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock, skipUnless
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from cart.models import Cart, CartItem
+from categories.models import Category
+from orders.models import Order
+from users.models import User
+from . import recommendations, recently_viewed, sku
+from .autocomplete import AutocompleteService, get_source_version
+from .inventory import compact, current_stock, find_drift, record_movements
+from .models import InventoryMovement, InventorySnapshot, Product, RecentlyViewed
+from .pagination import ProductPagination
+from .recommendations import synthetic_baskets, top_related_python, top_related_sparse
 
-# Create your tests here.
+
+class RelatedProductsComputationTests(SimpleTestCase):
+    """Both co-occurrence paths of build_related_products must agree"""
+
+    def setUp(self):
+        self.baskets = synthetic_baskets(3000, product_count=60, seed=1)
+
+    def rounded(self, related):
+        return {
+            product_id: [(other_id, round(score, 9)) for other_id, score in pairs]
+            for product_id, pairs in related.items()
+        }
+
+    def test_python_counts_pairs(self):
+        related = top_related_python([{1, 2}, {1, 2, 3}, {3}], limit=5, min_count=1, metric='cosine')
+        # 1 and 2 share both their orders, 3 is in 2 orders and shares one with each
+        self.assertEqual(related[1][0], (2, 1.0))
+        self.assertEqual([other_id for other_id, _ in related[3]], [1, 2])
+        self.assertNotIn(3, dict(top_related_python([{1, 2}, {1, 2, 3}], 5, 2, 'cosine')))
+
+    @skipUnless(recommendations.sparse is not None, "NumPy/SciPy not installed")
+    def test_sparse_matches_python(self):
+        for metric in recommendations.METRICS:
+            for min_count in (1, 3):
+                with self.subTest(metric=metric, min_count=min_count):
+                    self.assertEqual(
+                        self.rounded(top_related_sparse(self.baskets, 10, min_count, metric)),
+                        self.rounded(top_related_python(self.baskets, 10, min_count, metric)),
+                    )
+
+
+class RecentlyViewedTests(TestCase):
+    """Views must survive the cache dropping the buffer, before and after a flush"""
+
+    owner = 'anon:' + 'a' * 32
+
+    def setUp(self):
+        cache.clear()
+        recently_viewed.pending.clear()
+        recently_viewed.last_flush = time.time()
+
+    def tearDown(self):
+        recently_viewed.pending.clear()
+
+    def test_views_survive_cache_eviction_before_flush(self):
+        for product_id in (1, 2, 3, 2):
+            recently_viewed.record_view(self.owner, product_id)
+        self.assertFalse(RecentlyViewed.objects.exists())
+
+        cache.clear()
+        self.assertEqual(recently_viewed.get_recent_ids(self.owner), [2, 3, 1])
+
+    def test_flush_writes_pending_buffers_once(self):
+        recently_viewed.record_view(self.owner, 1)
+        recently_viewed.record_view('user:1', 5)
+        self.assertEqual(recently_viewed.flush_pending(), 2)
+        self.assertEqual(recently_viewed.flush_pending(), 0)
+
+        # A restarted worker starts with an empty cache and nothing pending
+        cache.clear()
+        self.assertEqual(recently_viewed.get_recent_ids(self.owner), [1])
+        recently_viewed.record_view(self.owner, 4)
+        recently_viewed.flush_pending()
+        self.assertEqual(RecentlyViewed.objects.get(owner=self.owner).product_ids, [4, 1])
+
+    def test_cookieless_views_are_not_persisted_until_the_cookie_comes_back(self):
+        category = Category.objects.create(name='Electronics', slug='electronics')
+        products = [
+            Product.objects.create(name=f'Phone {index}', description='A phone', price=100, category=category)
+            for index in range(2)
+        ]
+        client = APIClient(HTTP_HOST='localhost')
+        response = client.get(f'/api/products/{products[0].pk}/', secure=True)
+        cookie = response.cookies[recently_viewed.COOKIE_NAME].value
+        self.assertEqual(recently_viewed.pending, {})
+
+        # A client that never sends the cookie back (bot, curl) leaves no trace
+        APIClient(HTTP_HOST='localhost').get(f'/api/products/{products[1].pk}/', secure=True)
+        self.assertEqual(recently_viewed.pending, {})
+
+        client.get(f'/api/products/{products[1].pk}/', secure=True)
+        self.assertEqual(recently_viewed.pending, {f'anon:{cookie}': [products[1].pk, products[0].pk]})
+
+    def test_prune_deletes_unreachable_rows(self):
+        now = timezone.now()
+        for owner, age in (('anon:old', 31), ('anon:new', 1), ('user:1', 31), ('user:2', 91)):
+            row = RecentlyViewed.objects.create(owner=owner, product_ids=[1])
+            RecentlyViewed.objects.filter(pk=row.pk).update(updated_at=now - timedelta(days=age))
+
+        self.assertEqual(recently_viewed.prune_recently_viewed(batch_size=1), 2)
+        self.assertEqual(sorted(RecentlyViewed.objects.values_list('owner', flat=True)), ['anon:new', 'user:1'])
+
+    @override_settings(RECENTLY_VIEWED_FLUSH_SECONDS=0, RECENTLY_VIEWED_LIMIT=3)
+    def test_view_after_interval_flushes_bounded_buffer(self):
+        for product_id in range(1, 6):
+            recently_viewed.record_view(self.owner, product_id)
+        self.assertEqual(RecentlyViewed.objects.get(owner=self.owner).product_ids, [5, 4, 3])
+        self.assertEqual(recently_viewed.pending, {})
+
+
+class InventoryLedgerTests(TestCase):
+    """Every stock change is in the ledger, and snapshot + later movements always equal it"""
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Electronics', slug='electronics')
+        self.product = Product.objects.create(
+            name='Phone', description='A phone', price=100, category=self.category, stock_quantity=10
+        )
+        self.admin = User.objects.create_superuser(email='stock-admin@example.com', username='stockadmin', password='password')
+
+    def movements(self, product=None):
+        product = product or self.product
+        return list(InventoryMovement.objects.filter(product=product).order_by('id').values_list('kind', 'quantity'))
+
+    def assertLedgerMatchesStock(self):
+        self.product.refresh_from_db()
+        self.assertEqual(current_stock([self.product.pk]), {self.product.pk: self.product.stock_quantity})
+        self.assertEqual(find_drift(), {})
+
+    def test_saves_log_adjustments_from_the_loaded_stock(self):
+        product = Product.objects.get(pk=self.product.pk)
+        with CaptureQueriesContext(connection) as queries:
+            product.name = 'Phone 2'
+            product.save()
+        self.assertFalse([query for query in queries.captured_queries if '"stock_quantity" FROM' in query['sql']])
+        self.assertEqual(self.movements(), [('restock', 10)])
+
+        product.stock_quantity = 7
+        product.save()
+        product.stock_quantity = 8
+        product.save()
+        self.assertEqual(self.movements(), [('restock', 10), ('adjustment', -3), ('adjustment', 1)])
+        self.assertLedgerMatchesStock()
+
+    def test_stale_instances_do_not_overwrite_concurrent_stock_changes(self):
+        stale = Product.objects.get(pk=self.product.pk)
+        # A checkout elsewhere takes 3 units after `stale` was loaded
+        Product.objects.filter(pk=self.product.pk).update(stock_quantity=F('stock_quantity') - 3)
+        record_movements('sale', {self.product.pk: -3}, 'ORD-1')
+
+        stale.name = 'Phone 2'
+        stale.save()
+        self.assertLedgerMatchesStock()
+        self.assertEqual(self.product.stock_quantity, 7)
+
+        # Setting a new stock logs the change from the row, not from the stale value
+        stale.stock_quantity = 20
+        stale.save()
+        self.assertEqual(self.movements()[-1], ('adjustment', 13))
+        self.assertLedgerMatchesStock()
+
+    def test_checkout_and_cancel_log_movements(self):
+        cart = Cart.objects.create(user=self.admin)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=2)
+        order = Order.create_from_cart(cart, 'Nairobi')
+        self.assertEqual(self.movements()[-1], ('sale', -2))
+        self.assertLedgerMatchesStock()
+
+        self.assertTrue(order.cancel())
+        self.assertEqual(self.movements()[-1], ('cancel', 2))
+        self.assertLedgerMatchesStock()
+
+    def test_bulk_update_logs_adjustments(self):
+        client = APIClient(HTTP_HOST='localhost')
+        client.force_authenticate(self.admin)
+        response = client.post(
+            '/api/products/bulk-update/', [{'id': self.product.pk, 'stock_quantity': 4}], format='json', secure=True
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.movements()[-1], ('adjustment', -6))
+        self.assertLedgerMatchesStock()
+
+    def test_import_logs_restocks(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'products.csv')
+            with open(path, 'w', newline='') as csv_file:
+                csv_file.write('name,description,price,category,stock_quantity\nCase,A case,10,electronics,25\n')
+            call_command('import_products', path, stdout=io.StringIO())
+
+        imported = Product.objects.get(name='Case')
+        self.assertEqual(self.movements(imported), [('restock', 25)])
+        self.assertEqual(find_drift(), {})
+
+    def test_compaction_keeps_snapshot_plus_delta_equal_to_the_ledger(self):
+        for stock in (7, 12, 3):
+            self.product.stock_quantity = stock
+            self.product.save()
+        # Old enough to be settled, and past the retention period
+        InventoryMovement.objects.update(created_at=timezone.now() - timedelta(days=400))
+
+        self.assertEqual(compact(), (1, 4))
+        self.assertFalse(InventoryMovement.objects.exists())
+        self.assertEqual(InventorySnapshot.objects.get(product=self.product).quantity, 3)
+        self.assertLedgerMatchesStock()
+
+        # Movements after the snapshot are added on top of it
+        self.product.stock_quantity = 5
+        self.product.save()
+        self.assertLedgerMatchesStock()
+        # Committed movements are folded right away, retention only decides deletion
+        self.assertEqual(compact(), (1, 0))
+        self.assertEqual(InventorySnapshot.objects.get(product=self.product).quantity, 5)
+        self.assertLedgerMatchesStock()
+
+
+class CatalogFingerprintTests(TestCase):
+    """Listing ETags and cached responses notice writes this process never bumped a generation for"""
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Electronics', slug='electronics')
+        self.product = Product.objects.create(
+            name='Phone', description='A phone', price=100, category=category, stock_quantity=10
+        )
+        self.client = APIClient(HTTP_HOST='localhost')
+
+    def get_listing(self, **headers):
+        return self.client.get('/api/products/', secure=True, **headers)
+
+    @override_settings(CATALOG_FINGERPRINT_TIMEOUT=0)
+    def test_write_from_another_process_changes_etag_and_cache_key(self):
+        first = self.get_listing()
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(self.get_listing(HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        # A queryset update sends no signal, like a write made by another worker
+        Product.objects.filter(pk=self.product.pk).update(
+            name='Renamed', updated_at=timezone.now() + timedelta(seconds=1)
+        )
+        second = self.get_listing(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second['X-Cache'], 'MISS')
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second.json()['results'][0]['name'], 'Renamed')
+
+    def test_fingerprint_is_cached_between_reads(self):
+        self.get_listing()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_listing()
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(len(queries), 0)
+
+
+class AutocompleteRefreshTests(TransactionTestCase):
+    """Catalog and popularity changes rebuild the index off the request path"""
+
+    def setUp(self):
+        cache.clear()
+        self.snapshot_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.snapshot_dir.cleanup)
+        self.category = Category.objects.create(name='Audio', slug='audio')
+        self.speaker = Product.objects.create(
+            name='Speaker', description='Loud', price=50, category=self.category, stock_quantity=5
+        )
+        self.service = AutocompleteService()
+
+    def refresh(self):
+        index = self.service.get_index()
+        if self.service.refresh_thread is not None:
+            self.service.refresh_thread.join()
+        return index
+
+    def test_popularity_changes_the_source_version(self):
+        version = get_source_version()
+        Product.objects.filter(pk=self.speaker.pk).update(popularity_score=3)
+        self.assertNotEqual(get_source_version(), version)
+
+    @override_settings(PRODUCT_AUTOCOMPLETE_REFRESH_SECONDS=0, CATALOG_FINGERPRINT_TIMEOUT=0)
+    def test_stale_index_is_served_while_a_thread_rebuilds(self):
+        with override_settings(PRODUCT_AUTOCOMPLETE_SNAPSHOT=os.path.join(self.snapshot_dir.name, 'index.json')):
+            old_index = self.service.get_index()
+            Product.objects.create(name='Spatula', description='Flat', price=5, category=self.category)
+
+            # The request that notices the change still gets the old index
+            self.assertIs(self.refresh(), old_index)
+            self.assertEqual([item['name'] for item in self.service.lookup('spa')], ['Spatula'])
+
+            # A score refresh reorders results even though updated_at didn't move
+            Product.objects.filter(name='Spatula').update(popularity_score=10)
+            self.refresh()
+            self.assertEqual([item['name'] for item in self.service.lookup('sp')], ['Spatula', 'Speaker'])
+
+
+class ProductImportTests(TestCase):
+    """import_products: batches commit with a checkpoint, and COPY writes the same rows as the ORM"""
+
+    header = 'name,description,price,category,stock_quantity,sku,image\n'
+
+    def setUp(self):
+        cache.clear()
+        Category.objects.create(name='Electronics', slug='electronics')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'products.csv')
+
+    def write_rows(self, *rows):
+        with open(self.path, 'w', newline='') as csv_file:
+            csv_file.write(self.header + ''.join(f'{row}\n' for row in rows))
+
+    def run_import(self, *args):
+        stderr = io.StringIO()
+        call_command('import_products', self.path, *args, stdout=io.StringIO(), stderr=stderr)
+        return stderr.getvalue()
+
+    def test_invalid_rows_are_skipped_and_the_rest_imported(self):
+        self.write_rows('Case,A case,10,electronics,5,,', 'Cable,,-1,electronics,5,,', 'Lamp,A lamp,9,nowhere,5,,')
+        errors = self.run_import('--batch-size', '2')
+        self.assertEqual(list(Product.objects.values_list('name', flat=True)), ['Case'])
+        self.assertIn('Row 2', errors)
+        self.assertIn("unknown category 'nowhere'", errors)
+
+    def test_resume_skips_rows_a_previous_run_committed(self):
+        self.write_rows(*(f'Item {index},,1,electronics,1,,' for index in range(1, 6)))
+        self.run_import('--batch-size', '2')
+        with open(f'{self.path}.checkpoint') as checkpoint_file:
+            self.assertEqual(json.load(checkpoint_file)['rows_done'], 5)
+
+        # Pretend the run died after its first batch
+        Product.objects.exclude(name__in=['Item 1', 'Item 2']).delete()
+        with open(f'{self.path}.checkpoint', 'w') as checkpoint_file:
+            json.dump({'rows_done': 2, 'imported': 2, 'skipped': 0}, checkpoint_file)
+        self.run_import('--batch-size', '2', '--resume')
+        self.assertEqual(
+            sorted(Product.objects.values_list('name', flat=True)),
+            [f'Item {index}' for index in range(1, 6)],
+        )
+
+    def imported_rows(self):
+        return list(Product.objects.order_by('name').values_list('name', 'description', 'image'))
+
+    @skipUnless(connection.vendor == 'postgresql', "COPY needs PostgreSQL")
+    def test_copy_writes_the_same_rows_as_the_orm(self):
+        self.write_rows('Case,,10,electronics,5,,', 'Lamp,A lamp,9,electronics,5,,products/lamp.jpg')
+        self.run_import('--no-copy')
+        orm_rows = self.imported_rows()
+        Product.objects.all().delete()
+
+        self.run_import()
+        self.assertEqual(self.imported_rows(), orm_rows)
+        self.assertEqual(orm_rows[0], ('Case', '', None))
+
+
+class ListingCountTests(TestCase):
+    """Page mode counts come from a cache (or a planner estimate) but never hide rows"""
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Electronics', slug='electronics')
+        self.create_products(range(5))
+        self.client = APIClient(HTTP_HOST='localhost')
+
+    def create_products(self, numbers):
+        # bulk_create sends no signals, like rows written by another process
+        Product.objects.bulk_create(
+            Product(name=f'Item {number}', description='', price=1, category=self.category, sku=f'ITEM-{number}')
+            for number in numbers
+        )
+
+    def get_page(self, page, **params):
+        response = self.client.get(
+            '/api/products/', {'sort': 'name_asc', 'page_size': 2, 'page': page, **params}, secure=True
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_equivalent_filters_share_a_count_entry(self):
+        self.get_page(1, min_price='1', q='  Item ')
+        with CaptureQueriesContext(connection) as queries:
+            self.get_page(1, min_price='1.00', q='item')
+        self.assertFalse([query for query in queries if 'COUNT(' in query['sql'].upper()])
+
+    def test_stale_count_does_not_clip_the_last_page(self):
+        self.assertEqual(self.get_page(1)['total_count'], 5)
+        self.create_products(range(5, 7))
+
+        # The cached count still says 5, the rows say otherwise
+        page = self.get_page(3)
+        self.assertEqual([item['name'] for item in page['results']], ['Item 4', 'Item 5'])
+        self.assertTrue(page['has_next'])
+        self.assertEqual(page['total_count'], 7)
+        last = self.get_page(4)
+        self.assertEqual([item['name'] for item in last['results']], ['Item 6'])
+        self.assertFalse(last['has_next'])
+
+    def test_estimate_is_corrected_by_the_rows(self):
+        # Too low and too high estimates, on the last page and the one before it
+        for estimate, page in ((3, 3), (50, 3), (3, 2)):
+            paginator = ProductPagination()
+            request = Request(APIRequestFactory().get('/', {'page': page, 'page_size': 2}))
+            with mock.patch.object(ProductPagination, 'get_count', return_value=(estimate, True)):
+                rows = paginator.paginate_queryset(Product.objects.order_by('name'), request)
+            self.assertEqual(len(rows), 1 if page == 3 else 2)
+            self.assertEqual(paginator.has_next, page < 3)
+            self.assertEqual((paginator.total_count, paginator.total_pages), (5, 3))
+
+
+class CursorPaginationTests(TestCase):
+    """Keyset pages over (sort key, id): no gaps or repeats, even when many rows share the sort value"""
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Electronics', slug='electronics')
+        for index in range(7):
+            # Ties on price everywhere except the last row
+            Product.objects.create(
+                name=f'Item {index}', description='', price=5 if index < 6 else 9, category=self.category
+            )
+        self.client = APIClient(HTTP_HOST='localhost')
+
+    def get_page(self, **params):
+        response = self.client.get('/api/products/', {'sort': 'price_asc', 'page_size': 3, **params}, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def names(self, page):
+        return [item['name'] for item in page['results']]
+
+    def walk(self):
+        pages = [self.get_page(pagination='cursor')]
+        while pages[-1]['has_next']:
+            pages.append(self.get_page(cursor=pages[-1]['next_cursor']))
+        return pages
+
+    def test_walk_covers_every_row_once_in_order(self):
+        pages = self.walk()
+        self.assertEqual([len(page['results']) for page in pages], [3, 3, 1])
+        self.assertEqual(sum((self.names(page) for page in pages), []), [f'Item {index}' for index in range(7)])
+        self.assertIsNone(pages[0]['total_count'])
+
+    def test_previous_cursor_returns_the_same_page(self):
+        pages = self.walk()
+        back = self.get_page(cursor=pages[2]['prev_cursor'])
+        self.assertEqual(self.names(back), self.names(pages[1]))
+        self.assertTrue(back['has_previous'])
+
+    def test_rows_inserted_before_the_cursor_do_not_shift_later_pages(self):
+        first = self.get_page(pagination='cursor')
+        Product.objects.create(name='Cheap', description='', price=1, category=self.category)
+        Product.objects.create(name='Tied', description='', price=5, category=self.category)
+        second = self.get_page(cursor=first['next_cursor'])
+        # The new tied row has the highest id, so it comes after Item 5
+        self.assertEqual(self.names(second), ['Item 3', 'Item 4', 'Item 5'])
+
+    def test_cursor_for_another_sort_starts_from_the_top(self):
+        first = self.get_page(pagination='cursor')
+        response = self.client.get(
+            '/api/products/', {'sort': 'name_desc', 'page_size': 3, 'cursor': first['next_cursor']}, secure=True
+        )
+        self.assertEqual([item['name'] for item in response.json()['results']], ['Item 6', 'Item 5', 'Item 4'])
+        self.assertFalse(response.json()['has_previous'])
+
+
+class SkuAllocationTests(TransactionTestCase):
+    """Suffix blocks reserved from the shared counter never overlap, whichever process holds them"""
+
+    def setUp(self):
+        self.addCleanup(sku._reserved_blocks.clear)
+        sku._reserved_blocks.clear()
+
+    def other_process(self):
+        # A separate process starts with no reserved blocks of its own
+        return mock.patch.object(sku, '_reserved_blocks', {})
+
+    @override_settings(PRODUCT_SKU_BLOCK_SIZE=5)
+    def test_blocks_of_different_processes_do_not_overlap(self):
+        first = sku.allocate_suffixes('ELE', 3)
+        with self.other_process():
+            other = sku.allocate_suffixes('ELE', 3)
+        # The rest of the first block, then a new block after the other process's
+        first += sku.allocate_suffixes('ELE', 4)
+
+        self.assertEqual(first, [1, 2, 3, 4, 5, 11, 12])
+        self.assertEqual(other, [6, 7, 8])
+        self.assertEqual(sku.allocate_suffixes('PHO', 1), [1])
+
+    def test_reservations_inside_a_transaction_keep_no_block(self):
+        with transaction.atomic():
+            self.assertEqual(sku.allocate_suffixes('ELE', 2), [1, 2])
+        self.assertEqual(sku._reserved_blocks, {})
+        self.assertEqual(sku.allocate_suffixes('ELE', 1), [3])
+
+    def allocate(self, barrier, results):
+        try:
+            barrier.wait()
+            while True:
+                try:
+                    results.extend(sku.allocate_suffixes('ELE', 3))
+                    return
+                except OperationalError:
+                    # SQLite serializes writers and reports the others as locked; retry
+                    time.sleep(0.01)
+        finally:
+            connection.close()
+
+    @override_settings(PRODUCT_SKU_BLOCK_SIZE=4)
+    def test_concurrent_threads_hand_out_each_value_once(self):
+        workers = 8
+        barrier = threading.Barrier(workers)
+        results = []
+        threads = [threading.Thread(target=self.allocate, args=(barrier, results)) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), workers * 3)
+        self.assertEqual(len(set(results)), len(results))
+
+
+class ProductBulkUpdateTests(TestCase):
+    """Admin bulk update: entries are validated one by one, the writes commit together or not at all"""
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Electronics', slug='electronics')
+        self.phone = Product.objects.create(name='Phone', description='', price=100, category=category, stock_quantity=10)
+        self.case = Product.objects.create(name='Case', description='', price=10, category=category, stock_quantity=50)
+        self.admin = User.objects.create_superuser(email='bulk-admin@example.com', username='bulkadmin', password='password')
+        self.client = APIClient(HTTP_HOST='localhost')
+        self.client.force_authenticate(self.admin)
+
+    def post(self, entries):
+        return self.client.post('/api/products/bulk-update/', entries, format='json', secure=True)
+
+    def current(self, product):
+        product.refresh_from_db()
+        return product.price, product.stock_quantity, product.is_active
+
+    def test_invalid_entries_are_reported_and_the_rest_applied(self):
+        response = self.post({'products': [
+            {'id': self.phone.pk, 'price': '90.00'},
+            {'sku': self.case.sku, 'stock_quantity': 40, 'is_active': False},
+            {'id': self.phone.pk, 'price': '80.00'},
+            {'id': self.case.pk, 'price': '-1'},
+            {'price': '5'},
+            {'id': 999999, 'price': '5'},
+            {'id': self.phone.pk, 'sku': self.case.sku, 'price': '5'},
+            {'id': self.case.pk},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['summary'], {'updated': 2, 'unchanged': 0, 'error': 6})
+        self.assertEqual([result['status'] for result in response.data['results']][:3], ['updated', 'updated', 'error'])
+        self.assertEqual(response.data['results'][2]['errors'], {'product': ['Duplicate entry for this product']})
+        self.assertEqual(self.current(self.phone), (90, 10, True))
+        self.assertEqual(self.current(self.case), (10, 40, False))
+
+    def test_unchanged_values_are_not_written(self):
+        before = Product.objects.get(pk=self.phone.pk).updated_at
+        response = self.post([{'id': self.phone.pk, 'price': '100.00', 'stock_quantity': 10}])
+        self.assertEqual(response.data['results'][0]['status'], 'unchanged')
+        self.assertEqual(Product.objects.get(pk=self.phone.pk).updated_at, before)
+
+    @override_settings(PRODUCT_BULK_UPDATE_MAX_ENTRIES=1)
+    def test_rejects_bad_requests(self):
+        self.assertEqual(self.post([]).status_code, 400)
+        self.assertEqual(self.post({'products': 'all'}).status_code, 400)
+        self.assertEqual(self.post([{'id': self.phone.pk, 'price': 1}, {'id': self.case.pk, 'price': 1}]).status_code, 400)
+
+        self.client.force_authenticate(User.objects.create_user(
+            email='bulk-shopper@example.com', username='bulkshopper', password='password'
+        ))
+        self.assertEqual(self.post([{'id': self.phone.pk, 'price': 1}]).status_code, 403)
+        self.assertEqual(self.current(self.phone), (100, 10, True))
+
+    def test_failure_while_writing_rolls_back_the_whole_batch(self):
+        entries = [{'id': self.phone.pk, 'price': '1.00', 'stock_quantity': 1}, {'id': self.case.pk, 'stock_quantity': 1}]
+        with mock.patch('products.views.record_movements', side_effect=RuntimeError('ledger unavailable')):
+            with self.assertRaises(RuntimeError), self.assertLogs('django.request', 'ERROR'):
+                self.post(entries)
+        self.assertEqual(self.current(self.phone), (100, 10, True))
+        self.assertEqual(self.current(self.case), (10, 50, True))
@@ -6,16 +6,23 @@ app_name = 'products'
 urlpatterns = [
     # Debug endpoint (to find the error)
     path('debug/', views.debug_test, name='debug-test'),
+    path('debug/compression/', views.CompressionStatsView.as_view(), name='compression-stats'),
     
     # Public endpoints (anyone can access)
     path('', views.ProductListView.as_view(), name='product-list'),
     path('<int:pk>/', views.ProductDetailView.as_view(), name='product-detail'),
+    path('<int:pk>/related/', views.RelatedProductsView.as_view(), name='product-related'),
     path('category/<int:category_id>/', views.CategoryProductsView.as_view(), name='category-products'),
     path('featured/', views.FeaturedProductsView.as_view(), name='featured-products'),
+    path('best-sellers/', views.BestSellersView.as_view(), name='best-sellers'),
+    path('recently-viewed/', views.RecentlyViewedView.as_view(), name='recently-viewed'),
     path('search/', views.ProductSearchView.as_view(), name='product-search'),
+    path('autocomplete/', views.ProductAutocompleteView.as_view(), name='product-autocomplete'),
     
     # Admin endpoints (admin users only)
     path('create/', views.ProductCreateView.as_view(), name='product-create'),
+    path('bulk-update/', views.ProductBulkUpdateView.as_view(), name='product-bulk-update'),
+    path('feed/', views.ProductFeedView.as_view(), name='product-feed'),
     path('<int:pk>/update/', views.ProductUpdateView.as_view(), name='product-update'),
     path('<int:pk>/delete/', views.ProductDeleteView.as_view(), name='product-delete'),
 ]
\ No newline at end of file
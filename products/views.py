@@ -1,57 +1,31 @@
-from rest_framework import generics, permissions
-from django.db.models import Q
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import generics, permissions, status
 from .models import Product
-from .serializers import (ProductListSerializer, ProductDetailSerializer, ProductCreateSerializer)
-from categories.models import Category
+from .autocomplete import DEFAULT_LIMIT, MAX_LIMIT, autocomplete
+from .facets import build_facets
+from .feed import FEED_FORMATS, gzip_stream, render_feed
+from .inventory import record_movements
+from .featured import FEATURED_LIMIT, featured_snapshot, invalidate_featured_snapshot
+from .pagination import ProductPagination
+from .recommendations import related_limit
+from .recently_viewed import get_owner, get_recent_ids, record_view, set_owner_cookie
+from .popularity import BEST_SELLERS_LIMIT, MAX_BEST_SELLERS_LIMIT, POPULAR_SORT
+from .search import search_products
+from .spelling import spelling_index
+from .serializers import (ProductListSerializer, ProductDetailSerializer, ProductCreateSerializer,
+                          ProductBulkUpdateItemSerializer, media_url_builder, product_fieldset,
+                          product_list_rows, serialize_product_rows)
+from .signals import invalidate_product_caches
+from categories.tree import subtree_filter
+from common.cache import get_cache_state
+from common.compression import available_encodings, compression_stats, negotiate_encoding
+from common.mixins import CachedResponseMixin, ConditionalGetMixin, SparseFieldsetMixin
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
-
-
-class ProductPagination:
-    """
-    Custom pagination class to match frontend expectations
-    """
-    def __init__(self):
-        self.page_size = 15
-        self.page_size_query_param = 'page_size'
-        self.max_page_size = 100
-
-    def paginate_queryset(self, queryset, request, view=None):
-        # Get pagination parameters
-        try:
-            self.page_size = int(request.query_params.get('page_size', 15))
-        except (ValueError, TypeError):
-            self.page_size = 15
-            
-        try:
-            self.page_number = int(request.query_params.get('page', 1))
-        except (ValueError, TypeError):
-            self.page_number = 1
-
-        # Apply reasonable limits
-        self.page_size = min(self.page_size, 100)
-        self.page_size = max(self.page_size, 1)
-        self.page_number = max(self.page_number, 1)
-
-        # Calculate pagination
-        self.total_count = queryset.count()
-        self.total_pages = (self.total_count + self.page_size - 1) // self.page_size
-        start_index = (self.page_number - 1) * self.page_size
-        end_index = min(start_index + self.page_size, self.total_count)
-        
-        # Return paginated queryset
-        return list(queryset[start_index:end_index])
-
-    def get_paginated_response(self, data):
-        return {
-            'results': data,
-            'current_page': self.page_number,
-            'total_pages': self.total_pages,
-            'total_count': self.total_count,
-            'page_size': self.page_size,
-            'has_next': self.page_number < self.total_pages,
-            'has_previous': self.page_number > 1,
-        }
+from rest_framework.views import APIView
 
 
 @api_view(['GET'])
@@ -94,13 +68,56 @@ def debug_test(request):
         }, status=500)
 
 
-class ProductListView(generics.ListAPIView):
+class CompressionStatsView(APIView):
+    """
+    Response compression statistics for this worker
+    - Admin users only
+    - Per endpoint: bytes before/after, ratio and CPU time per encoding,
+      and how often each variant was served
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'encodings': list(available_encodings()),
+            'endpoints': compression_stats.report(),
+        })
+
+
+class PopularitySortMixin:
+    """
+    sort=popular responses also depend on the popularity scores, which
+    change without touching updated_at
+    - Adds the 'popularity' generation to the response cache key and ETag
+    - Drops Last-Modified, it can't describe a ranking change
+    """
+
+    def popularity_sort_requested(self):
+        return self.request.query_params.get('sort') == POPULAR_SORT
+
+    def get_cache_generations(self, request):
+        generations = super().get_cache_generations(request)
+        if self.popularity_sort_requested():
+            return tuple(generations) + ('popularity',)
+        return generations
+
+    def build_validators(self, request, fingerprint, last_modified):
+        if self.popularity_sort_requested():
+            fingerprint = f"{fingerprint}|popularity:{get_cache_state(['popularity'])}"
+            last_modified = None
+        return super().build_validators(request, fingerprint, last_modified)
+
+
+class ProductListView(PopularitySortMixin, CachedResponseMixin, ConditionalGetMixin, generics.ListAPIView):
     """
     Enhanced product list with search, filtering, and sorting
     - Public access (no login required)
     - Only shows active products
     - Supports search, price filtering, category filtering, and sorting
     - Now with pagination that matches frontend expectations
+    - Anonymous responses are cached until a product or category changes
+    - ?is_featured=true without other filters is served from the in-memory featured snapshot
+    - sort=popular ranks by the precomputed best-seller score (products/popularity.py)
     """
     serializer_class = ProductListSerializer
     permission_classes = [permissions.AllowAny]
@@ -108,22 +125,45 @@ class ProductListView(generics.ListAPIView):
     def get_serializer_context(self):
         return {'request': self.request}
 
+    def featured_requested(self):
+        return self.request.query_params.get('is_featured', '').lower() in ('1', 'true', 'yes')
+
+    def use_featured_snapshot(self, request):
+        params = request.query_params
+        return (
+            self.featured_requested() and
+            not any(params.get(name) for name in ('q', 'min_price', 'max_price', 'category')) and
+            # Snapshot rows don't carry the popularity score
+            not self.popularity_sort_requested() and
+            # The snapshot is a plain list, keyset pagination needs the database
+            'cursor' not in params and params.get('pagination') != 'cursor'
+        )
+
+    def get_validators(self, request):
+        if self.use_featured_snapshot(request):
+            return self.build_validators(request, *featured_snapshot.get_validators())
+        return super().get_validators(request)
+
     def list(self, request, *args, **kwargs):
         """
         Override list method to use custom pagination format
         """
-        # Get the base queryset
-        queryset = self.get_queryset()
+        # Get the base rows (only the columns ?fields= asks for)
+        fields, expand = product_fieldset(request)
+        if self.use_featured_snapshot(request):
+            rows = featured_snapshot.get_sorted_rows(request.query_params.get('sort', ''))
+        else:
+            rows = product_list_rows(self.get_queryset(), fields)
         
         # Apply custom pagination
         paginator = ProductPagination()
-        paginated_products = paginator.paginate_queryset(queryset, request)
+        paginated_products = paginator.paginate_queryset(rows, request, view=self)
         
-        # Serialize the paginated products
-        serializer = self.get_serializer(paginated_products, many=True)
+        # Serialize the paginated products (values() fast path, same JSON as the serializer)
+        results = serialize_product_rows(paginated_products, request, fields, expand)
         
         # Build response with frontend-compatible format
-        response_data = paginator.get_paginated_response(serializer.data)
+        response_data = paginator.get_paginated_response(results)
         
         # Add additional info for frontend
         response_data['filters_applied'] = {
@@ -148,10 +188,11 @@ class ProductListView(generics.ListAPIView):
         
         # Apply search filter if provided
         if search_query:
-            queryset = queryset.filter(
-                Q(name__icontains=search_query) | 
-                Q(description__icontains=search_query)
-            )
+            queryset = search_products(queryset, search_query)
+
+        # Featured products only
+        if self.featured_requested():
+            queryset = queryset.filter(is_featured=True)
         
         # Apply minimum price filter
         if min_price:
@@ -169,11 +210,11 @@ class ProductListView(generics.ListAPIView):
             except (ValueError, TypeError):
                 pass
         
-        # Apply category filter
+        # Apply category filter (the category and all its subcategories)
         if category_id:
             try:
-                category_id = int(category_id)
-                queryset = queryset.filter(category_id=category_id)
+                category_filter = subtree_filter(int(category_id))
+                queryset = queryset.filter(category_filter) if category_filter else queryset.none()
             except (ValueError, TypeError):
                 pass
         
@@ -195,6 +236,14 @@ class ProductListView(generics.ListAPIView):
             'name_desc': '-name',           # Name Z-A
         }
         
+        # Relevance only makes sense when a search query was given
+        if sort_option == 'relevance' and 'search_rank' in queryset.query.annotations:
+            return queryset.order_by('-search_rank', '-created_at')
+
+        # Best sellers first (indexed column, no join with order items)
+        if sort_option == POPULAR_SORT:
+            return queryset.order_by('-popularity_score', '-created_at')
+
         if sort_option in sort_mappings:
             return queryset.order_by(sort_mappings[sort_option])
         
@@ -202,34 +251,36 @@ class ProductListView(generics.ListAPIView):
         return queryset.order_by('-created_at')
 
 
-class ProductSearchView(generics.ListAPIView):
+class ProductSearchView(PopularitySortMixin, CachedResponseMixin, ConditionalGetMixin, generics.ListAPIView):
     """
     Enhanced product search with helpful 'no results' messages
     - Uses the same format as ProductListView for consistency
+    - ?facets=true adds category counts and a price histogram
+    - Zero-result searches get "did you mean" spelling suggestions,
+      ?autocorrect=true re-runs the search with the corrected query
     """
     serializer_class = ProductListSerializer
     permission_classes = [permissions.AllowAny]
     
     def get_serializer_context(self):
         return {'request': self.request}
+
+    def conditional_get_enabled(self, request):
+        # Autocorrected results don't match the validators of the typed query
+        return not self.autocorrect_requested(request)
+
+    def autocorrect_requested(self, request):
+        return request.query_params.get('autocorrect', '').lower() in ('1', 'true', 'yes')
+
+    def get_search_query(self):
+        return getattr(self, 'corrected_query', None) or self.request.query_params.get('q', '')
     
     def list(self, request, *args, **kwargs):
         """
         Override the list method to use consistent pagination format
         """
-        # Get the base queryset
-        queryset = self.get_queryset()
-        
-        # Apply custom pagination
-        paginator = ProductPagination()
-        paginated_products = paginator.paginate_queryset(queryset, request)
-        
-        # Serialize the paginated products
-        serializer = self.get_serializer(paginated_products, many=True)
-        
-        # Build response with frontend-compatible format
-        response_data = paginator.get_paginated_response(serializer.data)
-        
+        response_data = self.get_results(request)
+
         # Get search query for custom messages
         search_query = self.request.query_params.get('q', '').strip()
         has_other_filters = any([
@@ -238,6 +289,22 @@ class ProductSearchView(generics.ListAPIView):
             self.request.query_params.get('category'),
             self.request.query_params.get('sort')
         ])
+
+        # Spelling correction for searches that found nothing
+        if len(response_data['results']) == 0 and search_query:
+            correction = spelling_index.suggest(search_query)
+            if correction['query'] and self.autocorrect_requested(request):
+                self.corrected_query = correction['query']
+                corrected_data = self.get_results(request)
+                if corrected_data['results']:
+                    corrected_data['search_performed'] = True
+                    corrected_data['search_query'] = correction['query']
+                    corrected_data['original_query'] = search_query
+                    corrected_data['message'] = f'Showing results for "{correction["query"]}" instead of "{search_query}".'
+                    return Response(corrected_data)
+                self.corrected_query = None
+            response_data['did_you_mean'] = correction['query']
+            response_data['suggested_terms'] = correction['terms']
         
         # Custom message if no results found
         if len(response_data['results']) == 0:
@@ -266,10 +333,32 @@ class ProductSearchView(generics.ListAPIView):
                 response_data['search_query'] = search_query
         
         return Response(response_data)
+
+    def get_results(self, request):
+        """Paginated results (plus facets when asked for) for the current search"""
+        # Get the base queryset
+        queryset = self.get_queryset()
+        
+        # Apply custom pagination
+        paginator = ProductPagination()
+        fields, expand = product_fieldset(request)
+        paginated_products = paginator.paginate_queryset(product_list_rows(queryset, fields), request, view=self)
+        
+        # Serialize the paginated products (values() fast path, same JSON as the serializer)
+        results = serialize_product_rows(paginated_products, request, fields, expand)
+        
+        # Build response with frontend-compatible format
+        response_data = paginator.get_paginated_response(results)
+        
+        # Facets (category counts + price histogram) from one grouped query
+        if request.query_params.get('facets', '').lower() in ('1', 'true', 'yes'):
+            response_data['facets'] = build_facets(queryset)
+
+        return response_data
     
     def get_queryset(self):
         # Search parameters from URL
-        search_query = self.request.query_params.get('q', '')
+        search_query = self.get_search_query()
         min_price = self.request.query_params.get('min_price')
         max_price = self.request.query_params.get('max_price')
         category_id = self.request.query_params.get('category')
@@ -280,10 +369,7 @@ class ProductSearchView(generics.ListAPIView):
         
         # Apply search filter if provided
         if search_query:
-            queryset = queryset.filter(
-                Q(name__icontains=search_query) | 
-                Q(description__icontains=search_query)
-            )
+            queryset = search_products(queryset, search_query)
         
         # minimum price filter
         if min_price:
@@ -301,11 +387,11 @@ class ProductSearchView(generics.ListAPIView):
             except (ValueError, TypeError):
                 pass
         
-        # category filter
+        # category filter (the category and all its subcategories)
         if category_id:
             try:
-                category_id = int(category_id)
-                queryset = queryset.filter(category_id=category_id)
+                category_filter = subtree_filter(int(category_id))
+                queryset = queryset.filter(category_filter) if category_filter else queryset.none()
             except (ValueError, TypeError):
                 pass
         
@@ -327,6 +413,14 @@ class ProductSearchView(generics.ListAPIView):
             'name_desc': '-name',           # Name Z-A
         }
         
+        # Relevance only makes sense when a search query was given
+        if sort_option == 'relevance' and 'search_rank' in queryset.query.annotations:
+            return queryset.order_by('-search_rank', '-created_at')
+
+        # Best sellers first (indexed column, no join with order items)
+        if sort_option == POPULAR_SORT:
+            return queryset.order_by('-popularity_score', '-created_at')
+
         if sort_option in sort_mappings:
             return queryset.order_by(sort_mappings[sort_option])
         
@@ -334,24 +428,62 @@ class ProductSearchView(generics.ListAPIView):
         return queryset.order_by('-created_at')
 
 
-class ProductDetailView(generics.RetrieveAPIView):
+class ProductAutocompleteView(APIView):
+    """
+    Search-as-you-type suggestions
+    - Public access
+    - Matches the start of any word in product and category names
+    - Served from the in-memory prefix index, no database query per keystroke
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        search_query = request.query_params.get('q', '')
+        try:
+            limit = min(int(request.query_params.get('limit', DEFAULT_LIMIT)), MAX_LIMIT)
+        except ValueError:
+            limit = DEFAULT_LIMIT
+
+        return Response({
+            'query': search_query,
+            'results': autocomplete.lookup(search_query, max(limit, 1)),
+        })
+
+
+class ProductDetailView(ConditionalGetMixin, SparseFieldsetMixin, generics.RetrieveAPIView):
     """
     Get single product details
     - Public access (no login required)
     - Shows full product information
+    - Sends ETag/Last-Modified and answers 304 when nothing changed
+    - Views (including 304s) go into the visitor's recently viewed buffer
     """
     serializer_class = ProductDetailSerializer
     permission_classes = [permissions.AllowAny]
+    last_modified_fields = ('updated_at', 'category__updated_at')
+    etag_fields = ('stock_quantity',)
 
     def get_serializer_context(self):
         return {'request': self.request}
 
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method == 'GET' and response.status_code in (200, 304):
+            owner, new_cookie = get_owner(request)
+            record_view(owner, self.kwargs['pk'], persist=new_cookie is None)
+            if new_cookie:
+                set_owner_cookie(response, new_cookie)
+        return response
+
     def get_queryset(self):
         # Return active products only
         return Product.objects.filter(is_active=True).select_related('category')
 
+    def get_validator_queryset(self):
+        return self.get_queryset().filter(pk=self.kwargs['pk'])
 
-class CategoryProductsView(generics.ListAPIView):
+
+class CategoryProductsView(CachedResponseMixin, ConditionalGetMixin, generics.ListAPIView):
     """
     Get products by category
     - Public access
@@ -373,38 +505,36 @@ class CategoryProductsView(generics.ListAPIView):
         
         # Apply custom pagination
         paginator = ProductPagination()
-        paginated_products = paginator.paginate_queryset(queryset, request)
+        fields, expand = product_fieldset(request)
+        paginated_products = paginator.paginate_queryset(product_list_rows(queryset, fields), request, view=self)
         
-        # Serialize the paginated products
-        serializer = self.get_serializer(paginated_products, many=True)
+        # Serialize the paginated products (values() fast path, same JSON as the serializer)
+        results = serialize_product_rows(paginated_products, request, fields, expand)
         
         # Build response with frontend-compatible format
-        response_data = paginator.get_paginated_response(serializer.data)
+        response_data = paginator.get_paginated_response(results)
         
         return Response(response_data)
 
     def get_queryset(self):
         category_id = self.kwargs['category_id']
         
-        # Get the category and all its subcategories
-        try:
-            category = Category.objects.get(id=category_id)
-            descendant_categories = category.get_descendants(include_self=True)
-            
-            # Return products from this category and all subcategories
-            return Product.objects.filter(
-                category__in=descendant_categories,
-                is_active=True
-            ).select_related('category')
-        except Category.DoesNotExist:
+        # Products from this category and all its subcategories, in one query
+        category_filter = subtree_filter(category_id)
+        if category_filter is None:
             return Product.objects.none()
+        return Product.objects.filter(
+            category_filter,
+            is_active=True
+        ).select_related('category')
 
 
-class FeaturedProductsView(generics.ListAPIView):
+class FeaturedProductsView(CachedResponseMixin, ConditionalGetMixin, generics.ListAPIView):
     """
     Get featured products only
     - Public access
     - Returns simple array (no pagination) for featured products
+    - Served from the in-memory featured snapshot, validators included
     """
     serializer_class = ProductListSerializer
     permission_classes = [permissions.AllowAny]
@@ -416,15 +546,120 @@ class FeaturedProductsView(generics.ListAPIView):
         return Product.objects.filter(
             is_featured=True,
             is_active=True
-        ).select_related('category').order_by('-created_at')[:8] 
+        ).select_related('category').order_by('-created_at')[:FEATURED_LIMIT] 
+
+    def get_validators(self, request):
+        return self.build_validators(request, *featured_snapshot.get_validators())
 
     def list(self, request, *args, **kwargs):
         """
         Return simple array for featured products (no pagination needed)
         """
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        rows = featured_snapshot.get_rows()[:FEATURED_LIMIT]
+        return Response(serialize_product_rows(rows, request, *product_fieldset(request)))
+
+
+class BestSellersView(PopularitySortMixin, CachedResponseMixin, ConditionalGetMixin, generics.ListAPIView):
+    """
+    Best-selling products
+    - Public access
+    - Returns simple array (no pagination), ?limit= up to 50
+    - Ranked by the precomputed popularity score: recent units sold,
+      cancelled orders excluded (products/popularity.py)
+    """
+    serializer_class = ProductListSerializer
+    permission_classes = [permissions.AllowAny]
+
+    def popularity_sort_requested(self):
+        return True
+
+    def get_serializer_context(self):
+        return {'request': self.request}
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.query_params.get('limit', BEST_SELLERS_LIMIT))
+        except ValueError:
+            return BEST_SELLERS_LIMIT
+        return min(max(limit, 1), MAX_BEST_SELLERS_LIMIT)
+
+    def get_validator_queryset(self):
+        return Product.objects.filter(is_active=True, popularity_score__gt=0)
+
+    def get_queryset(self):
+        return self.get_validator_queryset().select_related('category').order_by(
+            '-popularity_score', '-created_at'
+        )[:self.get_limit()]
+
+    def list(self, request, *args, **kwargs):
+        """
+        Return simple array for best sellers (no pagination needed)
+        """
+        fields, expand = product_fieldset(request)
+        rows = product_list_rows(self.get_queryset(), fields)
+        return Response(serialize_product_rows(rows, request, fields, expand))
+
+
+class RelatedProductsView(CachedResponseMixin, generics.ListAPIView):
+    """
+    "Customers also bought" for one product
+    - Public access
+    - Returns simple array (no pagination), best match first
+    - Read from the precomputed RelatedProduct table in one indexed query;
+      products without recommendations (or unknown ids) get an empty list
+    """
+    serializer_class = ProductListSerializer
+    permission_classes = [permissions.AllowAny]
+    cache_generations = ('products', 'categories', 'related')
+
+    def get_serializer_context(self):
+        return {'request': self.request}
+
+    def get_queryset(self):
+        return Product.objects.filter(
+            recommended_in__product_id=self.kwargs['pk'],
+            is_active=True,
+        ).select_related('category').order_by('recommended_in__rank')[:related_limit()]
+
+    def list(self, request, *args, **kwargs):
+        fields, expand = product_fieldset(request)
+        rows = product_list_rows(self.get_queryset(), fields)
+        return Response(serialize_product_rows(rows, request, fields, expand))
+
+
+class RecentlyViewedView(APIView):
+    """
+    The visitor's recently viewed products
+    - Public access: logged-in users by account, anonymous visitors by cookie
+    - Returns simple array, most recent first; ?exclude=<id> leaves out the
+      product currently on screen, ?limit= caps the length
+    - Ids come from the cache buffer, products from a single id__in query
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        owner, new_cookie = get_owner(request)
+        if new_cookie:
+            # No cookie, nothing viewed yet
+            return Response([])
+        ids = get_recent_ids(owner)
+
+        exclude = request.query_params.get('exclude')
+        if exclude and exclude.isdigit():
+            ids = [product_id for product_id in ids if product_id != int(exclude)]
+        try:
+            ids = ids[:max(int(request.query_params.get('limit', len(ids))), 0)]
+        except ValueError:
+            pass
+        if not ids:
+            return Response([])
+
+        fields, expand = product_fieldset(request)
+        queryset = Product.objects.filter(id__in=ids, is_active=True).select_related('category').order_by()
+        rows_by_id = {row['id']: row for row in product_list_rows(queryset, fields)}
+        # Back into viewing order; deactivated or deleted products just drop out
+        rows = [rows_by_id[product_id] for product_id in ids if product_id in rows_by_id]
+        return Response(serialize_product_rows(rows, request, fields, expand))
 
 
 class ProductCreateView(generics.CreateAPIView):
@@ -458,4 +693,148 @@ class ProductDeleteView(generics.DestroyAPIView):
 
     def perform_destroy(self, instance):
         instance.is_active = False
-        instance.save()
\ No newline at end of file
+        instance.save()
+
+
+class ProductBulkUpdateView(APIView):
+    """
+    Update price / stock / active flag of many products at once
+    - Admin users only
+    - Body: [{"id" or "sku", "price"?, "stock_quantity"?, "is_active"?}, ...]
+      (or {"products": [...]})
+    - One transaction, one bulk_update (CASE per column) and a single
+      updated_at timestamp; caches are invalidated once for the whole batch
+    - Returns a result per entry, invalid entries don't stop the others
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        entries = request.data.get('products') if isinstance(request.data, dict) else request.data
+        if not isinstance(entries, list) or not entries:
+            return Response(
+                {'error': 'Expected a non-empty list of product updates'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        max_entries = getattr(settings, 'PRODUCT_BULK_UPDATE_MAX_ENTRIES', 5000)
+        if len(entries) > max_entries:
+            return Response(
+                {'error': f'At most {max_entries} updates per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Validate every entry on its own so one bad row doesn't reject the batch
+        results = []
+        valid = []
+        for index, entry in enumerate(entries):
+            serializer = ProductBulkUpdateItemSerializer(data=entry)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+                results.append(None)
+            else:
+                results.append({'index': index, 'status': 'error', 'errors': serializer.errors})
+
+        with transaction.atomic():
+            products = self.load_products(valid)
+            changed_products, changed_fields, seen = [], set(), set()
+            stock_changes = {}
+            now = timezone.now()
+
+            for index, data in valid:
+                product = products['id'].get(data.get('id')) or products['sku'].get(data.get('sku'))
+                if product is None or (data.get('id') and data.get('sku') and product.sku != data['sku']):
+                    results[index] = {'index': index, 'status': 'error', 'errors': {'product': ['Product not found']}}
+                    continue
+                if product.pk in seen:
+                    results[index] = {'index': index, 'status': 'error', 'errors': {'product': ['Duplicate entry for this product']}}
+                    continue
+                seen.add(product.pk)
+
+                fields = [
+                    field for field in ProductBulkUpdateItemSerializer.UPDATE_FIELDS
+                    if field in data and getattr(product, field) != data[field]
+                ]
+                if 'stock_quantity' in fields:
+                    stock_changes[product.pk] = data['stock_quantity'] - product.stock_quantity
+                for field in fields:
+                    setattr(product, field, data[field])
+                if fields:
+                    product.updated_at = now
+                    changed_products.append(product)
+                    changed_fields.update(fields)
+
+                results[index] = {
+                    'index': index,
+                    'id': product.pk,
+                    'sku': product.sku,
+                    'status': 'updated' if fields else 'unchanged',
+                    'fields': fields,
+                }
+
+            if changed_products:
+                Product.objects.bulk_update(
+                    changed_products, sorted(changed_fields) + ['updated_at'], batch_size=500
+                )
+                record_movements('adjustment', stock_changes, reference=f'bulk update by {request.user.pk}')
+
+        if changed_products:
+            # Once per batch instead of once per row
+            invalidate_product_caches()
+            if any(product.is_featured for product in changed_products):
+                invalidate_featured_snapshot()
+            if 'is_active' in changed_fields:
+                for product in changed_products:
+                    spelling_index.update(('product', product.pk), product.name, active=product.is_active)
+
+        summary = {name: 0 for name in ('updated', 'unchanged', 'error')}
+        for result in results:
+            summary[result['status']] += 1
+        return Response({'summary': summary, 'results': results})
+
+    def load_products(self, valid):
+        """Lock and fetch every referenced product with two queries at most"""
+        ids = {data['id'] for _, data in valid if 'id' in data}
+        skus = {data['sku'] for _, data in valid if 'sku' in data and 'id' not in data}
+        fields = ('id', 'sku', 'name', 'price', 'stock_quantity', 'is_active', 'is_featured', 'updated_at')
+        locked = Product.objects.select_for_update().only(*fields).order_by('pk')
+
+        by_id = {product.pk: product for product in locked.filter(pk__in=ids)} if ids else {}
+        by_sku = {product.sku: product for product in locked.filter(sku__in=skus)} if skus else {}
+        # Same row looked up both ways must be the same object
+        for sku, product in list(by_sku.items()):
+            if product.pk in by_id:
+                by_sku[sku] = by_id[product.pk]
+        return {'id': by_id, 'sku': by_sku}
+
+
+class ProductFeedView(APIView):
+    """
+    Full catalog export for shopping aggregators
+    - Admin users only
+    - ?feed_format=ndjson (default) | csv | xml
+    - Streamed row by row in constant memory, gzip-compressed on the fly
+      when the client accepts it
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        feed_format = request.query_params.get('feed_format', 'ndjson')
+        if feed_format not in FEED_FORMATS:
+            return Response(
+                {'error': f"feed_format must be one of: {', '.join(FEED_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        chunks = render_feed(feed_format, media_url_builder(request))
+        # The feed is compressed as it streams, gzip is the only encoding offered
+        use_gzip = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING'), ('gzip',)) == 'gzip'
+        if use_gzip:
+            chunks = gzip_stream(chunks)
+
+        response = StreamingHttpResponse(chunks, content_type=f'{FEED_FORMATS[feed_format]}; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="products.{feed_format}"'
+        response['Vary'] = 'Accept-Encoding'
+        if use_gzip:
+            response['Content-Encoding'] = 'gzip'
+        return response
+
@@ -0,0 +1,27 @@
+"""
+Worker startup warming
+
+Called from config/wsgi.py and config/asgi.py once Django is set up, so the
+first requests of a fresh worker don't pay for building in-memory indexes.
+A failure here (e.g. database not migrated yet) only logs a warning - the
+indexes are then built lazily on first use.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up():
+    from .autocomplete import autocomplete
+    from .featured import featured_snapshot
+
+    try:
+        autocomplete.load()
+    except Exception as e:
+        logger.warning("Could not warm the autocomplete index: %s", e)
+
+    try:
+        featured_snapshot.get_rows()
+    except Exception as e:
+        logger.warning("Could not warm the featured products snapshot: %s", e)
@@ -2,9 +2,11 @@ from rest_framework import serializers
 from .models import Review
 from products.models import Product
 from orders.models import Order
+from products.serializers import ProductListSerializer
+from common.serializers import SparseFieldsSerializerMixin
 
-class ReviewListSerializer(serializers.ModelSerializer):
-    """Serializer for listing reviews (public access)"""
+class ReviewListSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    """Serializer for listing reviews (public access, ?expand=product adds the product)"""
     user_name = serializers.CharField(source='user.username', read_only=True)
     product_name = serializers.CharField(source='product.name', read_only=True)
     
@@ -15,10 +17,11 @@ class ReviewListSerializer(serializers.ModelSerializer):
             'verified_purchase', 'created_at', 'helpful_count'
         ]
         read_only_fields = ['verified_purchase', 'helpful_count']
+        expandable_fields = {'product': ProductListSerializer}
 
 
-class ReviewDetailSerializer(serializers.ModelSerializer):
-    """Serializer for detailed review view"""
+class ReviewDetailSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    """Serializer for detailed review view (?expand=product adds the product)"""
     user_name = serializers.CharField(source='user.username', read_only=True)
     user_email = serializers.CharField(source='user.email', read_only=True)
     product_name = serializers.CharField(source='product.name', read_only=True)
@@ -34,6 +37,7 @@ class ReviewDetailSerializer(serializers.ModelSerializer):
             'user_name', 'user_email', 'verified_purchase', 
             'helpful_count', 'created_at', 'updated_at'
         ]
+        expandable_fields = {'product': ProductListSerializer}
 
 
 class ReviewCreateSerializer(serializers.ModelSerializer):
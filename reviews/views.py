@@ -2,6 +2,7 @@ from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from django.shortcuts import get_object_or_404
+from common.mixins import SparseFieldsetMixin
 from django.db.models import Avg, Count, Q
 from .models import Review
 from .serializers import (ReviewListSerializer,ReviewDetailSerializer,ReviewCreateSerializer,ReviewUpdateSerializer,
@@ -10,7 +11,7 @@ ProductReviewStatsSerializer
 )
 from products.models import Product
 
-class ProductReviewsListView(generics.ListAPIView):
+class ProductReviewsListView(SparseFieldsetMixin, generics.ListAPIView):
     """
     Get all reviews for a specific product
     - Public access (no login required)
@@ -26,7 +27,7 @@ class ProductReviewsListView(generics.ListAPIView):
         ).select_related('user', 'product').order_by('-created_at')
 
 
-class UserReviewsListView(generics.ListAPIView):
+class UserReviewsListView(SparseFieldsetMixin, generics.ListAPIView):
     """
     Get user's review history
     - User must be logged in
@@ -41,7 +42,7 @@ class UserReviewsListView(generics.ListAPIView):
         ).select_related('product').order_by('-created_at')
 
 
-class ReviewDetailView(generics.RetrieveAPIView):
+class ReviewDetailView(SparseFieldsetMixin, generics.RetrieveAPIView):
     """
     Get review details
     - Public access (no login required)
@@ -176,7 +177,7 @@ def product_review_stats(request, product_id):
     return Response(serializer.data)
 
 
-class AdminReviewListView(generics.ListAPIView):
+class AdminReviewListView(SparseFieldsetMixin, generics.ListAPIView):
     """
     Get all reviews (Admin only)
     - Admin users only
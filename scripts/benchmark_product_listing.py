@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Product Listing Serialization Benchmark
+Compares ProductListSerializer with the values() fast path on 100-item pages
+and checks both produce byte-identical JSON
+
+Usage: python scripts/benchmark_product_listing.py [rounds]
+Runs inside a transaction that is rolled back, so sample rows never persist.
+"""
+
+import os
+import sys
+import time
+import django
+from django.db import transaction
+
+# Setup Django
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from categories.models import Category
+from products.models import Product
+from products.serializers import ProductListSerializer, product_list_rows, serialize_product_rows
+
+PAGE_SIZE = 100
+
+
+def ensure_sample_products():
+    """Top the catalog up to one full page of active products"""
+    missing = PAGE_SIZE - Product.objects.filter(is_active=True).count()
+    if missing <= 0:
+        return
+    category, _ = Category.objects.get_or_create(slug='benchmark', defaults={'name': 'Benchmark'})
+    for index in range(missing):
+        product = Product.objects.create(
+            name=f'Benchmark product {index}',
+            description='Benchmark row',
+            price=index + 0.99,
+            category=category,
+        )
+        if index % 2:
+            # Only the image URL matters here, no file needed
+            Product.objects.filter(pk=product.pk).update(image=f'products/benchmark_{index}.jpg')
+
+
+def time_path(label, build_page, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        content = JSONRenderer().render(build_page())
+    elapsed = time.perf_counter() - start
+    rows_per_sec = rounds * PAGE_SIZE / elapsed
+    print(f"  {label:<28} {rows_per_sec:>12,.0f} rows/sec  ({elapsed / rounds * 1000:.2f} ms/page)")
+    return content, rows_per_sec
+
+
+def run_benchmark(rounds):
+    print(f"🔄 Benchmarking product listing serialization ({rounds} x {PAGE_SIZE}-item pages)...")
+    request = RequestFactory().get('/api/products/', HTTP_HOST='localhost')
+    queryset = Product.objects.filter(is_active=True).select_related('category').order_by('-created_at')
+
+    def serializer_page():
+        products = list(queryset[:PAGE_SIZE])
+        return ProductListSerializer(products, many=True, context={'request': request}).data
+
+    def fast_page():
+        rows = list(product_list_rows(queryset)[:PAGE_SIZE])
+        return serialize_product_rows(rows, request)
+
+    before, slow = time_path('ProductListSerializer', serializer_page, rounds)
+    after, fast = time_path('values() fast path', fast_page, rounds)
+
+    print(f"  Speedup: {fast / slow:.1f}x")
+    if before == after:
+        print("✅ JSON output is byte-identical")
+    else:
+        print("❌ JSON output differs!")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    with transaction.atomic():
+        ensure_sample_products()
+        run_benchmark(rounds)
+        transaction.set_rollback(True)
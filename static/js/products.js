@@ -77,7 +77,7 @@ function displayFeaturedProducts(products) {
         <div class="product-card">
             <div class="product-image-container">
                 ${product.image ? 
-                    `<img src="${product.image}" alt="${product.name}" class="product-image">` : 
+                    `<img src="${product.image}" ${product.image_srcset ? `srcset="${product.image_srcset}" sizes="(max-width: 600px) 50vw, 300px"` : ''} alt="${product.name}" class="product-image" loading="lazy">` : 
                     `<div class="product-image-placeholder">📦</div>`
                 }
             </div>
@@ -123,7 +123,7 @@ function displayProducts(products) {
         <div class="product-card">
             <div class="product-image-container">
                 ${product.image ? 
-                    `<img src="${product.image}" alt="${product.name}" class="product-image">` : 
+                    `<img src="${product.image}" ${product.image_srcset ? `srcset="${product.image_srcset}" sizes="(max-width: 600px) 50vw, 300px"` : ''} alt="${product.name}" class="product-image" loading="lazy">` : 
                     `<div class="product-image-placeholder">📦</div>`
                 }
             </div>
@@ -173,7 +173,7 @@ function displayProductDetail(product) {
         <div class="product-card">
             <div class="product-image-container" style="height: 400px;">
                 ${product.image ? 
-                    `<img src="${product.image}" alt="${product.name}" class="product-image">` : 
+                    `<img src="${product.image}" ${product.image_srcset ? `srcset="${product.image_srcset}" sizes="(max-width: 600px) 50vw, 300px"` : ''} alt="${product.name}" class="product-image" loading="lazy">` : 
                     `<div class="product-image-placeholder">📦</div>`
                 }
             </div>